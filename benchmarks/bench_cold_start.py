@@ -0,0 +1,140 @@
+# benchmarks/bench_cold_start.py
+"""Import-time and cold-start benchmark for the feature Lambda handlers.
+
+Each measurement runs in a fresh interpreter, like a cold Lambda container:
+it times the handler module import, the first (cold) invocation and a second
+(warm) one. Upstream HTTP calls and AWS API calls are answered locally, but
+boto3 clients are still really constructed, so their cost is included.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --baseline-ref <commit>   # before/after
+
+``--baseline-ref`` checks the handler out of an older commit and benchmarks
+it next to the working tree version.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HANDLER = 'src/lambda/feature_pipeline_handler.py'
+
+FEATURE_DEFINITIONS = [
+    {'FeatureName': name, 'FeatureType': feature_type}
+    for name, feature_type in [
+        ('record_id', 'String'), ('timestamp', 'Fractional'), ('date', 'String'),
+        ('temp', 'Fractional'), ('humidity', 'Fractional'), ('precip', 'Fractional'),
+        ('windspeed', 'Fractional'), ('conditions', 'Integral'), ('cloudcover', 'Integral'),
+        ('visibility', 'Integral'), ('solarradiation', 'Fractional'), ('pm25', 'Integral')
+    ]
+]
+WEATHER = {'days': [{'datetime': '2024-01-20', 'temp': 72.1, 'humidity': 65.0, 'precip': 0.0,
+                     'windspeed': 8.5, 'conditions': 'Clear', 'cloudcover': 25.0,
+                     'visibility': 10.0, 'solarradiation': 250.0}]}
+AIR_QUALITY = {'data': {'time': {'s': '2024-01-20 00:00:00'}, 'iaqi': {'pm25': {'v': 35}}}}
+
+
+def child(handler_path: str) -> None:
+    """Runs inside the fresh interpreter and prints the timings as JSON."""
+    start = time.perf_counter()
+    import requests
+    import botocore.client
+
+    def fake_send(adapter, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(WEATHER if 'visualcrossing' in request.url else AIR_QUALITY).encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def fake_api_call(client, operation_name, params):
+        if operation_name == 'DescribeFeatureGroup':
+            return {'FeatureDefinitions': FEATURE_DEFINITIONS}
+        return {}
+
+    requests.adapters.HTTPAdapter.send = fake_send
+    botocore.client.BaseClient._make_api_call = fake_api_call
+    stub_seconds = time.perf_counter() - start
+
+    import importlib.util
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location('handler_under_test', handler_path)
+    handler = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(handler)
+    import_seconds = time.perf_counter() - start
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        response = handler.lambda_handler({}, None)
+        timings.append(time.perf_counter() - start)
+        assert response['statusCode'] == 200, response
+
+    print(json.dumps({
+        'stub_setup': stub_seconds,
+        'import': import_seconds,
+        'cold_invoke': timings[0],
+        'warm_invoke': timings[1],
+        'pandas_loaded': 'pandas' in sys.modules
+    }))
+
+
+def measure(handler_path: str, runs: int) -> dict:
+    env = dict(os.environ, AWS_DEFAULT_REGION='us-east-1',
+               AWS_ACCESS_KEY_ID='bench', AWS_SECRET_ACCESS_KEY='bench')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, __file__, '--child', handler_path],
+                                capture_output=True, text=True, env=env, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    result = {key: statistics.median(s[key] for s in samples)
+              for key in ('import', 'cold_invoke', 'warm_invoke')}
+    result['pandas_loaded'] = samples[0]['pandas_loaded']
+    return result
+
+
+def report(label: str, result: dict) -> None:
+    cold_total = result['import'] + result['cold_invoke']
+    print(f"{label:<10} import {result['import'] * 1000:8.1f} ms  "
+          f"cold invoke {result['cold_invoke'] * 1000:8.1f} ms  "
+          f"import+cold {cold_total * 1000:8.1f} ms  "
+          f"warm invoke {result['warm_invoke'] * 1000:7.1f} ms  "
+          f"pandas loaded: {result['pandas_loaded']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline-ref', type=str, default=None,
+                        help='git commit whose handler is reported as "before"')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    if args.baseline_ref:
+        source = subprocess.run(['git', 'show', f'{args.baseline_ref}:{HANDLER}'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        # The handler locates src/ relative to itself, so the copy must live next to it
+        with tempfile.NamedTemporaryFile('w', suffix='.py', dir=ROOT / 'src' / 'lambda',
+                                         prefix='_baseline_', delete=False) as f:
+            f.write(source)
+        try:
+            report('before', measure(f.name, args.runs))
+        finally:
+            os.remove(f.name)
+
+    report('after', measure(str(ROOT / HANDLER), args.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_feature_store.py
+"""Measure ingestion and training-data throughput against the local Feature Store.
+
+Writes N synthetic feature rows through FeatureStoreWriter into a
+LocalFeatureStore with simulated per-call latency and a request rate limit,
+then runs TrainingPipeline.prepare_training_data over the offline table
+through the local Athena/S3 stand-ins.
+
+    python benchmarks/bench_feature_store.py --rows 5000 --latency-ms 5 --max-rps 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from pipelines.dedup_index import frame_record_ids
+from pipelines.feature_store_writer import FeatureStoreWriter
+from pipelines.local_feature_store import LocalAthena, LocalFeatureStore, LocalS3
+from pipelines.training_pipeline import TrainingPipeline
+
+FEATURE_GROUP = 'air-quality-features'
+CITIES = ['los angeles', 'new york', 'chicago', 'houston', 'phoenix', 'denver', 'seattle']
+
+
+def synthetic_features(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    features = pd.DataFrame({
+        'city': [CITIES[i % len(CITIES)] for i in range(rows)],
+        'date': pd.Timestamp('2015-01-01') + pd.to_timedelta(np.arange(rows) // len(CITIES), unit='D'),
+        'temp': rng.normal(65, 15, rows).round(1),
+        'humidity': rng.uniform(10, 100, rows).round(1),
+        'precip': rng.exponential(0.1, rows).round(2),
+        'windspeed': rng.uniform(0, 30, rows).round(1),
+        'conditions': rng.integers(1, 7, rows),
+        'cloudcover': rng.uniform(0, 100, rows).round(1),
+        'visibility': rng.uniform(1, 10, rows).round(1),
+        'solarradiation': rng.uniform(0, 350, rows).round(1),
+        'pm25': rng.integers(1, 200, rows),
+        'timestamp': float(int(time.time()))
+    })
+    features['record_id'] = frame_record_ids(features)
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=5.0,
+                        help='Simulated service time per Feature Store call')
+    parser.add_argument('--max-rps', type=float, default=None,
+                        help='Requests per second before calls are throttled')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of calls throttled at random')
+    args = parser.parse_args()
+
+    store = LocalFeatureStore(latency=args.latency_ms / 1000, max_requests_per_second=args.max_rps,
+                              throttle_rate=args.throttle_rate, seed=0)
+    s3 = LocalS3()
+    features = synthetic_features(args.rows)
+
+    writer = FeatureStoreWriter(store, FEATURE_GROUP, max_workers=args.workers,
+                                base_delay=0.05, max_delay=1.0)
+    start = time.perf_counter()
+    summary = writer.write(features)
+    elapsed = time.perf_counter() - start
+    print(f"ingest    {summary['successful']:>7} records  {elapsed:7.2f} s  "
+          f"{summary['successful'] / elapsed:9.1f} records/s  "
+          f"throttled {summary['throttled']}  attempts {summary['attempts']}  failed {summary['failed']}")
+
+    pipeline = TrainingPipeline(store.table_name(FEATURE_GROUP), 'benchmark-bucket',
+                                athena_client=LocalAthena(store, s3), s3_client=s3)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            df = pipeline.prepare_training_data()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    print(f"training  {len(df):>7} rows     {elapsed:7.2f} s  {len(df) / elapsed:9.1f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
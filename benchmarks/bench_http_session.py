@@ -0,0 +1,92 @@
+# benchmarks/bench_http_session.py
+"""Compare per-city fetch latency of bare requests.get against the pooled session.
+
+Starts a local HTTP/1.1 stub that serves Visual Crossing and WAQI shaped
+responses, then fetches weather + air quality for N cities both ways.
+
+    python benchmarks/bench_http_session.py --cities 50 --delay-ms 5
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'src'))
+
+from pipelines.http_session import create_session, get_timeout
+
+WEATHER_BODY = json.dumps({'days': [{'datetime': '2024-01-20', 'temp': 72,
+                                     'humidity': 65, 'conditions': 'Clear'}]}).encode()
+AIR_QUALITY_BODY = json.dumps({'data': {'time': {'s': '2024-01-20 00:00:00'},
+                                        'iaqi': {'pm25': {'v': 35}}}}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    delay = 0.0
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubHandler.lock:
+            StubHandler.connections += 1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = WEATHER_BODY if '/timeline/' in self.path else AIR_QUALITY_BODY
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fetch_city(get, base_url: str, city: str) -> float:
+    start = time.perf_counter()
+    get(f'{base_url}/timeline/{city}/today', params={'key': 'x'}, timeout=get_timeout()).json()
+    get(f'{base_url}/feed/{city}/', params={'token': 'x'}, timeout=get_timeout()).json()
+    return time.perf_counter() - start
+
+
+def run(label: str, get, base_url: str, cities: int) -> None:
+    StubHandler.connections = 0
+    latencies = [fetch_city(get, base_url, f'city-{i}') for i in range(cities)]
+    print(f"{label:<14} mean {statistics.mean(latencies) * 1000:7.2f} ms/city  "
+          f"p95 {sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000:7.2f} ms  "
+          f"connections {StubHandler.connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cities', type=int, default=50)
+    parser.add_argument('--delay-ms', type=float, default=0.0,
+                        help='Simulated server processing time per request')
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    try:
+        run('requests.get', requests.get, base_url, args.cities)
+        session = create_session()
+        run('pooled session', session.get, base_url, args.cities)
+        session.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
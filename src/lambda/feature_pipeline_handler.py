@@ -3,18 +3,36 @@ import os
 import json
 import logging
 from datetime import datetime
-import boto3
 import sys
-import pandas as pd
-import numpy as np
 from pathlib import Path
 
 src_dir = str(Path(__file__).resolve().parents[1])
 sys.path.append(src_dir)
 
+# Only lightweight modules are imported here: this handler turns one JSON
+# response into one record, so pandas/numpy would only add cold-start time
+from pipelines.aws_clients import get_client
+from pipelines.dedup_index import make_record_id
+from pipelines.feature_schema import get_record_encoder
+from pipelines.freshness import bump_freshness_marker_from_env
+from pipelines.http_session import get_session, get_timeout
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Integer codes for Visual Crossing conditions; anything else is stored as 0
+CONDITIONS_MAP = {
+    'Clear': 1,
+    'Partially cloudy': 2,
+    'Rain, Partially cloudy': 3,
+    'Rain': 4,
+    'Overcast': 5,
+    'Rain, Overcast': 6
+}
+
+AIR_QUALITY_PARAMS = ['pm10', 'pm25', 'no2', 'so2', 'co', 'o3']
+FEATURE_GROUP_NAME = 'air-quality-features-08-14-56-40'
+
 def lambda_handler(event, context):
     try:
         # For testing purposes only - hardcode API keys
@@ -28,156 +46,82 @@ def lambda_handler(event, context):
         
         # Fetch weather data directly
         logger.info(f"Fetching weather data for {city}")
-        import requests
-        weather_response = requests.get(
+        session = get_session()
+        weather_response = session.get(
             f'https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{city}/today',
             params={
                 'unitGroup': 'us',
                 'include': 'days',
                 'key': weather_api_key,
                 'contentType': 'json'
-            }
+            },
+            timeout=get_timeout()
         )
         weather_response.raise_for_status()
-        weather_data = pd.DataFrame(weather_response.json()['days'])
-        logger.info(f"Weather data columns: {weather_data.columns.tolist()}")
+        days = weather_response.json()['days']
+        if not days:
+            raise ValueError("Weather API returned no days")
+        weather_day = days[0]
+        logger.info(f"Weather data fields: {list(weather_day)}")
         
         # Fetch air quality data directly
         logger.info(f"Fetching air quality data for {city}")
-        air_quality_response = requests.get(
+        air_quality_response = session.get(
             f'https://api.waqi.info/feed/{city}/',
-            params={'token': air_quality_api_key}
+            params={'token': air_quality_api_key},
+            timeout=get_timeout()
         )
         air_quality_response.raise_for_status()
         
         aq_data = air_quality_response.json()['data']
         iaqi = aq_data['iaqi']
         
-        # Handle missing parameters
-        params = ['pm10', 'pm25', 'no2', 'so2', 'co', 'o3']
-        for param in params:
-            if param not in iaqi:
-                iaqi[param] = {"v": np.nan}
-        
-        air_quality_data = pd.DataFrame({
-            'date': [aq_data['time']['s'][:10]],
-            **{param: [iaqi[param]['v']] for param in params}
-        })
-        logger.info(f"Air quality data columns: {air_quality_data.columns.tolist()}")
-        
         # Process and combine data
         logger.info("Processing features")
         
-        # Rename columns for consistency
-        if 'datetime' in weather_data.columns:
-            weather_data = weather_data.rename(columns={'datetime': 'date'})
+        # Encoder built from the cached Feature Group schema (no describe call when warm)
+        encoder = get_record_encoder(get_client('sagemaker'), FEATURE_GROUP_NAME,
+                                     fill_missing=True, float_precision=2)
+        valid_features = encoder.feature_names
+        logger.info(f"Valid features in Feature Group: {valid_features}")
         
-        # Get the feature definitions from the Feature Group
-        feature_group_name = 'air-quality-features-08-14-56-40'
-        sagemaker_client = boto3.client('sagemaker')
+        # Required features for the Feature Group
+        timestamp = int(datetime.now().timestamp())
+        values = {'event_time': str(timestamp), 'timestamp': str(timestamp)}
         
-        response = sagemaker_client.describe_feature_group(
-            FeatureGroupName=feature_group_name
-        )
+        # The requested weather day is the record's date, as in FeaturePipeline.process_features;
+        # WAQI's station time can still be the previous day just after midnight
+        values['date'] = str(weather_day['datetime'])[:10]
         
-        # Extract feature names from the response
-        valid_features = [feature['FeatureName'] for feature in response['FeatureDefinitions']]
-        logger.info(f"Valid features in Feature Group: {valid_features}")
+        # Weather features, with 'datetime' renamed to 'date' and conditions mapped to codes
+        for name, value in weather_day.items():
+            name = 'date' if name == 'datetime' else name
+            if name == 'conditions' and value is not None:
+                value = CONDITIONS_MAP.get(str(value), 0)
+            values.setdefault(name, value)
         
-        # Create a dictionary to hold feature values (this ensures uniqueness)
-        feature_dict = {}
+        # Air quality features not already present. Missing parameters are left out of the
+        # record rather than filled, so a missing pm25 target never reads as a valid 0
+        for param in AIR_QUALITY_PARAMS:
+            value = iaqi.get(param, {}).get('v')
+            if value is not None:
+                values.setdefault(param, value)
         
-        # Required features for the Feature Group
-        record_id = datetime.now().strftime('%Y%m%d%H%M%S')
-        timestamp = int(datetime.now().timestamp())
+        # Same id for the same city and day, so retries overwrite instead of duplicating
+        values['record_id'] = make_record_id(city, values['date'])
         
-        # Add required features
-        if 'event_time' in valid_features:
-            feature_dict['event_time'] = str(timestamp)
-        
-        if 'record_id' in valid_features:
-            feature_dict['record_id'] = record_id
-        
-        if 'timestamp' in valid_features:
-            feature_dict['timestamp'] = str(timestamp)
-        
-        # Add weather data features
-        if len(weather_data) > 0:
-            for col in weather_data.columns:
-                if col in valid_features:
-                    value = weather_data.iloc[0][col]
-                    if pd.notna(value):
-                        # Handle specific columns that need type conversion
-                        if col in ['precipprob', 'snow', 'snowdepth', 'winddir', 'cloudcover', 'visibility', 'uvindex', 'conditions']:
-                            # Convert to integer
-                            if col == 'conditions':
-                                # Map conditions to integers
-                                conditions_map = {
-                                    'Clear': 1, 
-                                    'Partially cloudy': 2,
-                                    'Rain, Partially cloudy': 3,
-                                    'Rain': 4, 
-                                    'Overcast': 5,
-                                    'Rain, Overcast': 6
-                                }
-                                value = conditions_map.get(str(value), 0)
-                            else:
-                                try:
-                                    value = int(float(value))
-                                except (ValueError, TypeError):
-                                    value = 0
-                        elif col in ['temp', 'humidity', 'precip', 'windspeed', 'tempmax', 'tempmin', 'feelslike', 'feelslikemax', 'feelslikemin', 'dew', 'windgust', 'solarradiation', 'solarenergy', 'moonphase']:
-                            # Convert to float with 2 decimal places
-                            try:
-                                value = round(float(value), 2)
-                            except (ValueError, TypeError):
-                                value = 0.0
-                        
-                        feature_dict[col] = str(value)
-                    else:
-                        # Handle null values based on expected type
-                        if col in ['precipprob', 'snow', 'snowdepth', 'winddir', 'cloudcover', 'visibility', 'uvindex', 'conditions']:
-                            feature_dict[col] = '0'
-                        elif col in ['temp', 'humidity', 'precip', 'windspeed', 'tempmax', 'tempmin', 'feelslike', 'feelslikemax', 'feelslikemin', 'dew', 'windgust', 'solarradiation', 'solarenergy', 'moonphase']:
-                            feature_dict[col] = '0.0'
-                        else:
-                            feature_dict[col] = ''
-
-        # Add air quality data features
-        if len(air_quality_data) > 0:
-            for col in air_quality_data.columns:
-                if col in valid_features and col not in feature_dict:  # Only add if not already present
-                    value = air_quality_data.iloc[0][col]
-                    if pd.notna(value):
-                        if col == 'pm25':
-                            try:
-                                value = int(float(value))
-                            except (ValueError, TypeError):
-                                value = 0
-                        feature_dict[col] = str(value)
-                    else:
-                        feature_dict[col] = ''
-        
-        # Convert dictionary to the required format for PutRecord
-        record = [
-            {
-                'FeatureName': key,
-                'ValueAsString': value
-            }
-            for key, value in feature_dict.items()
-        ]
+        record = encoder.encode_row(values)
         
         # Log the record for debugging
         logger.info(f"Record to be written: {json.dumps(record)}")
         
         # Write to Feature Store
         logger.info("Writing to Feature Store")
-        featurestore_runtime = boto3.client('sagemaker-featurestore-runtime')
-        
-        featurestore_runtime.put_record(
-            FeatureGroupName=feature_group_name,
+        get_client('sagemaker-featurestore-runtime').put_record(
+            FeatureGroupName=FEATURE_GROUP_NAME,
             Record=record
         )
+        bump_freshness_marker_from_env(1)
         
         return {
             'statusCode': 200,
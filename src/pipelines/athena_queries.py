@@ -0,0 +1,165 @@
+# src/pipelines/athena_queries.py
+"""Athena queries polled with exponential backoff, a timeout and cancellation.
+
+``AthenaQueryRunner.run_many`` submits every query first and then polls the
+whole set with ``batch_get_query_execution``, so N queries (e.g. one per city
+or date range) cost one status call per poll instead of N busy loops.
+
+``iter_result_frames`` streams a finished query's CSV from S3 in row chunks,
+so results never go through a local file.
+"""
+import os
+import time
+import random
+import logging
+import pandas as pd
+from typing import Dict, Iterator, List, Optional
+
+from .feature_storage import compact_frame
+from .resilience import Deadline
+
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_DATABASE = 'sagemaker_featurestore'
+
+# Overall time allowed for a query (or a set of queries); override with ATHENA_QUERY_TIMEOUT
+DEFAULT_QUERY_TIMEOUT_SECONDS = 900
+
+# First and largest wait between status polls
+DEFAULT_POLL_INITIAL_SECONDS = 0.25
+DEFAULT_POLL_MAX_SECONDS = 5.0
+
+# Query ids per batch_get_query_execution call (the API maximum)
+STATUS_BATCH_SIZE = 50
+
+TERMINAL_STATES = {'SUCCEEDED', 'FAILED', 'CANCELLED'}
+
+# Rows parsed per chunk when streaming results; override with ATHENA_RESULT_CHUNK_ROWS
+DEFAULT_RESULT_CHUNK_ROWS = 50000
+
+
+class QueryFailed(RuntimeError):
+    """Raised when an Athena query ends in FAILED or CANCELLED."""
+
+
+class QueryTimeout(QueryFailed, TimeoutError):
+    """Raised when queries are still running at the timeout (they are cancelled first)."""
+
+
+def get_query_timeout() -> float:
+    return float(os.getenv('ATHENA_QUERY_TIMEOUT', DEFAULT_QUERY_TIMEOUT_SECONDS))
+
+
+def get_result_chunk_rows() -> int:
+    return max(1, int(os.getenv('ATHENA_RESULT_CHUNK_ROWS', DEFAULT_RESULT_CHUNK_ROWS)))
+
+
+def iter_result_frames(s3_client, location: str, dtypes: Optional[Dict[str, str]] = None,
+                       chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Stream the CSV results at ``location`` (s3://bucket/key) as typed frames.
+
+    Athena quotes every value; columns named in ``dtypes`` are parsed straight
+    into those types, and without ``dtypes`` each chunk goes through
+    ``compact_frame``. Only one chunk of rows is in memory at a time.
+    """
+    bucket, _, key = location[len('s3://'):].partition('/')
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        for chunk in pd.read_csv(body, dtype=dtypes, chunksize=chunksize or get_result_chunk_rows()):
+            yield chunk if dtypes is not None else compact_frame(chunk)
+    finally:
+        body.close()
+
+
+class AthenaQueryRunner:
+    """Starts Athena queries and waits for them without spinning."""
+
+    def __init__(self, athena_client, output_location: str,
+                 database: str = FEATURE_STORE_DATABASE,
+                 timeout: Optional[float] = None,
+                 poll_initial: float = DEFAULT_POLL_INITIAL_SECONDS,
+                 poll_max: float = DEFAULT_POLL_MAX_SECONDS):
+        self.athena = athena_client
+        self.output_location = output_location
+        self.database = database
+        self.timeout = get_query_timeout() if timeout is None else timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+
+    def start(self, query: str) -> str:
+        response = self.athena.start_query_execution(
+            QueryString=query,
+            QueryExecutionContext={'Database': self.database},
+            ResultConfiguration={'OutputLocation': self.output_location}
+        )
+        return response['QueryExecutionId']
+
+    def cancel(self, query_execution_id: str) -> None:
+        try:
+            self.athena.stop_query_execution(QueryExecutionId=query_execution_id)
+        except Exception as e:
+            logger.warning(f"Error cancelling query {query_execution_id}: {str(e)}")
+
+    def _statuses(self, query_execution_ids: List[str]) -> Dict[str, Dict]:
+        executions = {}
+        for start in range(0, len(query_execution_ids), STATUS_BATCH_SIZE):
+            batch = query_execution_ids[start:start + STATUS_BATCH_SIZE]
+            response = self.athena.batch_get_query_execution(QueryExecutionIds=batch)
+            for execution in response['QueryExecutions']:
+                executions[execution['QueryExecutionId']] = execution
+        return executions
+
+    def wait(self, query_execution_ids: List[str]) -> Dict[str, str]:
+        """Wait for every query and return ``{id: result location}``.
+
+        Polls back off from ``poll_initial`` to ``poll_max`` seconds (with
+        jitter). Raises QueryFailed if any query fails, after cancelling the
+        rest, and QueryTimeout if they are not all done within ``timeout``.
+        """
+        deadline = Deadline(self.timeout)
+        pending = list(query_execution_ids)
+        locations = {}
+        delay = self.poll_initial
+        polls = 0
+        while pending:
+            polls += 1
+            for query_id, execution in self._statuses(pending).items():
+                state = execution['Status']['State']
+                if state not in TERMINAL_STATES:
+                    continue
+                pending.remove(query_id)
+                if state != 'SUCCEEDED':
+                    for other in pending:
+                        self.cancel(other)
+                    reason = execution['Status'].get('StateChangeReason', '')
+                    raise QueryFailed(f"Query {query_id} {state}: {reason}".rstrip(': '))
+                locations[query_id] = execution['ResultConfiguration']['OutputLocation']
+            if not pending:
+                break
+            if deadline.expired():
+                for query_id in pending:
+                    self.cancel(query_id)
+                raise QueryTimeout(f"{len(pending)} Athena queries still running after "
+                                   f"{self.timeout:.0f}s; cancelled")
+            time.sleep(min(deadline.remaining(), delay * random.uniform(0.8, 1.0)))
+            delay = min(self.poll_max, delay * 2)
+        logger.info(f"{len(query_execution_ids)} Athena queries finished after {polls} polls")
+        return locations
+
+    def run(self, query: str) -> str:
+        """Run one query and return the S3 location of its CSV results."""
+        query_id = self.start(query)
+        return self.wait([query_id])[query_id]
+
+    def run_many(self, queries: Dict[str, str]) -> Dict[str, str]:
+        """Run named queries concurrently and return ``{name: result location}``."""
+        ids = {}
+        try:
+            for name, query in queries.items():
+                ids[name] = self.start(query)
+        except Exception:
+            for query_id in ids.values():
+                self.cancel(query_id)
+            raise
+        locations = self.wait(list(ids.values()))
+        return {name: locations[query_id] for name, query_id in ids.items()}
@@ -0,0 +1,31 @@
+# src/pipelines/aws_clients.py
+import threading
+import boto3
+
+# One client per service for the life of the process (i.e. across warm invocations)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """Return the process-wide boto3 client for ``service_name``."""
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(service_name)
+                _clients[service_name] = client
+    return client
+
+
+def reset_clients() -> None:
+    """Drop every cached client (used by tests and benchmarks)."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def set_client(service_name: str, client) -> None:
+    """Use ``client`` for ``service_name`` from now on (e.g. a local stand-in)."""
+    with _clients_lock:
+        _clients[service_name] = client
@@ -0,0 +1,253 @@
+# src/pipelines/backfill.py
+"""Resumable historical backfill into the Feature Store.
+
+Splits the input CSVs into chunks, ingests them on a process pool and saves
+a checkpoint after every chunk, so an interrupted run picks up where it
+stopped:
+
+    python -m src.pipelines.backfill \
+        --feature-group air-quality-features-08-14-56-40 \
+        --inputs data/processed_data/merged_la_data.csv data/processed_data/merged25_la_data.csv
+"""
+import os
+import json
+import time
+import argparse
+import logging
+import boto3
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .data_quality import DataQualityProfiler, append_quarantine
+from .dedup_index import DedupIndex, frame_record_ids
+from .feature_store_writer import FeatureStoreWriter
+from .freshness import bump_freshness_marker_from_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 250
+DEFAULT_CHECKPOINT = 'backfill_checkpoint.json'
+
+# Writer used by each worker process, created once by _init_worker
+_writer: Optional[FeatureStoreWriter] = None
+
+# Whether workers profile chunks and hold back bad rows (set by _init_worker)
+_profile_chunks = False
+
+# City used for record ids of inputs without a city column (set by _init_worker)
+_city: Optional[str] = None
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Expand directories to the CSV files they contain, keeping the given order."""
+    paths = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(str(p) for p in sorted(path.glob('*.csv')))
+        else:
+            paths.append(str(path))
+    return paths
+
+
+def iter_chunks(paths: List[str], chunk_size: int) -> Iterator[Tuple[str, int, pd.DataFrame]]:
+    """Yield (chunk_id, first_row_offset, frame) for every chunk of every input."""
+    offset = 0
+    for path in paths:
+        for index, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size)):
+            yield f"{path}:{index}", offset, chunk
+            offset += len(chunk)
+
+
+def prepare_chunk(chunk: pd.DataFrame, offset: int, city: Optional[str] = None) -> pd.DataFrame:
+    """Apply the ingestion prep from the backfill notebook to one chunk.
+
+    Record ids come from city and date when both are known (``city`` covers
+    single-city inputs without a city column); otherwise from the row offset.
+    """
+    chunk = chunk.copy()
+    for column in chunk.columns:
+        if chunk[column].dtype == 'object':
+            chunk[column] = chunk[column].astype('str').astype('string')
+    if 'timestamp' not in chunk.columns:
+        chunk['timestamp'] = pd.Series([int(round(time.time()))] * len(chunk),
+                                       index=chunk.index, dtype='float64')
+    if 'record_id' not in chunk.columns:
+        if 'date' in chunk.columns and ('city' in chunk.columns or city):
+            keys = chunk if 'city' in chunk.columns else chunk.assign(city=city)
+            chunk['record_id'] = frame_record_ids(keys)
+        else:
+            chunk['record_id'] = [str(offset + i) for i in range(len(chunk))]
+    return chunk
+
+
+class BackfillCheckpoint:
+    """JSON checkpoint of the chunks that were fully ingested."""
+
+    def __init__(self, path: str, inputs: List[str], chunk_size: int):
+        self.path = path
+        self.state = {'inputs': inputs, 'chunk_size': chunk_size, 'completed': {}}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('inputs') != inputs or saved.get('chunk_size') != chunk_size:
+                raise ValueError(f"Checkpoint {path} was written for different inputs or chunk size; "
+                                 f"remove it to start a new backfill")
+            self.state = saved
+            logger.info(f"Resuming backfill: {len(self.completed)} chunks already ingested")
+
+    @property
+    def completed(self) -> Dict[str, Dict]:
+        return self.state['completed']
+
+    def mark_completed(self, chunk_id: str, records: int) -> None:
+        self.completed[chunk_id] = {'records': records, 'completed_at': time.time()}
+        self.save()
+
+    def save(self) -> None:
+        # Write to a temporary file first so a crash never leaves a torn checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _init_worker(feature_group_name: str, write_workers: int, profile_chunks: bool = False,
+                 city: Optional[str] = None, dedup_index_path: Optional[str] = None) -> None:
+    global _writer, _profile_chunks, _city
+    dedup_index = DedupIndex(dedup_index_path) if dedup_index_path else None
+    _writer = FeatureStoreWriter(boto3.client('sagemaker-featurestore-runtime'),
+                                 feature_group_name, max_workers=write_workers,
+                                 dedup_index=dedup_index)
+    _profile_chunks = profile_chunks
+    _city = city
+
+
+def _ingest_chunk(chunk_id: str, offset: int,
+                  chunk: pd.DataFrame) -> Tuple[str, Dict, Optional[DataQualityProfiler], pd.DataFrame]:
+    """Write one chunk; when profiling, bad rows are returned instead of written."""
+    chunk = prepare_chunk(chunk, offset, _city)
+    profiler, quarantined = None, chunk.iloc[:0]
+    if _profile_chunks:
+        profiler = DataQualityProfiler()
+        chunk, quarantined = profiler.split(chunk)
+    return chunk_id, _writer.write(chunk), profiler, quarantined
+
+
+def run_backfill(inputs: List[str], feature_group_name: str,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, processes: Optional[int] = None,
+                 write_workers: int = 4, checkpoint_path: str = DEFAULT_CHECKPOINT,
+                 quarantine_path: Optional[str] = None, city: Optional[str] = None,
+                 dedup_index_path: Optional[str] = None) -> Dict:
+    """Ingest every chunk not yet in the checkpoint and return run statistics.
+
+    With ``processes=1`` the chunks are ingested in the calling process. With
+    ``quarantine_path`` every chunk is profiled first; rows failing the data
+    quality checks are held back and appended to that CSV, tagged with their
+    ``chunk_id``, once the chunk is checkpointed (so a retried chunk does not
+    quarantine its rows twice). The combined profile is returned under
+    ``stats['quality']``. With
+    ``dedup_index_path`` (a local SQLite file shared by the worker processes)
+    records already written with the same content are skipped.
+    """
+    if dedup_index_path and dedup_index_path.startswith('s3://'):
+        raise ValueError("The backfill dedup index must be a local path; "
+                         "rebuild or copy it from S3 with dedup_index first")
+    paths = expand_inputs(inputs)
+    checkpoint = BackfillCheckpoint(checkpoint_path, paths, chunk_size)
+    processes = processes or os.cpu_count() or 1
+
+    stats = {'records': 0, 'failed_records': 0, 'duplicate_records': 0,
+             'chunks': 0, 'skipped_chunks': 0, 'failed_chunks': []}
+    start = time.perf_counter()
+
+    profiler = DataQualityProfiler() if quarantine_path else None
+
+    def record_result(chunk_id: str, summary: Dict, chunk_profile: Optional[DataQualityProfiler],
+                      quarantined: pd.DataFrame) -> None:
+        if profiler is not None:
+            profiler.merge(chunk_profile)
+        stats['records'] += summary['successful']
+        stats['failed_records'] += summary['failed']
+        stats['duplicate_records'] += summary['skipped']
+        stats['chunks'] += 1
+        if summary['failed']:
+            # Left out of the checkpoint so that the next run retries the chunk
+            stats['failed_chunks'].append(chunk_id)
+            logger.error(f"Chunk {chunk_id}: {summary['failed']} records failed")
+        else:
+            checkpoint.mark_completed(chunk_id, summary['successful'])
+            if profiler is not None:
+                append_quarantine(quarantined.assign(chunk_id=chunk_id), quarantine_path)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Chunk {chunk_id} done: {stats['records']} records in {elapsed:.1f}s "
+                    f"({stats['records'] / elapsed:.1f} records/s)")
+
+    def pending_chunks() -> Iterator[Tuple[str, int, pd.DataFrame]]:
+        for chunk_id, offset, chunk in iter_chunks(paths, chunk_size):
+            if chunk_id in checkpoint.completed:
+                stats['skipped_chunks'] += 1
+                continue
+            yield chunk_id, offset, chunk
+
+    if processes <= 1:
+        _init_worker(feature_group_name, write_workers, profiler is not None, city, dedup_index_path)
+        for chunk_id, offset, chunk in pending_chunks():
+            record_result(*_ingest_chunk(chunk_id, offset, chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(feature_group_name, write_workers,
+                                           profiler is not None, city,
+                                           dedup_index_path)) as executor:
+            in_flight = set()
+            for chunk_id, offset, chunk in pending_chunks():
+                # Bound the chunks held in memory to two per process
+                if len(in_flight) >= processes * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record_result(*future.result())
+                in_flight.add(executor.submit(_ingest_chunk, chunk_id, offset, chunk))
+            for future in wait(in_flight).done:
+                record_result(*future.result())
+
+    if profiler is not None:
+        stats['quality'] = profiler.report()
+        stats['quarantined_records'] = stats['quality']['quarantined_rows']
+    bump_freshness_marker_from_env(stats['records'])
+    stats['elapsed_seconds'] = time.perf_counter() - start
+    stats['records_per_second'] = stats['records'] / stats['elapsed_seconds'] if stats['elapsed_seconds'] else 0.0
+    logger.info(f"Backfill finished: {stats['records']} records, {stats['chunks']} chunks "
+                f"({stats['skipped_chunks']} skipped) at {stats['records_per_second']:.1f} records/s")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumable Feature Store backfill')
+    parser.add_argument('--feature-group', type=str, required=True)
+    parser.add_argument('--inputs', nargs='+', default=['data/processed_data/merged_la_data.csv'])
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--write-workers', type=int, default=4,
+                        help='Concurrent put_record calls per process')
+    parser.add_argument('--checkpoint', type=str, default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--city', type=str, default=None,
+                        help='City for record ids when the inputs have no city column')
+    parser.add_argument('--dedup-index', type=str, default=None,
+                        help='Local SQLite dedup index; records already written are skipped')
+    parser.add_argument('--quarantine', type=str, default=None,
+                        help='Profile each chunk and append rows failing quality checks to this CSV')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = run_backfill(args.inputs, args.feature_group, chunk_size=args.chunk_size,
+                         processes=args.processes, write_workers=args.write_workers,
+                         checkpoint_path=args.checkpoint, quarantine_path=args.quarantine,
+                         city=args.city, dedup_index_path=args.dedup_index)
+    print(json.dumps(stats, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# src/pipelines/data_quality.py
+"""Single-pass data quality profiling with row-level quarantine.
+
+``DataQualityProfiler`` checks every configured column in one vectorized
+pass over a float matrix: null counts, out-of-range counts with the offending
+row labels, and min/max/mean. Profiles accumulate across chunks, so a large
+backfill can be profiled batch by batch, and bad rows are split off for
+quarantine instead of failing the whole batch.
+"""
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Inclusive bounds per column; None leaves that side open
+VALUE_RANGES = {
+    'temp': (-50, 150),
+    'humidity': (0, 100),
+    'precip': (0, None),
+    'windspeed': (0, None),
+    'cloudcover': (0, 100),
+    'visibility': (0, None),
+    'solarradiation': (0, None),
+    'conditions': (1, 6),
+    'pm25': (0, 500)
+}
+
+# Columns a row cannot be written without
+REQUIRED_COLUMNS = ['pm25']
+
+# Row labels kept per column in the report; the counts are always exact
+DEFAULT_MAX_BAD_ROWS = 50
+
+
+class DataQualityProfiler:
+    """Accumulates per-column quality statistics over one or more batches."""
+
+    def __init__(self, ranges: Optional[Dict[str, Tuple]] = None,
+                 required: Optional[List[str]] = None,
+                 max_bad_rows: int = DEFAULT_MAX_BAD_ROWS):
+        self.ranges = VALUE_RANGES if ranges is None else ranges
+        self.required = REQUIRED_COLUMNS if required is None else required
+        self.max_bad_rows = max_bad_rows
+        self.rows = 0
+        self.quarantined_rows = 0
+        self.columns: Dict[str, Dict] = {}
+
+    def _column(self, name: str) -> Dict:
+        return self.columns.setdefault(name, {
+            'nulls': 0, 'out_of_range': 0, 'count': 0, 'sum': 0.0,
+            'min': None, 'max': None, 'bad_rows': []
+        })
+
+    def profile(self, df: pd.DataFrame) -> np.ndarray:
+        """Add ``df`` to the profile and return a boolean mask of its bad rows.
+
+        A row is bad when a required column is null or a checked column is
+        out of range; nulls in optional columns are counted but tolerated.
+        """
+        checked = [column for column in self.ranges if column in df.columns]
+        missing_required = [column for column in self.required if column not in df.columns]
+        if missing_required:
+            raise ValueError(f"Missing required columns: {missing_required}")
+
+        values = df[checked].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        lower = np.array([np.nan if self.ranges[c][0] is None else self.ranges[c][0] for c in checked])
+        upper = np.array([np.nan if self.ranges[c][1] is None else self.ranges[c][1] for c in checked])
+
+        nulls = np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            out_of_range = (values < lower) | (values > upper)
+
+        required = np.array([c in self.required for c in checked], dtype=bool)
+
+        counts = (~nulls).sum(axis=0)
+        sums = np.where(nulls, 0.0, values).sum(axis=0)
+        mins = np.where(nulls, np.inf, values).min(axis=0, initial=np.inf)
+        maxs = np.where(nulls, -np.inf, values).max(axis=0, initial=-np.inf)
+        failing = out_of_range | (nulls & required)
+
+        labels = df.index
+        for i, column in enumerate(checked):
+            stats = self._column(column)
+            stats['nulls'] += int(nulls[:, i].sum())
+            stats['out_of_range'] += int(out_of_range[:, i].sum())
+            stats['count'] += int(counts[i])
+            stats['sum'] += float(sums[i])
+            if counts[i]:
+                stats['min'] = float(mins[i]) if stats['min'] is None else min(stats['min'], float(mins[i]))
+                stats['max'] = float(maxs[i]) if stats['max'] is None else max(stats['max'], float(maxs[i]))
+            room = self.max_bad_rows - len(stats['bad_rows'])
+            if room > 0 and failing[:, i].any():
+                stats['bad_rows'].extend(labels[failing[:, i]][:room].tolist())
+
+        bad = failing.any(axis=1)
+        self.rows += len(df)
+        self.quarantined_rows += int(bad.sum())
+        return bad
+
+    def split(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Profile ``df`` and return (clean rows, quarantined rows)."""
+        bad = self.profile(df)
+        return df[~bad], df[bad]
+
+    def merge(self, other: 'DataQualityProfiler') -> None:
+        """Fold another profiler's totals into this one (e.g. from a worker process)."""
+        self.rows += other.rows
+        self.quarantined_rows += other.quarantined_rows
+        for column, theirs in other.columns.items():
+            ours = self._column(column)
+            for key in ('nulls', 'out_of_range', 'count', 'sum'):
+                ours[key] += theirs[key]
+            for key, pick in (('min', min), ('max', max)):
+                if theirs[key] is not None:
+                    ours[key] = theirs[key] if ours[key] is None else pick(ours[key], theirs[key])
+            ours['bad_rows'] = (ours['bad_rows'] + theirs['bad_rows'])[:self.max_bad_rows]
+
+    def report(self) -> Dict:
+        """One compact summary of everything profiled so far."""
+        columns = {}
+        for column, stats in self.columns.items():
+            columns[column] = {
+                'nulls': stats['nulls'],
+                'out_of_range': stats['out_of_range'],
+                'min': stats['min'],
+                'max': stats['max'],
+                'mean': stats['sum'] / stats['count'] if stats['count'] else None,
+                'bad_rows': stats['bad_rows']
+            }
+        return {
+            'rows': self.rows,
+            'clean_rows': self.rows - self.quarantined_rows,
+            'quarantined_rows': self.quarantined_rows,
+            'passed': self.quarantined_rows == 0,
+            'columns': columns
+        }
+
+
+def append_quarantine(rows: pd.DataFrame, path: str) -> None:
+    """Append quarantined rows to a CSV file, writing the header once."""
+    if rows.empty:
+        return
+    rows.to_csv(path, mode='a', header=not os.path.exists(path), index_label='row')
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], quarantine_path: Optional[str] = None,
+                   profiler: Optional[DataQualityProfiler] = None) -> Dict:
+    """Profile a stream of chunks, quarantining bad rows, and return the report."""
+    profiler = profiler or DataQualityProfiler()
+    for chunk in chunks:
+        _, quarantined = profiler.split(chunk)
+        if quarantine_path:
+            append_quarantine(quarantined, quarantine_path)
+    report = profiler.report()
+    logger.info(f"Data quality report: {json.dumps(report, default=str)}")
+    return report
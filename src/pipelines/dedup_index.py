@@ -0,0 +1,227 @@
+# src/pipelines/dedup_index.py
+"""Deterministic record ids and a local index of records already written.
+
+Every record for a city and observation date gets the same ``record_id``
+(``los-angeles:2024-01-20``), so re-runs and retries address the same record
+instead of adding new ones. ``DedupIndex`` remembers, in a small SQLite file,
+which ids were written and a fingerprint of their content; the writer checks
+it first and skips records whose content it has already sent. The file can
+live on local disk or be synced to S3, and can be rebuilt from the offline
+store:
+
+    python -m src.pipelines.dedup_index rebuild --index dedup_index.sqlite \
+        --table air_quality_features_08_14_56_40_1744124210 --bucket my-bucket
+
+Only the standard library is imported at module level, so the lightweight
+Lambda handler can use ``make_record_id`` without loading pandas.
+"""
+import os
+import re
+import csv
+import json
+import codecs
+import sqlite3
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every run without the observation itself changing
+VOLATILE_FEATURES = {'timestamp', 'event_time'}
+
+# Ids looked up per SQLite query (well under its bound-parameter limit)
+LOOKUP_BATCH_SIZE = 500
+
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', str(value).strip().lower()).strip('-')
+
+
+def make_record_id(city: str, observation_date) -> str:
+    """Record id for one city and day, e.g. ``los-angeles:2024-01-20``."""
+    return f"{_slug(city)}:{str(observation_date)[:10]}"
+
+
+def frame_record_ids(features):
+    """Vectorized ``make_record_id`` over a frame's ``city`` and ``date`` columns."""
+    cities = (features['city'].astype(str).str.strip().str.lower()
+              .str.replace(r'[^a-z0-9]+', '-', regex=True).str.strip('-'))
+    return cities + ':' + features['date'].astype(str).str[:10]
+
+
+def record_fingerprint(record: List[Dict[str, str]]) -> str:
+    """Content hash of a serialized record, ignoring volatile fields."""
+    values = sorted((f['FeatureName'], f['ValueAsString']) for f in record
+                    if f['FeatureName'] not in VOLATILE_FEATURES)
+    return hashlib.sha1(json.dumps(values).encode('utf-8')).hexdigest()
+
+
+def record_identifier(record: List[Dict[str, str]]) -> Optional[str]:
+    for feature in record:
+        if feature['FeatureName'] == 'record_id':
+            return feature['ValueAsString']
+    return None
+
+
+class DedupIndex:
+    """SQLite-backed set of (record_id, fingerprint) pairs already written.
+
+    ``location`` is a local path or an ``s3://bucket/key`` URI; an S3 index
+    is downloaded to a temporary file on open and uploaded again by sync().
+    A NULL fingerprint (from a rebuild) means "written, content unknown"
+    and is treated as a match.
+    """
+
+    def __init__(self, location: str, s3_client=None):
+        self.location = location
+        self._s3 = s3_client
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        if location.startswith('s3://'):
+            self.bucket, _, self.key = location[len('s3://'):].partition('/')
+            handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(handle)
+            try:
+                self.s3.download_file(self.bucket, self.key, self.path)
+            except Exception as e:
+                logger.info(f"Starting a new dedup index at {location} ({str(e)})")
+                os.remove(self.path)
+        else:
+            self.path = location
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS written ('
+            'record_id TEXT PRIMARY KEY, fingerprint TEXT, written_at REAL) WITHOUT ROWID'
+        )
+        self.connection.commit()
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            from .aws_clients import get_client
+            self._s3 = get_client('s3')
+        return self._s3
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM written').fetchone()[0]
+
+    def seen(self, fingerprints: Dict[str, str]) -> Set[str]:
+        """Return the ids in ``{record_id: fingerprint}`` already written with that content."""
+        ids = list(fingerprints)
+        stored = {}
+        with self._lock:
+            for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+                batch = ids[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                stored.update(self.connection.execute(
+                    f'SELECT record_id, fingerprint FROM written WHERE record_id IN ({placeholders})',
+                    batch
+                ).fetchall())
+        return {record_id for record_id, fingerprint in stored.items()
+                if fingerprint is None or fingerprint == fingerprints[record_id]}
+
+    def mark_written(self, fingerprints: Dict[str, Optional[str]]) -> None:
+        if not fingerprints:
+            return
+        now = time.time()
+        with self._lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO written (record_id, fingerprint, written_at) VALUES (?, ?, ?)',
+                [(record_id, fingerprint, now) for record_id, fingerprint in fingerprints.items()]
+            )
+            self.connection.commit()
+            self._dirty = True
+
+    def sync(self) -> None:
+        """Upload an S3-backed index if anything changed; no-op for local files."""
+        if not self.location.startswith('s3://') or not self._dirty:
+            return
+        with self._lock:
+            self.s3.upload_file(self.path, self.bucket, self.key)
+            self._dirty = False
+
+    def close(self) -> None:
+        self.sync()
+        self.connection.close()
+        if self.location.startswith('s3://') and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def rebuild(self, record_ids: Iterable[str]) -> int:
+        """Replace the index contents with ``record_ids`` (fingerprints unknown)."""
+        with self._lock:
+            self.connection.execute('DELETE FROM written')
+            self.connection.commit()
+            self._dirty = True
+        count = 0
+        batch: Dict[str, Optional[str]] = {}
+        for record_id in record_ids:
+            batch[record_id] = None
+            if len(batch) >= LOOKUP_BATCH_SIZE:
+                self.mark_written(batch)
+                count += len(batch)
+                batch = {}
+        self.mark_written(batch)
+        return count + len(batch)
+
+
+def iter_offline_record_ids(training_pipeline) -> Iterable[str]:
+    """Stream the distinct record ids in the offline store through Athena."""
+    location = training_pipeline.run_query(
+        f'SELECT DISTINCT record_id FROM "{training_pipeline.feature_group_table_name}" '
+        f'WHERE record_id IS NOT NULL'
+    )
+    if location is None:
+        raise RuntimeError("Athena query for offline store record ids failed")
+    bucket, _, key = location[len('s3://'):].partition('/')
+    body = training_pipeline.s3.get_object(Bucket=bucket, Key=key)['Body']
+    reader = csv.reader(codecs.iterdecode(body.iter_lines(), 'utf-8'))
+    next(reader, None)  # header
+    for row in reader:
+        if row:
+            yield row[0]
+
+
+def rebuild_from_offline_store(index: DedupIndex, training_pipeline) -> int:
+    """Rebuild ``index`` from the ids already in the offline store."""
+    count = index.rebuild(iter_offline_record_ids(training_pipeline))
+    index.sync()
+    logger.info(f"Rebuilt dedup index {index.location} with {count} record ids")
+    return count
+
+
+def open_dedup_index_from_env() -> Optional[DedupIndex]:
+    """Open the index at DEDUP_INDEX (path or s3:// URI); None when unset."""
+    location = os.getenv('DEDUP_INDEX')
+    return DedupIndex(location) if location else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the Feature Store dedup index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebuild = subparsers.add_parser('rebuild', help='Rebuild the index from the offline store')
+    rebuild.add_argument('--index', type=str, required=True, help='Local path or s3:// URI')
+    rebuild.add_argument('--table', type=str, required=True, help='Offline store Glue table')
+    rebuild.add_argument('--bucket', type=str, required=True, help='Bucket for Athena results')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from .training_pipeline import TrainingPipeline
+
+    index = DedupIndex(args.index)
+    try:
+        count = rebuild_from_offline_store(index, TrainingPipeline(args.table, args.bucket))
+    finally:
+        index.close()
+    print(f"Indexed {count} record ids")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+# src/pipelines/drift.py
+"""Constant-memory feature sketches for drift detection.
+
+Each feature is summarised by a ``FeatureSketch``: counts over fixed bin
+edges plus streaming moments (count, mean, M2, min, max, nulls). Sketches
+with the same edges merge exactly, so the feature pipeline can fold every run
+into a small JSON state file and compare it with a baseline built from
+``train.csv`` in time proportional to the number of bins, not rows. The state
+keeps one sketch per day for the last ``window_days`` days only, so a shift
+moves the scores as much in a year as it does in the first week. Features
+with too few values in the window to fill the bins are reported as
+insufficient data rather than scored:
+
+    python -m src.pipelines.drift baseline --train data/processed_data/train.csv \
+        --output drift_baseline.json
+    python -m src.pipelines.drift compare --baseline drift_baseline.json \
+        --state s3://bucket/monitoring/drift_state.json
+"""
+import os
+import json
+import argparse
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from .feature_storage import read_features
+from .state_store import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+# Model inputs and the target
+DRIFT_FEATURES = ['temp', 'humidity', 'precip', 'windspeed', 'conditions',
+                  'cloudcover', 'visibility', 'solarradiation', 'pm25']
+
+DEFAULT_BINS = 20
+
+# PSI above this is treated as a significant shift (0.1-0.2 is usually "moderate")
+PSI_DRIFT_THRESHOLD = 0.2
+
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+# Days of runs compared with the baseline; override with DRIFT_WINDOW_DAYS
+DEFAULT_DRIFT_WINDOW_DAYS = 7
+
+# Fewer values than this leave most bins empty, which inflates PSI on any sample;
+# such features are reported as insufficient data instead. Override with DRIFT_MIN_SAMPLES
+DEFAULT_MIN_DRIFT_SAMPLES = 5 * DEFAULT_BINS
+
+
+def get_min_drift_samples() -> int:
+    return int(os.getenv('DRIFT_MIN_SAMPLES', DEFAULT_MIN_DRIFT_SAMPLES))
+
+
+class FeatureSketch:
+    """Fixed-edge histogram plus moments for one feature.
+
+    Values below the first edge or above the last land in two open-ended
+    outer bins, so the sketch never needs to grow.
+    """
+
+    def __init__(self, edges: List[float]):
+        self.edges = np.asarray(edges, dtype='float64')
+        self.counts = np.zeros(len(self.edges) + 1, dtype='int64')
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.nulls = 0
+
+    def update(self, values) -> None:
+        values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        nulls = np.isnan(values)
+        values = values[~nulls]
+        self.nulls += int(nulls.sum())
+        if not len(values):
+            return
+
+        bins = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+        other = FeatureSketch(self.edges)
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min, other.max = float(values.min()), float(values.max())
+        self._merge_moments(other)
+
+    def _merge_moments(self, other: 'FeatureSketch') -> None:
+        # Chan et al. parallel update of count, mean and sum of squared deviations
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def merge(self, other: 'FeatureSketch') -> None:
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge sketches with different bin edges")
+        self.counts += other.counts
+        self.nulls += other.nulls
+        self._merge_moments(other)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist(),
+                'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max, 'nulls': self.nulls}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'FeatureSketch':
+        sketch = cls(state['edges'])
+        sketch.counts = np.asarray(state['counts'], dtype='int64')
+        for key in ('count', 'mean', 'm2', 'min', 'max', 'nulls'):
+            setattr(sketch, key, state[key])
+        return sketch
+
+
+def quantile_edges(values, bins: int = DEFAULT_BINS) -> List[float]:
+    """Bin edges at the baseline's quantiles, so each bin starts roughly equally full."""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+    if values.empty:
+        return [0.0]
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+    return edges.tolist() or [float(values.iloc[0])]
+
+
+def psi(expected: FeatureSketch, actual: FeatureSketch) -> float:
+    """Population stability index between two sketches' bin distributions."""
+    p = np.maximum(expected.counts / max(expected.counts.sum(), 1), PSI_EPSILON)
+    q = np.maximum(actual.counts / max(actual.counts.sum(), 1), PSI_EPSILON)
+    return float(((q - p) * np.log(q / p)).sum())
+
+
+def ks_statistic(expected: FeatureSketch, actual: FeatureSketch) -> float:
+    """Largest gap between the binned CDFs (a bin-resolution KS statistic)."""
+    p = np.cumsum(expected.counts) / max(expected.counts.sum(), 1)
+    q = np.cumsum(actual.counts) / max(actual.counts.sum(), 1)
+    return float(np.abs(p - q).max())
+
+
+class SketchSet:
+    """One sketch per feature, saved together as a small JSON document."""
+
+    def __init__(self, sketches: Dict[str, FeatureSketch]):
+        self.sketches = sketches
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features: Optional[List[str]] = None,
+                   bins: int = DEFAULT_BINS) -> 'SketchSet':
+        """Build a baseline whose bin edges come from ``df`` itself."""
+        features = [f for f in (features or DRIFT_FEATURES) if f in df.columns]
+        sketches = {}
+        for feature in features:
+            sketches[feature] = FeatureSketch(quantile_edges(df[feature], bins))
+            sketches[feature].update(df[feature])
+        return cls(sketches)
+
+    def empty_like(self) -> 'SketchSet':
+        """A set with the same edges and no data, ready to collect new values."""
+        return SketchSet({name: FeatureSketch(s.edges) for name, s in self.sketches.items()})
+
+    def update(self, df: pd.DataFrame) -> None:
+        with self._lock:
+            for feature, sketch in self.sketches.items():
+                if feature in df.columns:
+                    sketch.update(df[feature])
+
+    def merge(self, other: 'SketchSet') -> None:
+        with self._lock:
+            for feature, sketch in other.sketches.items():
+                if feature in self.sketches:
+                    self.sketches[feature].merge(sketch)
+                else:
+                    self.sketches[feature] = FeatureSketch.from_dict(sketch.to_dict())
+
+    def compare(self, baseline: 'SketchSet', min_samples: Optional[int] = None) -> Dict[str, Dict]:
+        """PSI, binned KS and mean shift (in baseline standard deviations) per feature.
+
+        Features with fewer than ``min_samples`` values get no PSI or KS score
+        and are marked ``insufficient_data`` rather than drifted.
+        """
+        min_samples = get_min_drift_samples() if min_samples is None else min_samples
+        report = {}
+        for feature, expected in baseline.sketches.items():
+            actual = self.sketches.get(feature)
+            if actual is None or not actual.count:
+                continue
+            insufficient = actual.count < min_samples
+            score = None if insufficient else psi(expected, actual)
+            report[feature] = {
+                'psi': score,
+                'ks': None if insufficient else ks_statistic(expected, actual),
+                'mean_shift': ((actual.mean - expected.mean) / expected.std
+                               if expected.std else 0.0),
+                'count': actual.count,
+                'insufficient_data': insufficient,
+                'drifted': not insufficient and score > PSI_DRIFT_THRESHOLD
+            }
+        return report
+
+    def to_dict(self) -> Dict:
+        return {name: sketch.to_dict() for name, sketch in self.sketches.items()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'SketchSet':
+        return cls({name: FeatureSketch.from_dict(s) for name, s in state.items()})
+
+
+def load_sketches(location: str) -> Optional[SketchSet]:
+    """Load a sketch set from a local path or s3:// URI; None if it does not exist."""
+    state = load_json_state(location)
+    return None if state is None else SketchSet.from_dict(state)
+
+
+def save_sketches(sketches: SketchSet, location: str) -> None:
+    """Write a sketch set to a local path (atomically) or an s3:// URI."""
+    save_json_state(sketches.to_dict(), location)
+
+
+def merge_window(baseline: SketchSet, days: Dict[str, Dict]) -> SketchSet:
+    """Merge the daily sketches of a drift state; days with stale bin edges are skipped."""
+    window = baseline.empty_like()
+    for day, state in sorted(days.items()):
+        try:
+            window.merge(SketchSet.from_dict(state))
+        except ValueError:
+            logger.warning(f"Skipping drift sketches for {day}: baseline bin edges changed")
+    return window
+
+
+def load_drift_window(location: str, baseline: SketchSet) -> Optional[SketchSet]:
+    """The windowed sketches stored at ``location``, merged; None if there is no state yet."""
+    state = load_json_state(location)
+    if state is None:
+        return None
+    return merge_window(baseline, state.get('days', {}))
+
+
+class DriftMonitor:
+    """Keeps a sketch per day for the last ``window_days`` days and scores that window against the baseline."""
+
+    def __init__(self, baseline: SketchSet, state_location: str,
+                 window_days: int = DEFAULT_DRIFT_WINDOW_DAYS):
+        if window_days < 1:
+            raise ValueError("window_days must be at least 1")
+        self.baseline = baseline
+        self.state_location = state_location
+        self.window_days = window_days
+        self.pending = baseline.empty_like()
+
+    def update(self, features: pd.DataFrame) -> None:
+        """Add processed features from this run; nothing is written until save()."""
+        self.pending.update(features)
+
+    def save(self, day: Optional[date] = None) -> Dict[str, Dict]:
+        """Fold this run into the sketch of ``day`` (today) and return the window's drift scores.
+
+        Days that have left the window are dropped before the state is written back.
+        """
+        if not any(sketch.count or sketch.nulls for sketch in self.pending.sketches.values()):
+            return {}
+        day = day or date.today()
+        key = day.isoformat()
+        state = load_json_state(self.state_location) or {}
+        if state and 'days' not in state:
+            logger.warning("Replacing the cumulative drift state with a daily window")
+        days = state.get('days', {})
+
+        sketches = merge_window(self.baseline, {key: days[key]} if key in days else {})
+        sketches.merge(self.pending)
+        days[key] = sketches.to_dict()
+        # ISO dates compare in calendar order
+        oldest = (day - timedelta(days=self.window_days - 1)).isoformat()
+        days = {key: value for key, value in days.items() if key >= oldest}
+
+        save_json_state({'window_days': self.window_days, 'days': days}, self.state_location)
+        self.pending = self.baseline.empty_like()
+        return merge_window(self.baseline, days).compare(self.baseline)
+
+
+def build_drift_monitor_from_env() -> Optional[DriftMonitor]:
+    """Create the monitor configured by DRIFT_BASELINE and DRIFT_STATE (path or s3:// URI).
+
+    Returns None (no drift tracking) unless both are set and the baseline exists.
+    """
+    baseline_location = os.getenv('DRIFT_BASELINE')
+    state_location = os.getenv('DRIFT_STATE')
+    if not baseline_location or not state_location:
+        return None
+    try:
+        baseline = load_sketches(baseline_location)
+    except Exception as e:
+        logger.warning(f"Error loading drift baseline {baseline_location}: {str(e)}")
+        return None
+    if baseline is None:
+        logger.warning(f"Drift baseline {baseline_location} not found; drift tracking disabled")
+        return None
+    window_days = int(os.getenv('DRIFT_WINDOW_DAYS', DEFAULT_DRIFT_WINDOW_DAYS))
+    return DriftMonitor(baseline, state_location, window_days=window_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feature drift baseline and comparison')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    baseline = subparsers.add_parser('baseline', help='Build a baseline from training data')
+    baseline.add_argument('--train', type=str, default='data/processed_data/train.csv')
+    baseline.add_argument('--output', type=str, default='drift_baseline.json')
+    baseline.add_argument('--bins', type=int, default=DEFAULT_BINS)
+
+    compare = subparsers.add_parser('compare', help='Score the stored state against a baseline')
+    compare.add_argument('--baseline', type=str, required=True)
+    compare.add_argument('--state', type=str, required=True)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'baseline':
+        train = read_features(args.train, columns=None)
+        save_sketches(SketchSet.from_frame(train, bins=args.bins), args.output)
+        print(f"Baseline with {len(train)} rows written to {args.output}")
+    else:
+        baseline = load_sketches(args.baseline)
+        window = load_drift_window(args.state, baseline)
+        if window is None:
+            raise ValueError(f"No drift state at {args.state}")
+        print(json.dumps(window.compare(baseline), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,81 +1,274 @@
 # src/pipelines/feature_pipeline.py
 import os
+import json
 import time
+import threading
 import logging
 import boto3
 import numpy as np
 import pandas as pd
 import requests
-from datetime import datetime
-from typing import Dict, Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional, List
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
+
+from .data_quality import DataQualityProfiler
+from .dedup_index import frame_record_ids, open_dedup_index_from_env
+from .drift import DriftMonitor, build_drift_monitor_from_env
+from .feature_schema import FeatureRecordEncoder
+from .freshness import bump_freshness_marker_from_env
+from .rolling_features import RollingFeatureEngine
+from .feature_store_writer import FeatureStoreWriter
+from .http_session import get_session, get_timeout
+from .resilience import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, RetryPolicy
+from .response_cache import ResponseCache, build_response_cache_from_env
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+WEATHER_API_URL = 'https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline'
+
+# Days requested per timeline call when fetching a date range
+DEFAULT_WEATHER_WINDOW_DAYS = 92
+
+# Types of the daily weather fields, shared by the API and the raw CSV exports
+WEATHER_NUMERIC_COLUMNS = [
+    'tempmax', 'tempmin', 'temp', 'feelslikemax', 'feelslikemin', 'feelslike',
+    'dew', 'humidity', 'precip', 'precipprob', 'precipcover', 'snow', 'snowdepth',
+    'windgust', 'windspeed', 'winddir', 'sealevelpressure', 'cloudcover',
+    'visibility', 'solarradiation', 'solarenergy', 'uvindex', 'severerisk', 'moonphase'
+]
+WEATHER_STRING_COLUMNS = [
+    'name', 'preciptype', 'sunrise', 'sunset', 'conditions', 'description', 'icon', 'stations'
+]
+
+# Raw columns that are not used as model features
+COLUMNS_TO_DROP = [
+    'name', 'description', 'icon', 'stations', 'sunrise', 'sunset', 'severerisk',
+    'preciptype', 'pm10', 'o3', 'no2', 'so2', 'co'
+]
+
+# Numerical codes for the weather conditions seen in the training data
+CONDITIONS_MAP = {
+    'Clear': 1, 'Partially cloudy': 2,
+    'Rain, Partially cloudy': 3,
+    'Rain': 4, 'Overcast': 5,
+    'Rain, Overcast': 6
+}
+
+# Ranges behind the DataQualityValidator pass/fail checks
+VALIDATOR_RANGES = {'temperature': (-50, 150), 'humidity': (0, 100), 'pm25': (0, 500)}
+
+# What to do with rows that fail profiling; override with DATA_QUALITY_MODE
+# ('reject' fails the batch, 'quarantine' drops the bad rows and keeps the rest)
+DEFAULT_DATA_QUALITY_MODE = 'reject'
+
+# CloudWatch accepts up to 1000 metrics per PutMetricData request
+MAX_METRICS_PER_REQUEST = 1000
+
+# Upper bound on cities ingested at once; override with MAX_CONCURRENT_CITIES
+DEFAULT_MAX_CONCURRENT_CITIES = 8
+
+
+def get_max_concurrent_cities() -> int:
+    """Read the city concurrency limit from the environment."""
+    return max(1, int(os.getenv('MAX_CONCURRENT_CITIES', DEFAULT_MAX_CONCURRENT_CITIES)))
+
+
+def type_weather_frame(weather: pd.DataFrame) -> pd.DataFrame:
+    """Give daily weather columns explicit types and order rows by date."""
+    weather = weather.copy()
+    for column in weather.columns:
+        if column in WEATHER_NUMERIC_COLUMNS:
+            weather[column] = pd.to_numeric(weather[column], errors='coerce').astype('float64')
+        elif column in WEATHER_STRING_COLUMNS:
+            # The API returns lists (preciptype, stations) where the CSV exports use "a,b"
+            weather[column] = weather[column].map(
+                lambda value: ','.join(value) if isinstance(value, list) else value
+            ).astype('string')
+    if 'datetime' in weather.columns:
+        weather['datetime'] = pd.to_datetime(weather['datetime'])
+        weather = (weather.sort_values('datetime')
+                   .drop_duplicates('datetime', keep='last')
+                   .reset_index(drop=True))
+    return weather
+
+
+def clean_features(features: pd.DataFrame) -> pd.DataFrame:
+    """Drop unused columns, coerce pm25 to Int64 and encode weather conditions."""
+    features = features.drop(columns=[col for col in COLUMNS_TO_DROP
+                                      if col in features.columns])
+
+    # Clean and convert pm25 values
+    if features['pm25'].dtype == 'object' or pd.api.types.is_string_dtype(features['pm25']):
+        features['pm25'] = (features['pm25'].astype(str)
+                            .str.strip()
+                            .replace(' ', np.nan))
+    features['pm25'] = pd.to_numeric(features['pm25'], errors='coerce')
+    features['pm25'] = features['pm25'].astype('Int64')
+
+    # Map weather conditions to numerical values
+    if 'conditions' in features.columns:
+        features['conditions'] = features['conditions'].map(CONDITIONS_MAP)
+    return features
+
+
 class FeaturePipelineMonitoring:
-    def __init__(self):
+    """Buffers pipeline metrics and sends them in batches on flush().
+
+    With ``mode='cloudwatch'`` the buffer is sent through batched
+    ``put_metric_data`` calls; with ``mode='emf'`` it is printed as CloudWatch
+    embedded-metric-format log lines, which costs no API calls at all.
+    """
+
+    def __init__(self, mode: Optional[str] = None):
         self.cloudwatch = boto3.client('cloudwatch')
         self.namespace = 'AQIPrediction/FeaturePipeline'
+        self.mode = (mode or os.getenv('METRICS_MODE', 'cloudwatch')).lower()
+        if self.mode not in ('cloudwatch', 'emf'):
+            raise ValueError(f"Unsupported metrics mode: {self.mode}")
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def log_metric(self, metric_name: str, value: float, unit: str = 'Count',
+                   dimensions: Optional[Dict[str, str]] = None):
+        """Buffer a metric; it is sent on the next flush()."""
+        datum = {
+            'MetricName': metric_name,
+            'Value': value,
+            'Unit': unit,
+            'Timestamp': datetime.now()
+        }
+        if dimensions:
+            datum['Dimensions'] = [{'Name': name, 'Value': str(val)}
+                                   for name, val in dimensions.items() if val is not None]
+        with self._lock:
+            self._buffer.append(datum)
+            buffer_full = len(self._buffer) >= MAX_METRICS_PER_REQUEST
+        logger.debug(f"Buffered metric {metric_name}: {value}")
+        if buffer_full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Send every buffered metric and return how many were sent."""
+        with self._lock:
+            metrics, self._buffer = self._buffer, []
+        if not metrics:
+            return 0
 
-    def log_metric(self, metric_name: str, value: float, unit: str = 'Count'):
         try:
-            self.cloudwatch.put_metric_data(
-                Namespace=self.namespace,
-                MetricData=[{
-                    'MetricName': metric_name,
-                    'Value': value,
-                    'Unit': unit,
-                    'Timestamp': datetime.now()
-                }]
-            )
-            logger.info(f"Logged metric {metric_name}: {value}")
+            if self.mode == 'emf':
+                self._emit_emf(metrics)
+            else:
+                for start in range(0, len(metrics), MAX_METRICS_PER_REQUEST):
+                    self.cloudwatch.put_metric_data(
+                        Namespace=self.namespace,
+                        MetricData=metrics[start:start + MAX_METRICS_PER_REQUEST]
+                    )
+            logger.info(f"Flushed {len(metrics)} metrics")
         except Exception as e:
-            logger.error(f"Error logging metric {metric_name}: {str(e)}")
+            logger.error(f"Error flushing {len(metrics)} metrics: {str(e)}")
+        return len(metrics)
+
+    def _emit_emf(self, metrics: List[Dict]) -> None:
+        """Print one embedded-metric-format line per dimension set."""
+        groups = {}
+        for datum in metrics:
+            dimensions = tuple((d['Name'], d['Value']) for d in datum.get('Dimensions', []))
+            groups.setdefault(dimensions, []).append(datum)
+
+        for dimensions, data in groups.items():
+            values = {}
+            units = {}
+            for datum in data:
+                values.setdefault(datum['MetricName'], []).append(datum['Value'])
+                units[datum['MetricName']] = datum['Unit']
+            document = {
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [[name for name, _ in dimensions]],
+                        'Metrics': [{'Name': name, 'Unit': unit} for name, unit in units.items()]
+                    }]
+                },
+                **dict(dimensions),
+                **{name: vals[0] if len(vals) == 1 else vals for name, vals in values.items()}
+            }
+            # Lambda forwards stdout to CloudWatch Logs, where EMF lines become metrics
+            print(json.dumps(document, default=float), flush=True)
 
 class DataQualityValidator:
     @staticmethod
     def validate_features(df: pd.DataFrame) -> Dict[str, bool]:
+        """Pass/fail checks, computed from a single DataQualityProfiler pass."""
+        profiler = DataQualityProfiler(ranges=VALIDATOR_RANGES, required=[])
+        profiler.profile(df)
+        columns = profiler.report()['columns']
+
         validation_results = {}
-        
-        # Basic data checks
-<<<<<<< HEAD
         validation_results['has_data'] = len(df) > 0
-        validation_results['no_missing_pm25'] = df['pm25'].isna().sum() == 0
-        
-        # Value range checks
-        if 'temperature' in df.columns:
-            # Use .all() to convert Series to boolean
-=======
-        validation_results['has_data'] = not df.empty
-        validation_results['no_missing_pm25'] = df['pm25'].isnull().sum() == 0
-        
-        # Value range checks
-        if 'temperature' in df.columns:
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
-            validation_results['valid_temperature'] = df['temperature'].between(-50, 150).all()
-        if 'humidity' in df.columns:
-            validation_results['valid_humidity'] = df['humidity'].between(0, 100).all()
-        if 'pm25' in df.columns:
-            validation_results['valid_pm25'] = df['pm25'].between(0, 500).all()
+        validation_results['no_missing_pm25'] = columns['pm25']['nulls'] == 0
+
+        # Value range checks; like Series.between().all(), a null fails the range check
+        for column, check in (('temperature', 'valid_temperature'),
+                              ('humidity', 'valid_humidity'),
+                              ('pm25', 'valid_pm25')):
+            if column in columns:
+                stats = columns[column]
+                validation_results[check] = stats['nulls'] == 0 and stats['out_of_range'] == 0
 
         return validation_results
 
-<<<<<<< HEAD
 
-=======
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
 class FeaturePipeline:
-    def __init__(self, feature_group_name: str):
-        """Initialize the feature pipeline with API keys and AWS client."""
+    def __init__(self, feature_group_name: str,
+                 response_cache: Optional[ResponseCache] = None,
+                 drift_monitor: Optional[DriftMonitor] = None,
+                 featurestore_runtime=None):
+        """Initialize the feature pipeline with API keys and AWS client.
+
+        ``response_cache`` defaults to the cache configured in the environment
+        (RESPONSE_CACHE_DIR / RESPONSE_CACHE_S3_URI), if any; ``drift_monitor``
+        likewise defaults to the one configured by DRIFT_BASELINE / DRIFT_STATE.
+        ``featurestore_runtime`` replaces the boto3 client, e.g. with a
+        LocalFeatureStore for offline benchmarks.
+        """
         load_dotenv()  # Load environment variables
 
         self.feature_group_name = feature_group_name
-        self.featurestore_runtime = boto3.client('sagemaker-featurestore-runtime')
+        self.featurestore_runtime = featurestore_runtime or boto3.client('sagemaker-featurestore-runtime')
         self.monitoring = FeaturePipelineMonitoring()
         self.validator = DataQualityValidator()
+        self.data_quality_mode = os.getenv('DATA_QUALITY_MODE', DEFAULT_DATA_QUALITY_MODE).lower()
+        self.last_quality_report: Optional[Dict] = None
+        # Rows dropped in quarantine mode, one frame per processed batch
+        self.quarantined_batches: List[pd.DataFrame] = []
+        self.session = get_session()
+        self.response_cache = response_cache or build_response_cache_from_env()
+        self.drift_monitor = drift_monitor or build_drift_monitor_from_env()
+
+        # Records already written are skipped when DEDUP_INDEX (path or s3:// URI) is set
+        self.dedup_index = open_dedup_index_from_env()
+        # Records written since the last FRESHNESS_MARKER bump
+        self.records_written = 0
+        # When set, records are encoded with the feature group's types and unknown columns dropped
+        self.record_encoder: Optional[FeatureRecordEncoder] = None
+
+        # Lag/rolling features are added only when ROLLING_STATE (path or s3:// URI) is set
+        self.rolling_state = os.getenv('ROLLING_STATE')
+        self.rolling_engine = (RollingFeatureEngine.load(self.rolling_state)
+                               if self.rolling_state else None)
+
+        # Retries share one deadline per invocation; breakers are kept per provider
+        self.retry_policy = RetryPolicy()
+        self.deadline = Deadline(None)
+        self.breakers = {
+            'visualcrossing': CircuitBreaker('visualcrossing'),
+            'waqi': CircuitBreaker('waqi')
+        }
 
         # Get API keys from environment variables
         self.weather_key = os.getenv('WEATHER_API_KEY')
@@ -84,28 +277,59 @@ class FeaturePipeline:
         if not all([self.weather_key, self.air_quality_key]):
             raise ValueError("Missing required API keys in environment variables")
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _get_json(self, provider: str, city: str, url: str, params: Dict,
+                  cacheable: Callable[[Dict], bool],
+                  observation_date: Optional[str] = None) -> Dict:
+        """GET a JSON document, consulting the response cache first.
+
+        Responses are cached per provider, city and observation date (today
+        unless given), and only when ``cacheable`` accepts them, so error
+        payloads are never replayed.
+        """
+        observation_date = observation_date or date.today().isoformat()
+        dimensions = {'Provider': provider}
+        if self.response_cache is not None:
+            payload = self.response_cache.get(provider, city, observation_date)
+            if payload is not None:
+                logger.info(f"Using cached {provider} response for {city} ({observation_date})")
+                self.monitoring.log_metric('ResponseCacheHit', 1, dimensions=dimensions)
+                return payload
+            self.monitoring.log_metric('ResponseCacheMiss', 1, dimensions=dimensions)
+
+        def request() -> Dict:
+            # Never wait on a read longer than the invocation has left
+            connect_timeout, read_timeout = get_timeout()
+            timeout = (connect_timeout, max(0.1, min(read_timeout, self.deadline.remaining())))
+            logger.info(f"Making request to {provider} API for city: {city}")
+            response = self.session.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            logger.info(f"{provider} API response status: {response.status_code}")
+            return response.json()
+
+        payload = self.retry_policy.call(request, deadline=self.deadline,
+                                         breaker=self.breakers.get(provider))
+        if self.response_cache is not None and cacheable(payload):
+            self.response_cache.set(provider, city, observation_date, payload)
+        return payload
+
+    def set_deadline(self, deadline: Deadline) -> None:
+        """Share one time budget across every city of the current invocation."""
+        self.deadline = deadline
+
     def fetch_weather_data(self, city: str = 'los angeles') -> pd.DataFrame:
         """Fetch weather data from Visual Crossing API."""
         try:
-            logger.info(f"Making request to weather API for city: {city}")
-            response = requests.get(
-                f'https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{city}/today',
+            json_data = self._get_json(
+                'visualcrossing', city,
+                f'{WEATHER_API_URL}/{city}/today',
                 params={
                     'unitGroup': 'us',
                     'include': 'days',
                     'key': self.weather_key,
                     'contentType': 'json'
-                }
+                },
+                cacheable=lambda payload: 'days' in payload
             )
-            response.raise_for_status()
-<<<<<<< HEAD
-            
-            # Log response for debugging
-            logger.info(f"Weather API response status: {response.status_code}")
-            
-            # Parse JSON response
-            json_data = response.json()
             logger.info(f"Weather API JSON keys: {json_data.keys()}")
             
             if 'days' not in json_data:
@@ -113,16 +337,12 @@ class FeaturePipeline:
                 raise ValueError("Invalid response format from weather API")
                 
             data = pd.DataFrame(json_data['days'])
-=======
-            data = pd.DataFrame(response.json()['days'])
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
-            self.monitoring.log_metric('WeatherAPISuccess', 1)
+            self.monitoring.log_metric('WeatherAPISuccess', 1, dimensions={'City': city, 'Stage': 'fetch'})
             return data
-        except requests.exceptions.RequestException as e:
-            self.monitoring.log_metric('WeatherAPIError', 1)
+        except (requests.exceptions.RequestException, CircuitOpenError, DeadlineExceeded) as e:
+            self.monitoring.log_metric('WeatherAPIError', 1, dimensions={'City': city, 'Stage': 'fetch'})
             logger.error(f"Error fetching weather data: {str(e)}")
             raise
-<<<<<<< HEAD
         except Exception as e:
             logger.error(f"Unexpected error in fetch_weather_data: {str(e)}")
             import traceback
@@ -130,25 +350,70 @@ class FeaturePipeline:
             raise TypeError(f"Error processing weather data: {str(e)}")
 
 
-=======
+    def fetch_weather_range(self, city: str, start_date, end_date,
+                            window_days: int = DEFAULT_WEATHER_WINDOW_DAYS,
+                            max_workers: Optional[int] = None) -> pd.DataFrame:
+        """Fetch daily weather for ``start_date``..``end_date`` (inclusive).
+
+        The range is split into ``window_days`` windows that use the timeline
+        API's start/end form and are fetched in parallel, so a city-year takes
+        a handful of requests. Returns one typed frame sorted by ``datetime``.
+        """
+        start = pd.Timestamp(start_date).date()
+        end = pd.Timestamp(end_date).date()
+        if end < start:
+            raise ValueError(f"end_date {end} is before start_date {start}")
+
+        windows = []
+        window_start = start
+        while window_start <= end:
+            window_end = min(end, window_start + timedelta(days=window_days - 1))
+            windows.append((window_start.isoformat(), window_end.isoformat()))
+            window_start = window_end + timedelta(days=1)
+
+        def fetch_window(window) -> List[Dict]:
+            window_start, window_end = window
+            payload = self._get_json(
+                'visualcrossing', city,
+                f'{WEATHER_API_URL}/{city}/{window_start}/{window_end}',
+                params={
+                    'unitGroup': 'us',
+                    'include': 'days',
+                    'key': self.weather_key,
+                    'contentType': 'json'
+                },
+                cacheable=lambda payload: 'days' in payload,
+                observation_date=f'{window_start}_{window_end}'
+            )
+            if 'days' not in payload:
+                raise ValueError(f"Invalid response format from weather API for {window_start}..{window_end}")
+            return payload['days']
+
+        dimensions = {'City': city, 'Stage': 'fetch'}
+        logger.info(f"Fetching weather for {city} from {start} to {end} in {len(windows)} requests")
+        try:
+            max_workers = min(max_workers or get_max_concurrent_cities(), len(windows))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                days = [day for window in executor.map(fetch_window, windows)
+                        for day in window]
+        except Exception as e:
+            self.monitoring.log_metric('WeatherAPIError', 1, dimensions=dimensions)
+            logger.error(f"Error fetching weather range for {city}: {str(e)}")
+            raise
+
+        self.monitoring.log_metric('WeatherRangeRequests', len(windows), dimensions=dimensions)
+        self.monitoring.log_metric('WeatherRangeDays', len(days), dimensions=dimensions)
+        return type_weather_frame(pd.DataFrame(days))
 
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def fetch_air_quality_data(self, city_name='los angeles') -> pd.DataFrame:
         """Fetch air quality data from WAQI API."""
         try:
-            logger.info(f"Making request to air quality API for city: {city_name}")
-            response = requests.get(
+            json_data = self._get_json(
+                'waqi', city_name,
                 f'https://api.waqi.info/feed/{city_name}/',
-                params={'token': self.air_quality_key}
+                params={'token': self.air_quality_key},
+                cacheable=lambda payload: isinstance(payload.get('data'), dict) and 'iaqi' in payload['data']
             )
-            response.raise_for_status()
-            
-            # Log response for debugging
-            logger.info(f"Air quality API response status: {response.status_code}")
-            
-            # Parse JSON response
-            json_data = response.json()
             logger.info(f"Air quality API JSON keys: {json_data.keys()}")
             
             if 'data' not in json_data:
@@ -174,131 +439,202 @@ class FeaturePipeline:
                 'date': [data['time']['s'][:10]],
                 **{param: [iaqi[param]['v']] for param in params}
             })
-            self.monitoring.log_metric('AirQualityAPISuccess', 1)
+            self.monitoring.log_metric('AirQualityAPISuccess', 1, dimensions={'City': city_name, 'Stage': 'fetch'})
             return df
-        except requests.exceptions.RequestException as e:
-            self.monitoring.log_metric('AirQualityAPIError', 1)
+        except (requests.exceptions.RequestException, CircuitOpenError, DeadlineExceeded) as e:
+            self.monitoring.log_metric('AirQualityAPIError', 1, dimensions={'City': city_name, 'Stage': 'fetch'})
             logger.error(f"Error fetching air quality data: {str(e)}")
             raise
-<<<<<<< HEAD
         except Exception as e:
             logger.error(f"Unexpected error in fetch_air_quality_data: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
             raise TypeError(f"Error processing air quality data: {str(e)}")
 
-=======
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
 
     def process_features(self, weather_data: pd.DataFrame, 
                         air_quality_data: pd.DataFrame) -> pd.DataFrame:
         """Process and combine weather and air quality features."""
+        dimensions = {'Stage': 'process'}
+        if 'city' in air_quality_data.columns and len(air_quality_data) == 1:
+            dimensions['City'] = air_quality_data['city'].iloc[0]
         try:
             # Log input record counts
-            self.monitoring.log_metric('WeatherDataCount', len(weather_data))
-            self.monitoring.log_metric('AirQualityDataCount', len(air_quality_data))
+            self.monitoring.log_metric('WeatherDataCount', len(weather_data), dimensions=dimensions)
+            self.monitoring.log_metric('AirQualityDataCount', len(air_quality_data), dimensions=dimensions)
 
-            # Convert dates to datetime
-            air_quality_data['date'] = pd.to_datetime(air_quality_data['date'])
-            weather_data.rename(columns={'datetime': 'date'}, inplace=True)
+            # The requested weather day is the record's date, as in the lightweight handler;
+            # WAQI's station time can still be the previous day just after midnight, so its
+            # copy is dropped rather than leaving two 'date' columns
+            weather_data = weather_data.rename(columns={'datetime': 'date'})
+            if 'date' in weather_data.columns:
+                weather_data = weather_data.assign(date=pd.to_datetime(weather_data['date']))
+                air_quality_data = air_quality_data.drop(columns=['date'], errors='ignore')
+            else:
+                air_quality_data = air_quality_data.assign(date=pd.to_datetime(air_quality_data['date']))
 
             # Combine datasets
             features = pd.concat([weather_data, air_quality_data], axis=1)
 
-            # Drop unnecessary columns
-            columns_to_drop = ['name', 'description', 'icon', 'stations',
-                                'sunrise', 'sunset', 'severerisk',
-                                'preciptype', 'pm10', 'o3',
-                                'no2', 'so2', 'co']
-            features.drop(columns=[col for col in columns_to_drop 
-                                if col in features.columns], inplace=True)
-            
-            # Clean and convert pm25 values
-            if features['pm25'].dtype == 'object':  # If pm25 is string
-                features['pm25'] = (features['pm25'].astype(str)
-                                .str.strip()
-                                .replace(' ', np.nan))
-            features['pm25'] = pd.to_numeric(features['pm25'], errors='coerce')
-            features['pm25'] = features['pm25'].astype('Int64')
-            
-            # Map weather conditions to numerical values
-            conditions = {
-                'Clear': 1, 'Partially cloudy': 2,
-                'Rain, Partially cloudy': 3,
-                'Rain': 4, 'Overcast': 5,
-                'Rain, Overcast': 6
-            }
-<<<<<<< HEAD
-            if 'conditions' in features.columns:
-                features['conditions'] = features['conditions'].map(conditions)
-=======
-            features['conditions'] = features['conditions'].map(conditions)
-
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
-            # Add timestamp and record_id if not present
-            if 'timestamp' not in features.columns:
-                features['timestamp'] = pd.Series([int(round(time.time()))] * len(features), dtype="float64")
-            if 'record_id' not in features.columns:
-                features['record_id'] = features.index.astype(str)
+            features = clean_features(features)
+            return self._finish_features(features, dimensions)
 
-            # Validate processed features
-            validation_results = self.validator.validate_features(features)
-            for check, result in validation_results.items():
-                self.monitoring.log_metric(f'Validation_{check}', 1 if result else 0)
+        except Exception as e:
+            self.monitoring.log_metric('ProcessingError', 1, dimensions=dimensions)
+            logger.error(f"Error processing features: {str(e)}")
+            raise
 
-            if not all(validation_results.values()):
-                failed_checks = [check for check, result in validation_results.items() if not result]
-                raise ValueError(f"Data quality validation failed for: {failed_checks}")
+    def process_features_batch(self, weather_data: pd.DataFrame,
+                               air_quality_data: pd.DataFrame) -> pd.DataFrame:
+        """Process stacked multi-city, multi-day frames in one vectorized pass.
 
-            self.monitoring.log_metric('ProcessedRecordCount', len(features))
-            return features
+        Both frames need ``city`` and a date column (``datetime`` or ``date``);
+        rows are joined on (city, date), so days missing from either side are
+        dropped. Validation and metrics run once for the whole batch.
+        """
+        dimensions = {'Stage': 'process'}
+        try:
+            self.monitoring.log_metric('WeatherDataCount', len(weather_data), dimensions=dimensions)
+            self.monitoring.log_metric('AirQualityDataCount', len(air_quality_data), dimensions=dimensions)
+
+            weather = weather_data.rename(columns={'datetime': 'date'})
+            air_quality = air_quality_data
+            for name, frame in (('weather', weather), ('air quality', air_quality)):
+                missing = {'city', 'date'} - set(frame.columns)
+                if missing:
+                    raise ValueError(f"{name} data is missing key columns: {sorted(missing)}")
+
+            keys = ['city', 'date']
+            weather = weather.assign(date=pd.to_datetime(weather['date']).dt.normalize())
+            air_quality = air_quality.assign(date=pd.to_datetime(air_quality['date']).dt.normalize())
+            # Later rows win when a (city, date) appears twice, as in type_weather_frame
+            weather = weather.drop_duplicates(keys, keep='last')
+            air_quality = air_quality.drop_duplicates(keys, keep='last')
+
+            features = weather.merge(air_quality, on=keys, how='inner',
+                                     suffixes=('', '_air_quality'))
+            features = features.sort_values(keys).reset_index(drop=True)
+            self.monitoring.log_metric('UnmatchedRecordCount',
+                                       len(weather) + len(air_quality) - 2 * len(features),
+                                       dimensions=dimensions)
+
+            features = clean_features(features)
+            return self._finish_features(features, dimensions)
 
         except Exception as e:
-            self.monitoring.log_metric('ProcessingError', 1)
-            logger.error(f"Error processing features: {str(e)}")
+            self.monitoring.log_metric('ProcessingError', 1, dimensions=dimensions)
+            logger.error(f"Error processing feature batch: {str(e)}")
             raise
 
-    def write_to_feature_store(self, features: pd.DataFrame) -> None:
-        """Write processed features to SageMaker Feature Store."""
-        successful_writes = 0
-        failed_writes = 0
+    def _finish_features(self, features: pd.DataFrame, dimensions: Dict) -> pd.DataFrame:
+        """Add timestamp and record_id, then validate the cleaned features."""
+        # Add timestamp and record_id if not present
+        if 'timestamp' not in features.columns:
+            features['timestamp'] = pd.Series([int(round(time.time()))] * len(features),
+                                              index=features.index, dtype="float64")
+        if 'record_id' not in features.columns:
+            if {'city', 'date'} <= set(features.columns):
+                # Same id for the same city and day, so re-runs overwrite instead of duplicating
+                features['record_id'] = frame_record_ids(features)
+            else:
+                features['record_id'] = features.index.astype(str)
+
+        if features.empty:
+            raise ValueError("Data quality validation failed for: ['has_data']")
 
-        for idx, row in features.iterrows():
-            record = []
-            
-            # Process each column individually
-            for column in features.columns:
-                value = row[column]
-                
-                # Convert to simple string, handling all types
-                if pd.isna(value):
-                    value_str = ""
-                else:
-                    # Convert to string and clean up any newlines
-                    value_str = str(value).replace("\n", " ").strip()
-                
-                record.append({
-                    'FeatureName': column,
-                    'ValueAsString': value_str
-                })
-            
+        # One profiling pass and one report instead of a metric per check
+        profiler = DataQualityProfiler()
+        bad_rows = profiler.profile(features)
+        report = profiler.report()
+        self.last_quality_report = report
+        logger.info(f"Data quality report: {json.dumps(report, default=str)}")
+        self.monitoring.log_metric('QuarantinedRecordCount', report['quarantined_rows'],
+                                   dimensions=dimensions)
+
+        if not report['passed']:
+            failed_checks = sorted(column for column, stats in report['columns'].items()
+                                   if stats['bad_rows'])
+            if self.data_quality_mode != 'quarantine':
+                raise ValueError(f"Data quality validation failed for: {failed_checks}")
+            logger.warning(f"Quarantined {report['quarantined_rows']} of {report['rows']} rows "
+                           f"failing {failed_checks}")
+            self.quarantined_batches.append(features[bad_rows])
+            features = features[~bad_rows]
+            if features.empty:
+                raise ValueError(f"Data quality validation failed for every row: {failed_checks}")
+
+        self.monitoring.log_metric('ProcessedRecordCount', len(features), dimensions=dimensions)
+        return features
+
+    def write_to_feature_store(self, features: pd.DataFrame) -> Dict:
+        """Write processed features to SageMaker Feature Store.
+
+        Returns the writer summary (successful/failed counts and per-record
+        failures) instead of raising on the first failed record.
+        """
+        writer = FeatureStoreWriter(self.featurestore_runtime, self.feature_group_name,
+                                    dedup_index=self.dedup_index, deadline=self.deadline)
+        if self.record_encoder is None:
+            summary = writer.write(features)
+        else:
+            if 'event_time' in self.record_encoder.feature_names and 'event_time' not in features.columns:
+                features = features.assign(event_time=int(time.time()))
+            summary = writer.write_records(self.record_encoder.encode_frame(features),
+                                           labels=list(features.index))
+        self.records_written += summary['successful']
+
+        dimensions = {'Stage': 'write'}
+        self.monitoring.log_metric('SuccessfulWrites', summary['successful'], dimensions=dimensions)
+        self.monitoring.log_metric('FailedWrites', summary['failed'], dimensions=dimensions)
+        self.monitoring.log_metric('ThrottledWrites', summary['throttled'], dimensions=dimensions)
+        self.monitoring.log_metric('SkippedDuplicateWrites', summary['skipped'], dimensions=dimensions)
+        return summary
+
+    def save_drift_state(self) -> Optional[Dict[str, Dict]]:
+        """Fold this run's feature sketches into the drift state and report PSI per feature."""
+        if self.drift_monitor is None:
+            return None
+        try:
+            scores = self.drift_monitor.save()
+        except Exception as e:
+            logger.error(f"Error saving drift state: {str(e)}")
+            return None
+        for feature, score in scores.items():
+            if score['insufficient_data']:
+                continue
+            self.monitoring.log_metric('FeatureDriftPSI', score['psi'], unit='None',
+                                       dimensions={'Feature': feature})
+        drifted = [feature for feature, score in scores.items() if score['drifted']]
+        if drifted:
+            logger.warning(f"Feature drift detected for: {drifted}")
+        return scores
+
+    def _finish_run(self) -> None:
+        """Persist per-run state (rolling buffers, dedup index, drift sketches) and flush metrics."""
+        bump_freshness_marker_from_env(self.records_written)
+        self.records_written = 0
+        if self.dedup_index is not None:
             try:
-                self.featurestore_runtime.put_record(
-                    FeatureGroupName=self.feature_group_name,
-                    Record=record
-                )
-                successful_writes += 1
-                logger.info(f"Successfully wrote record {idx} to Feature Store")
+                self.dedup_index.sync()
             except Exception as e:
-                failed_writes += 1
-                logger.error(f"Error writing record {idx} to Feature Store: {str(e)}")
-                raise
-
-        self.monitoring.log_metric('SuccessfulWrites', successful_writes)
-        self.monitoring.log_metric('FailedWrites', failed_writes)
+                logger.error(f"Error syncing dedup index: {str(e)}")
+        if self.rolling_engine is not None:
+            try:
+                self.rolling_engine.save(self.rolling_state)
+            except Exception as e:
+                logger.error(f"Error saving rolling feature state: {str(e)}")
+        self.save_drift_state()
+        self.monitoring.flush()
 
     def run_pipeline(self, city: str = 'los angeles') -> pd.DataFrame:
         """Execute the complete feature pipeline."""
+        try:
+            return self._run_pipeline(city)
+        finally:
+            self._finish_run()
+
+    def _run_pipeline(self, city: str) -> pd.DataFrame:
+        """Run every pipeline stage for one city without flushing metrics."""
         logger.info("Starting feature pipeline execution")
         try:
             weather_data = self.fetch_weather_data(city)
@@ -309,19 +645,59 @@ class FeaturePipeline:
             
             features = self.process_features(weather_data, air_quality_data)
             logger.info("Successfully processed features")
+            if self.rolling_engine is not None:
+                features = self.rolling_engine.transform(features)
+            if self.drift_monitor is not None:
+                self.drift_monitor.update(features)
             
-            self.write_to_feature_store(features)
+            summary = self.write_to_feature_store(features)
+            if summary['failed']:
+                raise RuntimeError(f"{summary['failed']} of {summary['total']} records failed to write: "
+                                   f"{summary['failures'][0]['error']}")
             logger.info("Successfully wrote features to Feature Store")
             
-            self.monitoring.log_metric('PipelineSuccess', 1)
+            self.monitoring.log_metric('PipelineSuccess', 1, dimensions={'City': city})
             return features
             
         except Exception as e:
-            self.monitoring.log_metric('PipelineError', 1)
+            self.monitoring.log_metric('PipelineError', 1, dimensions={'City': city})
             logger.error(f"Pipeline execution failed: {str(e)}")
-<<<<<<< HEAD
             import traceback
             logger.error(traceback.format_exc())
-=======
->>>>>>> 49a6fcfd8ebc68d07fc025c01259e5bf6d637156
             raise
+
+    def run_pipeline_for_cities(self, cities: List[str],
+                                max_workers: Optional[int] = None,
+                                deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Run the pipeline for many cities concurrently on a bounded thread pool.
+
+        Returns a per-city status ('success' or 'failed: <reason>'); the processed
+        features of each successful city are kept in ``self.city_features``.
+        All cities share ``deadline``, so once it runs out the remaining cities
+        fail fast instead of waiting on retries.
+        """
+        if deadline is not None:
+            self.set_deadline(deadline)
+        cities = [city.strip() for city in cities if city.strip()]
+        max_workers = max_workers or get_max_concurrent_cities()
+        self.city_features = {}
+        results = {}
+
+        logger.info(f"Running feature pipeline for {len(cities)} cities "
+                    f"with up to {max_workers} workers")
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers, max(len(cities), 1))) as executor:
+                futures = {executor.submit(self._run_pipeline, city): city for city in cities}
+                for future in as_completed(futures):
+                    city = futures[future]
+                    try:
+                        self.city_features[city] = future.result()
+                        results[city] = 'success'
+                    except Exception as e:
+                        results[city] = f'failed: {str(e)}'
+                        logger.error(f"Failed to process features for {city}: {str(e)}")
+        finally:
+            # One state write and one flush for the whole invocation, even if a worker blew up
+            self._finish_run()
+
+        return {city: results[city] for city in cities}
@@ -0,0 +1,154 @@
+# src/pipelines/feature_schema.py
+import os
+import math
+import time
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+# pandas is only needed for frame encoding; the single-record path stays pure Python
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# How long a describe_feature_group response is trusted; override with FEATURE_SCHEMA_TTL
+DEFAULT_SCHEMA_TTL_SECONDS = 900
+
+# Module-level so the cache survives warm Lambda invocations
+_schema_cache: Dict[str, Tuple[float, List[Dict]]] = {}
+_encoder_cache: Dict[Tuple, Tuple[List[Dict], 'FeatureRecordEncoder']] = {}
+_cache_lock = threading.Lock()
+
+# Written for missing values when an encoder fills gaps instead of omitting them
+MISSING_DEFAULTS = {'Integral': '0', 'Fractional': '0.0', 'String': ''}
+
+
+def get_schema_ttl() -> float:
+    return float(os.getenv('FEATURE_SCHEMA_TTL', DEFAULT_SCHEMA_TTL_SECONDS))
+
+
+def get_feature_definitions(sagemaker_client, feature_group_name: str,
+                            ttl: Optional[float] = None) -> List[Dict]:
+    """Return the FeatureDefinitions of a feature group, cached for ``ttl`` seconds."""
+    ttl = get_schema_ttl() if ttl is None else ttl
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _schema_cache.get(feature_group_name)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    logger.info(f"Describing feature group {feature_group_name}")
+    response = sagemaker_client.describe_feature_group(FeatureGroupName=feature_group_name)
+    definitions = response['FeatureDefinitions']
+    with _cache_lock:
+        _schema_cache[feature_group_name] = (now + ttl, definitions)
+    return definitions
+
+
+def get_record_encoder(sagemaker_client, feature_group_name: str,
+                       fill_missing: bool = False, float_precision: Optional[int] = None,
+                       ttl: Optional[float] = None) -> 'FeatureRecordEncoder':
+    """Return an encoder for the feature group, rebuilt only when its definitions change."""
+    definitions = get_feature_definitions(sagemaker_client, feature_group_name, ttl=ttl)
+    key = (feature_group_name, fill_missing, float_precision)
+    with _cache_lock:
+        cached = _encoder_cache.get(key)
+        # Compared by content: a refreshed schema is a new list even when nothing changed
+        if cached and cached[0] == definitions:
+            return cached[1]
+        encoder = FeatureRecordEncoder(definitions, fill_missing=fill_missing,
+                                       float_precision=float_precision)
+        _encoder_cache[key] = (definitions, encoder)
+        return encoder
+
+
+def clear_schema_cache() -> None:
+    """Forget every cached schema and encoder."""
+    with _cache_lock:
+        _schema_cache.clear()
+        _encoder_cache.clear()
+
+
+class FeatureRecordEncoder:
+    """Turns DataFrames into put_record payloads using the feature group's types.
+
+    Integral features are truncated to integers, Fractional features are
+    written as floats and String features as stripped text. Values that
+    cannot be parsed as numbers become 0, as in the old per-value
+    ``int(float(...))`` fallbacks. Missing values are omitted, or written as
+    the type's default when ``fill_missing`` is set. Columns that are not
+    in the feature group are dropped.
+    """
+
+    def __init__(self, feature_definitions: List[Dict], fill_missing: bool = False,
+                 float_precision: Optional[int] = None):
+        self.feature_types = {d['FeatureName']: d['FeatureType'] for d in feature_definitions}
+        self.fill_missing = fill_missing
+        self.float_precision = float_precision
+
+    @property
+    def feature_names(self) -> List[str]:
+        return list(self.feature_types)
+
+    def encode_value(self, value: Any, feature_type: str) -> Optional[str]:
+        """Encode a single value; a missing value comes back as None (or its default)."""
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return MISSING_DEFAULTS.get(feature_type, '') if self.fill_missing else None
+        if feature_type == 'Integral':
+            try:
+                return str(int(float(value)))
+            except (ValueError, TypeError, OverflowError):
+                return '0'
+        if feature_type == 'Fractional':
+            try:
+                number = float(value)
+            except (ValueError, TypeError):
+                number = 0.0
+            if self.float_precision is not None:
+                number = round(number, self.float_precision)
+            return str(number)
+        return str(value).replace('\n', ' ').strip()
+
+    def encode_row(self, values: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Encode one record given as a dict, without touching pandas."""
+        record = []
+        for name, value in values.items():
+            feature_type = self.feature_types.get(name)
+            if feature_type is None:
+                continue
+            text = self.encode_value(value, feature_type)
+            if text is not None:
+                record.append({'FeatureName': name, 'ValueAsString': text})
+        return record
+
+    def encode_column(self, values: 'pd.Series', feature_type: str) -> 'pd.Series':
+        """Encode one column; missing values come back as None."""
+        import pandas as pd
+
+        missing = values.isna()
+        if feature_type in ('Integral', 'Fractional'):
+            numbers = pd.to_numeric(values, errors='coerce').fillna(0.0).astype('float64')
+            if feature_type == 'Integral':
+                # Casting truncates toward zero, like int(float(value))
+                text = numbers.astype('int64').astype(str)
+            else:
+                if self.float_precision is not None:
+                    numbers = numbers.round(self.float_precision)
+                text = numbers.astype(str)
+        else:
+            text = values.astype(str).str.replace('\n', ' ', regex=False).str.strip()
+
+        text = text.astype(object)
+        fill = MISSING_DEFAULTS.get(feature_type, '') if self.fill_missing else None
+        return text.where(~missing, fill)
+
+    def encode_frame(self, df: 'pd.DataFrame') -> List[List[Dict[str, str]]]:
+        """Encode every row of ``df`` into a put_record payload."""
+        names = [name for name in df.columns if name in self.feature_types]
+        columns = [self.encode_column(df[name], self.feature_types[name]).tolist() for name in names]
+        return [
+            [{'FeatureName': name, 'ValueAsString': value}
+             for name, value in zip(names, row) if value is not None]
+            for row in zip(*columns)
+        ]
@@ -0,0 +1,277 @@
+# src/pipelines/feature_storage.py
+"""Parquet storage for processed feature data.
+
+Datasets are written as hive-style partitions (``city=<city>/year=<year>/``)
+with compact column types, so readers can load only the columns they need
+and skip whole partitions by city or date range. CSV export is kept for the
+tools that still expect it:
+
+    python -m src.pipelines.feature_storage convert \
+        --inputs data/processed_data/train.csv --output data/parquet/train
+
+The module has no sibling imports so the SageMaker training scripts, which run
+with ``src/pipelines`` as their source directory, can import it directly.
+"""
+import os
+import argparse
+import logging
+import pandas as pd
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ['city', 'year']
+
+# Directory inside a training channel that holds the Parquet copy of the data
+PARQUET_DATASET_DIR = 'features'
+
+# Directory inside a training channel holding date-partitioned incremental extracts
+INCREMENTS_DIR = 'increments'
+
+# Integer-coded columns that fit in 16 bits; kept nullable so gaps survive
+INTEGER_COLUMNS = {'pm25': 'Int16', 'conditions': 'Int8', 'uvindex': 'Int8'}
+
+# Epoch seconds need more precision than float32's 24-bit mantissa
+FLOAT64_COLUMNS = {'timestamp'}
+
+# Identifier and time columns that can look numeric (e.g. %Y%m%d%H%M%S record ids)
+# but must keep their exact text; never downcast to floats
+STRING_COLUMNS = {'record_id', 'event_time', 'datetime'}
+
+DateLike = Union[str, date, pd.Timestamp]
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a feature frame to compact types.
+
+    Numbers stored as text (Athena CSV output quotes every value) are parsed,
+    floats become float32 and the integer-coded columns use nullable small ints.
+    Identifier and time columns (``STRING_COLUMNS``) are kept as exact strings.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column == 'date':
+            df[column] = pd.to_datetime(df[column])
+        elif column == 'city' or column in STRING_COLUMNS:
+            df[column] = df[column].astype('string')
+        elif column in INTEGER_COLUMNS:
+            values = pd.to_numeric(df[column], errors='coerce')
+            if (values.dropna() % 1 == 0).all():
+                df[column] = values.astype(INTEGER_COLUMNS[column])
+            else:
+                df[column] = values.astype('float32')
+        elif pd.api.types.is_numeric_dtype(df[column]) or pd.api.types.is_string_dtype(df[column]):
+            values = pd.to_numeric(df[column], errors='coerce')
+            # Leave genuine text columns alone
+            if values.notna().sum() == df[column].notna().sum():
+                df[column] = values.astype('float64' if column in FLOAT64_COLUMNS else 'float32')
+    return df
+
+
+def _partition_columns(df: pd.DataFrame) -> List[str]:
+    return [column for column in PARTITION_COLUMNS if column in df.columns]
+
+
+def write_dataset(df: pd.DataFrame, root: str, basename: str = 'part',
+                  overwrite: bool = True) -> List[str]:
+    """Write ``df`` under ``root`` partitioned by city and year.
+
+    With ``overwrite`` the existing files in each partition being written are
+    replaced, so rewriting a city/year is idempotent; without it the new files
+    are added next to them. Returns the paths of the files written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = compact_frame(df)
+    if 'date' in df.columns:
+        df['year'] = df['date'].dt.year.astype('int16')
+    partition_cols = _partition_columns(df)
+
+    written: List[str] = []
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if partition_cols:
+        pq.write_to_dataset(table, root, partition_cols=partition_cols,
+                            basename_template=f'{basename}-{{i}}.parquet',
+                            existing_data_behavior=('delete_matching' if overwrite
+                                                    else 'overwrite_or_ignore'),
+                            file_visitor=lambda f: written.append(f.path))
+    else:
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, f'{basename}-0.parquet')
+        pq.write_table(table, path)
+        written.append(path)
+    logger.info(f"Wrote {len(df)} rows to {len(written)} Parquet files under {root}")
+    return written
+
+
+def iter_dataset_parts(df: pd.DataFrame, basename: str = 'part',
+                       partition_cols: Optional[List[str]] = None) -> Iterator[Tuple[str, bytes]]:
+    """Encode ``df`` as the files ``write_dataset`` would write, in memory.
+
+    Yields ``(relative path, Parquet bytes)`` one partition at a time, so the
+    files can be uploaded without touching the local disk. ``partition_cols``
+    replaces the default city/year layout (dates are written as YYYY-MM-DD).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = compact_frame(df)
+    if partition_cols is None:
+        if 'date' in df.columns:
+            df['year'] = df['date'].dt.year.astype('int16')
+        partition_cols = _partition_columns(df)
+    for column in partition_cols:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    groups = df.groupby(partition_cols, sort=True, dropna=False) if partition_cols else [((), df)]
+
+    for keys, part in groups:
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        # Same names as pyarrow's hive partitioning, including its placeholder for nulls
+        directory = '/'.join(f'{column}=' + ('__HIVE_DEFAULT_PARTITION__' if pd.isna(value)
+                                              else quote(str(value), safe=''))
+                             for column, value in zip(partition_cols, keys))
+        sink = pa.BufferOutputStream()
+        pq.write_table(pa.Table.from_pandas(part.drop(columns=partition_cols), preserve_index=False), sink)
+        name = f'{basename}-0.parquet'
+        yield (f'{directory}/{name}' if directory else name), sink.getvalue().to_pybytes()
+
+
+def _filters(cities: Optional[List[str]], start: Optional[DateLike],
+             end: Optional[DateLike]) -> Optional[List]:
+    filters = []
+    if cities:
+        filters.append(('city', 'in', list(cities)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters += [('year', '>=', start.year), ('date', '>=', start)]
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters += [('year', '<=', end.year), ('date', '<=', end)]
+    return filters or None
+
+
+def read_dataset(root: str, columns: Optional[List[str]] = None,
+                 cities: Optional[List[str]] = None,
+                 start: Optional[DateLike] = None,
+                 end: Optional[DateLike] = None) -> pd.DataFrame:
+    """Read a partitioned dataset, loading only ``columns`` from matching partitions."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(root, columns=columns, filters=_filters(cities, start, end),
+                          partitioning='hive')
+    df = table.to_pandas()
+    for column in _partition_columns(df):
+        # Partition keys come back as categoricals; give them plain types
+        df[column] = df[column].astype('int16' if column == 'year' else 'string')
+    return df
+
+
+def read_features(path: str, columns: Optional[List[str]] = None,
+                  cities: Optional[List[str]] = None,
+                  start: Optional[DateLike] = None,
+                  end: Optional[DateLike] = None) -> pd.DataFrame:
+    """Read features from a Parquet dataset or a CSV file.
+
+    ``path`` may be a dataset directory, a directory containing an
+    ``increments/`` or ``features/`` dataset (a training channel; increments
+    win when both are present) or a CSV file. CSV input is read with
+    ``usecols`` and filtered after loading.
+    """
+    if os.path.isdir(path):
+        increments = os.path.join(path, INCREMENTS_DIR)
+        if os.path.isdir(increments) and any(Path(increments).rglob('*.parquet')):
+            return read_increments(increments, columns, cities, start, end)
+        nested = os.path.join(path, PARQUET_DATASET_DIR)
+        if os.path.isdir(nested):
+            path = nested
+        if any(Path(path).rglob('*.parquet')):
+            return read_dataset(path, columns, cities, start, end)
+        path = os.path.join(path, 'train.csv')
+
+    needed = _needed_columns(columns, cities, start, end)
+    df = compact_frame(pd.read_csv(path, usecols=lambda c: needed is None or c in needed))
+    return _filter_frame(df, columns, cities, start, end)
+
+
+def _needed_columns(columns, cities, start, end) -> Optional[set]:
+    if columns is None:
+        return None
+    return set(columns) | {c for c, v in (('city', cities), ('date', start or end)) if v}
+
+
+def _filter_frame(df: pd.DataFrame, columns, cities, start, end) -> pd.DataFrame:
+    if cities:
+        df = df[df['city'].isin(cities)]
+    if start is not None:
+        df = df[df['date'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['date'] <= pd.Timestamp(end)]
+    if columns is not None:
+        df = df[columns]
+    return df.reset_index(drop=True)
+
+
+def read_increments(root: str, columns: Optional[List[str]] = None,
+                    cities: Optional[List[str]] = None,
+                    start: Optional[DateLike] = None,
+                    end: Optional[DateLike] = None) -> pd.DataFrame:
+    """Read a date-partitioned incremental dataset.
+
+    A record extracted again in a later increment (same ``record_id``) is
+    kept only in its latest version by ``timestamp``.
+    """
+    import pyarrow.parquet as pq
+
+    needed = _needed_columns(columns, cities, start, end)
+    if needed is not None:
+        needed = sorted(needed | {'record_id', 'timestamp'})
+    df = pq.read_table(root, columns=needed, partitioning='hive').to_pandas()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'].astype(str))
+    if {'record_id', 'timestamp'} <= set(df.columns):
+        df = (df.sort_values('timestamp', kind='stable')
+              .drop_duplicates('record_id', keep='last').sort_index())
+    return _filter_frame(df, columns, cities, start, end)
+
+
+def export_csv(df: pd.DataFrame, path):
+    """Write a frame as plain CSV (to a path or a binary buffer) for tools that do not read Parquet."""
+    df = df.drop(columns=['year'], errors='ignore')
+    if 'date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['date']):
+        df = df.assign(date=df['date'].dt.strftime('%Y-%m-%d'))
+    df.to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert processed feature CSVs to Parquet and back')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help='CSV files to a partitioned Parquet dataset')
+    convert.add_argument('--inputs', nargs='+', required=True)
+    convert.add_argument('--output', type=str, required=True)
+
+    export = subparsers.add_parser('export', help='Parquet dataset to a single CSV file')
+    export.add_argument('--dataset', type=str, required=True)
+    export.add_argument('--output', type=str, required=True)
+    export.add_argument('--cities', nargs='*')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'convert':
+        for index, path in enumerate(args.inputs):
+            # Later inputs are added to the partitions the first one replaced
+            write_dataset(pd.read_csv(path), args.output, basename=f'{Path(path).stem}-{index}',
+                          overwrite=index == 0)
+    else:
+        export_csv(read_dataset(args.dataset, cities=args.cities), args.output)
+
+
+if __name__ == '__main__':
+    main()
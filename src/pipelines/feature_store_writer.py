@@ -0,0 +1,196 @@
+# src/pipelines/feature_store_writer.py
+import os
+import time
+import random
+import logging
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from .dedup_index import DedupIndex, record_fingerprint, record_identifier
+from .resilience import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Error codes that mean "slow down", and transient ones that are safe to retry
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException', 'Throttling', 'ThrottledException',
+    'TooManyRequestsException', 'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException'
+}
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | {
+    'ServiceUnavailable', 'InternalFailure', 'InternalServerError'
+}
+
+DEFAULT_WRITE_WORKERS = 8
+
+
+def get_write_workers() -> int:
+    """Read the put_record concurrency from FEATURE_STORE_WRITE_WORKERS."""
+    return max(1, int(os.getenv('FEATURE_STORE_WRITE_WORKERS', DEFAULT_WRITE_WORKERS)))
+
+
+def serialize_records(features: pd.DataFrame) -> List[List[Dict[str, str]]]:
+    """Convert a frame to put_record payloads, one column at a time.
+
+    Missing values become empty strings and newlines are flattened, matching
+    what the per-cell loop in FeaturePipeline used to do.
+    """
+    names = list(features.columns)
+    columns = []
+    for name in names:
+        values = features[name]
+        text = (values.astype(str)
+                .str.replace('\n', ' ', regex=False)
+                .str.strip())
+        columns.append(text.where(values.notna(), '').tolist())
+
+    return [
+        [{'FeatureName': name, 'ValueAsString': value} for name, value in zip(names, row)]
+        for row in zip(*columns)
+    ]
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    """Return the AWS error code of a botocore ClientError, if any."""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
+
+
+class FeatureStoreWriter:
+    """Writes many records to a feature group through a bounded worker pool.
+
+    Throttled and transient failures are retried in later rounds (only the
+    failed records are resent), with the worker count halved and an
+    exponential backoff shared by all workers whenever the service throttles.
+    Permanent errors are reported in the summary instead of aborting the batch.
+    With a ``dedup_index``, records already written with the same content are
+    skipped and every successful write is added to the index. Backoff sleeps
+    never outlast ``deadline``, and no retry round starts once it has expired.
+    """
+
+    def __init__(self, featurestore_runtime, feature_group_name: str,
+                 max_workers: Optional[int] = None, max_attempts: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 20.0,
+                 dedup_index: Optional[DedupIndex] = None,
+                 deadline: Optional[Deadline] = None):
+        self.featurestore_runtime = featurestore_runtime
+        self.feature_group_name = feature_group_name
+        self.dedup_index = dedup_index
+        self.deadline = deadline or Deadline(None)
+        self.max_workers = max_workers or get_write_workers()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._delay = 0.0
+        self._resume_at = 0.0
+
+    def write(self, features: pd.DataFrame) -> Dict:
+        """Write every row of ``features`` and return a summary of the batch."""
+        records = serialize_records(features)
+        return self.write_records(records, labels=list(features.index))
+
+    def write_records(self, records: List[List[Dict[str, str]]],
+                      labels: Optional[List] = None) -> Dict:
+        """Write already serialized records and return a summary of the batch."""
+        labels = labels if labels is not None else list(range(len(records)))
+        pending = list(range(len(records)))
+        identities = {}
+        if self.dedup_index is not None:
+            for i, record in enumerate(records):
+                record_id = record_identifier(record)
+                if record_id is not None:
+                    identities[i] = (record_id, record_fingerprint(record))
+            seen = self.dedup_index.seen(dict(identities.values()))
+            pending = [i for i in pending if i not in identities or identities[i][0] not in seen]
+        skipped = len(records) - len(pending)
+        written = []
+        errors = {}
+        successful = 0
+        throttled_total = 0
+        workers = self.max_workers
+        attempt = 0
+
+        while pending and attempt < self.max_attempts:
+            if attempt and self.deadline.expired():
+                logger.warning(f"Deadline reached; not retrying {len(pending)} records")
+                break
+            attempt += 1
+            retry = []
+            throttled = 0
+
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = {executor.submit(self._put_record, records[i]): i for i in pending}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    error = future.exception()
+                    if error is None:
+                        successful += 1
+                        written.append(i)
+                        errors.pop(i, None)
+                        continue
+
+                    code = _error_code(error)
+                    errors[i] = f"{code}: {str(error)}" if code else str(error)
+                    if code in THROTTLING_ERROR_CODES:
+                        throttled += 1
+                        retry.append(i)
+                    elif code is None or code in RETRYABLE_ERROR_CODES:
+                        retry.append(i)
+                    else:
+                        logger.error(f"Permanent failure writing record {labels[i]}: {errors[i]}")
+
+            throttled_total += throttled
+            pending = sorted(retry)
+            if pending and attempt < self.max_attempts:
+                if throttled:
+                    workers = max(1, workers // 2)
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                logger.warning(f"Retrying {len(pending)} records in {delay:.2f}s "
+                               f"with {workers} workers ({throttled} throttled)")
+                time.sleep(min(self.deadline.remaining(), delay * random.uniform(0.5, 1.0)))
+
+        if self.dedup_index is not None:
+            self.dedup_index.mark_written(dict(identities[i] for i in written if i in identities))
+
+        failures = [{'record': labels[i], 'error': error} for i, error in sorted(errors.items())]
+        summary = {
+            'total': len(records),
+            'successful': successful,
+            'skipped': skipped,
+            'failed': len(failures),
+            'throttled': throttled_total,
+            'attempts': attempt,
+            'failures': failures
+        }
+        logger.info(f"Wrote {successful}/{len(records)} records to {self.feature_group_name} "
+                    f"in {attempt} attempt(s), {len(failures)} failed, {skipped} already written")
+        return summary
+
+    def _put_record(self, record: List[Dict[str, str]]) -> None:
+        """Send one record, honouring the backoff shared by all workers."""
+        wait = min(self._resume_at - time.monotonic(), self.deadline.remaining())
+        if wait > 0:
+            time.sleep(wait)
+
+        try:
+            self.featurestore_runtime.put_record(
+                FeatureGroupName=self.feature_group_name,
+                Record=record
+            )
+        except Exception as e:
+            if _error_code(e) in THROTTLING_ERROR_CODES:
+                with self._lock:
+                    self._delay = min(self.max_delay, max(self.base_delay, self._delay * 2))
+                    self._resume_at = max(self._resume_at, time.monotonic() + self._delay)
+            raise
+        else:
+            # Additive recovery: each success shrinks the shared backoff
+            if self._delay:
+                with self._lock:
+                    self._delay = max(0.0, self._delay - self.base_delay / 4)
@@ -0,0 +1,55 @@
+# src/pipelines/freshness.py
+"""A tiny marker document that changes whenever new records are ingested.
+
+Writers bump it after a run that wrote anything; readers fold its version
+into cache keys, so cached query results expire as soon as the feature group
+has new data. The marker lives at FRESHNESS_MARKER (local path or s3:// URI);
+with it unset, bumping is a no-op. Only the standard library is imported so
+the lightweight Lambda handler can bump it too.
+"""
+import os
+import time
+import uuid
+import logging
+from typing import Dict, Optional
+
+from .state_store import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+# Version reported when no marker has been written yet
+INITIAL_VERSION = 'initial'
+
+
+def get_marker_location() -> Optional[str]:
+    return os.getenv('FRESHNESS_MARKER') or None
+
+
+def read_freshness_marker(location: str, s3_client=None) -> Optional[Dict]:
+    """The marker document (version, updated_at, records), or None before the first bump."""
+    return load_json_state(location, s3_client=s3_client)
+
+
+def read_freshness_version(location: str, s3_client=None) -> str:
+    """Current marker version (changes on every bump)."""
+    document = read_freshness_marker(location, s3_client=s3_client)
+    return document['version'] if document else INITIAL_VERSION
+
+
+def bump_freshness_marker(location: str, records: int, s3_client=None) -> str:
+    """Record that ``records`` new records were written and return the new version."""
+    version = uuid.uuid4().hex
+    save_json_state({'version': version, 'updated_at': time.time(), 'records': records},
+                    location, s3_client=s3_client)
+    return version
+
+
+def bump_freshness_marker_from_env(records: int) -> None:
+    """Bump the marker at FRESHNESS_MARKER if set and anything was written; never raises."""
+    location = get_marker_location()
+    if not location or records <= 0:
+        return
+    try:
+        bump_freshness_marker(location, records)
+    except Exception as e:
+        logger.error(f"Error bumping freshness marker {location}: {str(e)}")
@@ -0,0 +1,248 @@
+# src/pipelines/hpo.py
+"""Local hyperparameter search with successive halving on a process pool.
+
+Random configurations from ``SEARCH_SPACE`` are all trained for a small
+number of boosting rounds; the best third go on with three times the rounds,
+and so on up to ``max_rounds``. The training and validation matrices are
+saved once as ``.npy`` files that every worker memory-maps, so the data is
+shared through the page cache instead of being copied per process, and each
+worker gets ``cores / workers`` XGBoost threads:
+
+    python -m src.pipelines.hpo --train data/processed_data/train.csv \
+        --configs 27 --min-rounds 25 --max-rounds 675 --output hpo_results
+
+``--script`` picks the training script the result is for; the search uses
+that script's feature columns. The output directory gets ``leaderboard.csv``
+plus either ``best_hyperparameters.json`` (the SageMaker hyperparameters
+train_simple.py accepts) or ``best_args.txt`` (command-line arguments for
+train.py). Without a validation file, dated data is split by date: the most
+recent fifth of the dates is the validation set.
+"""
+import os
+import json
+import math
+import random
+import argparse
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cross_validation import load_ordered_matrix, rolling_origin_folds
+from .model_training import FEATURE_COLUMNS, SIMPLE_FEATURE_COLUMNS, fit_model, load_matrix
+
+logger = logging.getLogger(__name__)
+
+# (low, high, kind) per hyperparameter; only parameters the training scripts accept
+SEARCH_SPACE = {
+    'max_depth': (3, 10, 'int'),
+    'eta': (0.01, 0.3, 'log'),
+    'gamma': (0.0, 8.0, 'float'),
+    'min_child_weight': (1, 10, 'int'),
+    'subsample': (0.5, 1.0, 'float')
+}
+
+# Feature columns each training script trains on
+SCRIPT_FEATURES = {'train_simple': SIMPLE_FEATURE_COLUMNS, 'train': FEATURE_COLUMNS}
+
+DEFAULT_SCRIPT = 'train_simple'
+DEFAULT_CONFIGS = 27
+DEFAULT_MIN_ROUNDS = 25
+DEFAULT_MAX_ROUNDS = 675
+DEFAULT_REDUCTION = 3
+
+# Set in each worker process by _init_worker
+_matrices: Dict[str, np.ndarray] = {}
+_nthread = 1
+
+
+def sample_configs(count: int, seed: int = 0, space: Optional[Dict] = None) -> List[Dict]:
+    """Draw ``count`` random configurations from the search space."""
+    space = space or SEARCH_SPACE
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(count):
+        config = {}
+        for name, (low, high, kind) in space.items():
+            if kind == 'int':
+                config[name] = rng.randint(low, high)
+            elif kind == 'log':
+                config[name] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 4)
+            else:
+                config[name] = round(rng.uniform(low, high), 3)
+        configs.append(config)
+    return configs
+
+
+def _init_worker(matrix_dir: str, nthread: int) -> None:
+    global _nthread
+    _nthread = nthread
+    for name in ('X_train', 'y_train', 'X_valid', 'y_valid'):
+        _matrices[name] = np.load(os.path.join(matrix_dir, f'{name}.npy'), mmap_mode='r')
+
+
+def _evaluate(task: Tuple[int, Dict, int]) -> Dict:
+    """Train one configuration for ``rounds`` rounds on the shared matrices."""
+    config_id, config, rounds = task
+    params = {'learning_rate' if name == 'eta' else name: value for name, value in config.items()}
+    _, report = fit_model(_matrices['X_train'], _matrices['y_train'],
+                          _matrices['X_valid'], _matrices['y_valid'],
+                          params=params, n_estimators=rounds, nthread=_nthread)
+    return {'config_id': config_id, 'rounds': rounds, 'rmse': report['best_rmse'],
+            'best_iteration': report['best_iteration'], 'seconds': report['wall_seconds']}
+
+
+def successive_halving(configs: List[Dict], evaluate: Callable[[List[Tuple[int, Dict, int]]], List[Dict]],
+                       min_rounds: int = DEFAULT_MIN_ROUNDS, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                       reduction: int = DEFAULT_REDUCTION) -> List[Dict]:
+    """Run the halving schedule and return one result per configuration and rung.
+
+    ``evaluate`` takes a list of (config id, config, rounds) tasks and
+    returns their result dicts; each rung keeps the best 1/``reduction``.
+    """
+    if min_rounds < 1 or max_rounds < min_rounds or reduction < 2:
+        raise ValueError("Need 1 <= min_rounds <= max_rounds and reduction >= 2")
+    survivors = list(range(len(configs)))
+    rounds = min_rounds
+    rung = 0
+    results = []
+    while survivors:
+        scores = evaluate([(i, configs[i], rounds) for i in survivors])
+        for result in scores:
+            result['rung'] = rung
+        results.extend(scores)
+        best = sorted(scores, key=lambda result: result['rmse'])
+        logger.info(f"Rung {rung}: {len(survivors)} configs at {rounds} rounds, "
+                    f"best RMSE {best[0]['rmse']:.3f}")
+        if rounds >= max_rounds or len(survivors) == 1:
+            break
+        survivors = [result['config_id'] for result in best[:max(1, len(survivors) // reduction)]]
+        rounds = min(max_rounds, rounds * reduction)
+        rung += 1
+    return results
+
+
+def build_leaderboard(configs: List[Dict], results: List[Dict]) -> pd.DataFrame:
+    """Each configuration's result from the highest rung it reached, best first."""
+    final = {}
+    for result in results:
+        if result['config_id'] not in final or result['rung'] >= final[result['config_id']]['rung']:
+            final[result['config_id']] = result
+    rows = [{**final[i], **configs[i]} for i in final]
+    leaderboard = pd.DataFrame(rows).sort_values(['rung', 'rmse'], ascending=[False, True])
+    return leaderboard.reset_index(drop=True)
+
+
+def write_results(leaderboard: pd.DataFrame, output_dir: str, script: str = DEFAULT_SCRIPT) -> Dict:
+    """Write the leaderboard and the winner in ``script``'s input form; return the winner."""
+    os.makedirs(output_dir, exist_ok=True)
+    leaderboard.to_csv(os.path.join(output_dir, 'leaderboard.csv'), index=False)
+
+    best = leaderboard.iloc[0]
+    hyperparameters = {name: best[name].item() for name in SEARCH_SPACE}
+    # Early stopping picked the round count; train without it for exactly that many
+    hyperparameters['num_round'] = int(best['best_iteration']) + 1
+    hyperparameters['objective'] = 'reg:squarederror'
+
+    if script == 'train_simple':
+        with open(os.path.join(output_dir, 'best_hyperparameters.json'), 'w') as f:
+            json.dump(hyperparameters, f, indent=2)
+    else:
+        train_args = {'max-depth': hyperparameters['max_depth'], 'eta': hyperparameters['eta'],
+                      'gamma': hyperparameters['gamma'],
+                      'min-child-weight': hyperparameters['min_child_weight'],
+                      'subsample': hyperparameters['subsample'],
+                      'n-estimators': hyperparameters['num_round']}
+        with open(os.path.join(output_dir, 'best_args.txt'), 'w') as f:
+            f.write(' '.join(f'--{name} {value}' for name, value in train_args.items()) + '\n')
+    return hyperparameters
+
+
+def split_for_search(train_path: str, feature_columns: List[str], seed: int = 0,
+                     cache_dir: Optional[str] = None) -> Tuple[np.ndarray, ...]:
+    """(X_train, y_train, X_valid, y_valid) with the most recent fifth of the dates held out.
+
+    Data without a date column falls back to a seeded random 20%.
+    """
+    try:
+        X, y, days = load_ordered_matrix(train_path, feature_columns)
+    except ValueError as e:
+        logger.warning(f"No dates to split on ({e}); holding out a random 20%")
+        X, y = load_matrix(train_path, feature_columns, cache_dir=cache_dir)
+        order = np.random.default_rng(seed).permutation(len(y))
+        split = int(len(y) * 0.8)
+        return X[order[:split]], y[order[:split]], X[order[split:]], y[order[split:]]
+    train_end, valid_start, valid_end = rolling_origin_folds(days, n_splits=4)[-1]
+    return X[:train_end], y[:train_end], X[valid_start:valid_end], y[valid_start:valid_end]
+
+
+def run_search(train_path: str, output_dir: str, validation_path: Optional[str] = None,
+               configs: int = DEFAULT_CONFIGS, min_rounds: int = DEFAULT_MIN_ROUNDS,
+               max_rounds: int = DEFAULT_MAX_ROUNDS, reduction: int = DEFAULT_REDUCTION,
+               workers: Optional[int] = None, seed: int = 0,
+               cache_dir: Optional[str] = None, script: str = DEFAULT_SCRIPT) -> Dict:
+    """Search the space for ``script`` on a process pool and write the results to ``output_dir``.
+
+    Without ``validation_path`` the data is split by ``split_for_search``.
+    Returns the best hyperparameters.
+    """
+    if script not in SCRIPT_FEATURES:
+        raise ValueError(f"Unknown training script {script!r}; expected one of {sorted(SCRIPT_FEATURES)}")
+    feature_columns = SCRIPT_FEATURES[script]
+    if validation_path:
+        X_train, y_train = load_matrix(train_path, feature_columns, cache_dir=cache_dir)
+        X_valid, y_valid = load_matrix(validation_path, feature_columns, cache_dir=cache_dir)
+    else:
+        X_train, y_train, X_valid, y_valid = split_for_search(train_path, feature_columns, seed, cache_dir)
+
+    candidates = sample_configs(configs, seed)
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, configs))
+    nthread = max(1, cores // workers)
+
+    with tempfile.TemporaryDirectory(prefix='hpo-matrix-') as matrix_dir:
+        for name, array in (('X_train', X_train), ('y_train', y_train),
+                            ('X_valid', X_valid), ('y_valid', y_valid)):
+            np.save(os.path.join(matrix_dir, f'{name}.npy'), np.ascontiguousarray(array))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(matrix_dir, nthread)) as executor:
+            def evaluate(tasks):
+                return list(executor.map(_evaluate, tasks))
+
+            logger.info(f"Searching {configs} configs on {workers} workers x {nthread} threads")
+            results = successive_halving(candidates, evaluate, min_rounds, max_rounds, reduction)
+
+    leaderboard = build_leaderboard(candidates, results)
+    best = write_results(leaderboard, output_dir, script)
+    logger.info(f"Best validation RMSE {leaderboard.iloc[0]['rmse']:.3f} with {best}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local successive-halving hyperparameter search')
+    parser.add_argument('--train', type=str, default='data/processed_data/train.csv')
+    parser.add_argument('--validation', type=str, default=None)
+    parser.add_argument('--output', type=str, default='hpo_results')
+    parser.add_argument('--script', choices=sorted(SCRIPT_FEATURES), default=DEFAULT_SCRIPT,
+                        help='Training script the best parameters are written for')
+    parser.add_argument('--configs', type=int, default=DEFAULT_CONFIGS)
+    parser.add_argument('--min-rounds', type=int, default=DEFAULT_MIN_ROUNDS)
+    parser.add_argument('--max-rounds', type=int, default=DEFAULT_MAX_ROUNDS)
+    parser.add_argument('--reduction', type=int, default=DEFAULT_REDUCTION)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache-dir', type=str, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    best = run_search(args.train, args.output, args.validation, args.configs, args.min_rounds,
+                      args.max_rounds, args.reduction, args.workers, args.seed, args.cache_dir,
+                      args.script)
+    print(json.dumps(best, indent=2))
+
+
+if __name__ == '__main__':
+    main()
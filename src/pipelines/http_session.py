@@ -0,0 +1,66 @@
+# src/pipelines/http_session.py
+import os
+import threading
+import logging
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds; override with HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 15.0
+
+# Connections kept alive per host; should cover MAX_CONCURRENT_CITIES
+DEFAULT_POOL_MAXSIZE = 16
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_timeout() -> Tuple[float, float]:
+    """Return the (connect, read) timeout used for upstream API calls."""
+    return (
+        float(os.getenv('HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+        float(os.getenv('HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT))
+    )
+
+
+def create_session(pool_maxsize: Optional[int] = None) -> requests.Session:
+    """Create a keep-alive session with a pooled adapter for http and https."""
+    pool_maxsize = pool_maxsize or int(os.getenv('HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE))
+
+    # Retries are handled by the callers, so the adapter must not retry on its own
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize,
+                          max_retries=0, pool_block=False)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use.
+
+    The session lives at module scope so that warm Lambda invocations reuse
+    the open connections of previous invocations.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                logger.info("Creating pooled HTTP session")
+                _session = create_session()
+    return _session
+
+
+def reset_session() -> None:
+    """Close and drop the shared session (used by tests and benchmarks)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,437 @@
+# src/pipelines/local_feature_store.py
+"""In-process stand-ins for Feature Store, Athena and S3, backed by SQLite.
+
+``LocalFeatureStore`` answers the runtime calls the pipelines make
+(``put_record``, ``get_record``, ``batch_get_record``) plus
+``describe_feature_group``, with an optional per-call latency and a request
+rate above which calls fail with ``ThrottlingException`` like the real
+service. Every accepted write is also appended to an offline table named like
+the Glue table, which ``LocalAthena`` queries with SQLite and writes as CSV
+results to a ``LocalS3`` bucket. Pass them to the pipelines in place of the
+boto3 clients:
+
+    store = LocalFeatureStore(latency=0.005, max_requests_per_second=500)
+    s3 = LocalS3()
+    FeaturePipeline('air-quality', featurestore_runtime=store)
+    TrainingPipeline(store.table_name('air-quality'), 'bucket',
+                     athena_client=LocalAthena(store, s3), s3_client=s3)
+
+or register them with ``use_local_clients`` for code that uses ``get_client``.
+"""
+import io
+import csv
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+logger = logging.getLogger(__name__)
+
+RECORD_IDENTIFIER_FEATURE = 'record_id'
+EVENT_TIME_FEATURE = 'timestamp'
+
+# Processed feature columns as written by FeaturePipeline; unknown features are stored as strings
+DEFAULT_FEATURE_DEFINITIONS = (
+    [{'FeatureName': name, 'FeatureType': 'String'} for name in ('record_id', 'date', 'city')]
+    + [{'FeatureName': 'timestamp', 'FeatureType': 'Fractional'}]
+    + [{'FeatureName': name, 'FeatureType': 'Fractional'} for name in (
+        'tempmax', 'tempmin', 'temp', 'feelslikemax', 'feelslikemin', 'feelslike', 'dew',
+        'humidity', 'precip', 'precipprob', 'precipcover', 'snow', 'snowdepth', 'windgust',
+        'windspeed', 'winddir', 'sealevelpressure', 'cloudcover', 'visibility',
+        'solarradiation', 'solarenergy', 'uvindex', 'moonphase')]
+    + [{'FeatureName': name, 'FeatureType': 'Integral'} for name in ('conditions', 'pm25')]
+)
+
+SQLITE_TYPES = {'Integral': 'INTEGER', 'Fractional': 'REAL', 'String': 'TEXT'}
+
+# Extra columns the offline store adds to every row
+OFFLINE_METADATA_COLUMNS = {'write_time': 'REAL', 'api_invocation_time': 'REAL', 'is_deleted': 'INTEGER'}
+
+
+def _client_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class LocalFeatureStore:
+    """Online and offline store for any number of feature groups in one SQLite database.
+
+    ``latency`` seconds are slept on every runtime call. When
+    ``max_requests_per_second`` is set, calls beyond that rate (a token bucket
+    holding one second of requests) raise ``ThrottlingException``; a
+    ``throttle_rate`` between 0 and 1 additionally throttles that fraction of
+    calls at random. Feature groups are created on first use.
+    """
+
+    def __init__(self, path: str = ':memory:',
+                 feature_definitions: Optional[List[Dict]] = None,
+                 latency: float = 0.0,
+                 max_requests_per_second: Optional[float] = None,
+                 throttle_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.feature_definitions = list(feature_definitions or DEFAULT_FEATURE_DEFINITIONS)
+        self.latency = latency
+        self.max_requests_per_second = max_requests_per_second
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'throttled': 0, 'writes': 0, 'reads': 0}
+
+        self._lock = threading.RLock()
+        self._tokens = float(max_requests_per_second or 0)
+        self._refilled_at = time.monotonic()
+        self._groups: Dict[str, Dict[str, str]] = {}
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS online ('
+            'feature_group TEXT, record_id TEXT, event_time REAL, record TEXT, '
+            'PRIMARY KEY (feature_group, record_id)) WITHOUT ROWID'
+        )
+        self.connection.commit()
+
+    # Feature groups -------------------------------------------------------
+
+    @staticmethod
+    def table_name(feature_group_name: str) -> str:
+        """Offline table for a feature group, named like the Glue table."""
+        return feature_group_name.replace('-', '_')
+
+    def _ensure_group(self, feature_group_name: str) -> Dict[str, str]:
+        columns = self._groups.get(feature_group_name)
+        if columns is None:
+            columns = {d['FeatureName']: d['FeatureType'] for d in self.feature_definitions}
+            definitions = [f'{_quote(name)} {SQLITE_TYPES[kind]}' for name, kind in columns.items()]
+            definitions += [f'{name} {kind}' for name, kind in OFFLINE_METADATA_COLUMNS.items()]
+            table = _quote(self.table_name(feature_group_name))
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(definitions)})')
+            existing = {row[1] for row in self.connection.execute(f'PRAGMA table_info({table})')}
+            for name in existing - set(columns) - set(OFFLINE_METADATA_COLUMNS):
+                columns[name] = 'String'
+            self._groups[feature_group_name] = columns
+        return columns
+
+    def _add_feature(self, feature_group_name: str, name: str) -> None:
+        table = _quote(self.table_name(feature_group_name))
+        self.connection.execute(f'ALTER TABLE {table} ADD COLUMN {_quote(name)} TEXT')
+        self._groups[feature_group_name][name] = 'String'
+
+    def describe_feature_group(self, FeatureGroupName: str, **kwargs) -> Dict:
+        with self._lock:
+            columns = dict(self._ensure_group(FeatureGroupName))
+        return {
+            'FeatureGroupName': FeatureGroupName,
+            'FeatureGroupStatus': 'Created',
+            'RecordIdentifierFeatureName': RECORD_IDENTIFIER_FEATURE,
+            'EventTimeFeatureName': EVENT_TIME_FEATURE,
+            'FeatureDefinitions': [{'FeatureName': name, 'FeatureType': kind}
+                                   for name, kind in columns.items()],
+            'OnlineStoreConfig': {'EnableOnlineStore': True},
+            'OfflineStoreConfig': {'DataCatalogConfig': {
+                'Catalog': 'AwsDataCatalog',
+                'Database': 'sagemaker_featurestore',
+                'TableName': self.table_name(FeatureGroupName)
+            }}
+        }
+
+    # Simulated service behaviour -----------------------------------------
+
+    def _call(self, operation: str) -> None:
+        """Apply latency and throttling to one runtime request."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.stats['requests'] += 1
+            throttled = self.throttle_rate and self.random.random() < self.throttle_rate
+            if self.max_requests_per_second:
+                now = time.monotonic()
+                self._tokens = min(self.max_requests_per_second,
+                                   self._tokens + (now - self._refilled_at) * self.max_requests_per_second)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    throttled = True
+                elif not throttled:
+                    self._tokens -= 1
+            if throttled:
+                self.stats['throttled'] += 1
+                raise _client_error('ThrottlingException', 'Rate exceeded', operation)
+
+    # Runtime API ----------------------------------------------------------
+
+    def put_record(self, FeatureGroupName: str, Record: List[Dict[str, str]], **kwargs) -> Dict:
+        self._call('PutRecord')
+        values = {feature['FeatureName']: feature['ValueAsString'] for feature in Record}
+        record_id = values.get(RECORD_IDENTIFIER_FEATURE)
+        if not record_id:
+            raise _client_error('ValidationException',
+                                f'Record is missing {RECORD_IDENTIFIER_FEATURE}', 'PutRecord')
+        now = time.time()
+        try:
+            event_time = float(values.get(EVENT_TIME_FEATURE) or now)
+        except ValueError:
+            raise _client_error('ValidationException',
+                                f'Invalid {EVENT_TIME_FEATURE}: {values[EVENT_TIME_FEATURE]}', 'PutRecord')
+
+        with self._lock:
+            columns = self._ensure_group(FeatureGroupName)
+            for name in values:
+                if name not in columns:
+                    self._add_feature(FeatureGroupName, name)
+            row = {name: self._typed(columns[name], value) for name, value in values.items()}
+            row.update(write_time=now, api_invocation_time=now, is_deleted=0)
+            names = ', '.join(_quote(name) for name in row)
+            self.connection.execute(
+                f'INSERT INTO {_quote(self.table_name(FeatureGroupName))} ({names}) '
+                f'VALUES ({", ".join("?" * len(row))})', list(row.values())
+            )
+            # The online store keeps the record with the latest event time
+            self.connection.execute(
+                'INSERT INTO online (feature_group, record_id, event_time, record) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (feature_group, record_id) DO UPDATE SET '
+                'event_time = excluded.event_time, record = excluded.record '
+                'WHERE excluded.event_time >= online.event_time',
+                (FeatureGroupName, record_id, event_time, json.dumps(Record))
+            )
+            self.connection.commit()
+            self.stats['writes'] += 1
+        return {}
+
+    @staticmethod
+    def _typed(feature_type: str, value: str):
+        if feature_type == 'String':
+            return value
+        if value in ('', None):
+            return None
+        try:
+            return int(float(value)) if feature_type == 'Integral' else float(value)
+        except ValueError:
+            return value
+
+    def _lookup(self, feature_group_name: str, record_ids: List[str],
+                feature_names: Optional[List[str]]) -> Dict[str, List[Dict[str, str]]]:
+        with self._lock:
+            placeholders = ','.join('?' * len(record_ids))
+            rows = self.connection.execute(
+                f'SELECT record_id, record FROM online WHERE feature_group = ? '
+                f'AND record_id IN ({placeholders})', [feature_group_name] + list(record_ids)
+            ).fetchall()
+            self.stats['reads'] += len(record_ids)
+        records = {}
+        for record_id, record in rows:
+            record = json.loads(record)
+            if feature_names:
+                record = [feature for feature in record if feature['FeatureName'] in feature_names]
+            records[record_id] = record
+        return records
+
+    def get_record(self, FeatureGroupName: str, RecordIdentifierValueAsString: str,
+                   FeatureNames: Optional[List[str]] = None, **kwargs) -> Dict:
+        self._call('GetRecord')
+        record = self._lookup(FeatureGroupName, [RecordIdentifierValueAsString], FeatureNames)
+        # Like the service, a missing record is an empty response rather than an error
+        return {'Record': record[RecordIdentifierValueAsString]} if record else {}
+
+    def batch_get_record(self, Identifiers: List[Dict], **kwargs) -> Dict:
+        self._call('BatchGetRecord')
+        found, errors = [], []
+        for identifier in Identifiers:
+            group = identifier['FeatureGroupName']
+            record_ids = identifier['RecordIdentifiersValueAsString']
+            records = self._lookup(group, record_ids, identifier.get('FeatureNames'))
+            for record_id in record_ids:
+                if record_id in records:
+                    found.append({'FeatureGroupName': group,
+                                  'RecordIdentifierValueAsString': record_id,
+                                  'Record': records[record_id]})
+                else:
+                    errors.append({'FeatureGroupName': group,
+                                   'RecordIdentifierValueAsString': record_id,
+                                   'ErrorCode': 'ResourceNotFound',
+                                   'ErrorMessage': 'Record not found'})
+        return {'Records': found, 'Errors': errors, 'UnprocessedIdentifiers': []}
+
+    # Offline store --------------------------------------------------------
+
+    def query(self, sql: str):
+        """Run ``sql`` against the offline tables; returns (column names, rows)."""
+        with self._lock:
+            cursor = self.connection.execute(sql)
+            return [column[0] for column in cursor.description or []], cursor.fetchall()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class NoSuchKey(ClientError):
+    """Stands in for ``s3.exceptions.NoSuchKey`` on boto3 clients."""
+
+
+class LocalS3:
+    """Dictionary-backed S3 with the object calls the pipelines use."""
+
+    class exceptions:
+        NoSuchKey = NoSuchKey
+
+    def __init__(self):
+        self.objects: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, bucket: str, key: str, code: str, operation: str) -> bytes:
+        with self._lock:
+            data = self.objects.get((bucket, key))
+        if data is None:
+            error = _client_error(code, f'No object s3://{bucket}/{key}', operation)
+            if code == 'NoSuchKey':
+                raise NoSuchKey(error.response, operation)
+            raise error
+        return data
+
+    def put_object(self, Bucket: str, Key: str, Body=b'', **kwargs) -> Dict:
+        data = Body.read() if hasattr(Body, 'read') else Body
+        data = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        with self._lock:
+            self.objects[(Bucket, Key)] = data
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **kwargs) -> Dict:
+        data = self._get(Bucket, Key, 'NoSuchKey', 'GetObject')
+        if Range:
+            start, _, end = Range[len('bytes='):].partition('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        return {'Body': StreamingBody(io.BytesIO(data), len(data)), 'ContentLength': len(data)}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        return {'ContentLength': len(self._get(Bucket, Key, '404', 'HeadObject'))}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs) -> None:
+        with open(Filename, 'rb') as f:
+            self.put_object(Bucket=Bucket, Key=Key, Body=f.read())
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs) -> None:
+        data = self._get(Bucket, Key, '404', 'HeadObject')
+        with open(Filename, 'wb') as f:
+            f.write(data)
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', **kwargs) -> Dict:
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects
+                          if bucket == Bucket and key.startswith(Prefix))
+            contents = [{'Key': key, 'Size': len(self.objects[(Bucket, key)])} for key in keys]
+        return {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': False}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket: str, Delete: Dict, **kwargs) -> Dict:
+        with self._lock:
+            for item in Delete['Objects']:
+                self.objects.pop((Bucket, item['Key']), None)
+        return {'Deleted': [{'Key': item['Key']} for item in Delete['Objects']]}
+
+
+class LocalAthena:
+    """Runs Athena queries against a LocalFeatureStore's offline tables.
+
+    Queries run on a background thread after ``query_latency`` seconds, so
+    callers see QUEUED/RUNNING states and can cancel; results are written to
+    ``LocalS3`` as CSV with every value quoted, like Athena.
+    """
+
+    def __init__(self, store: LocalFeatureStore, s3: LocalS3, query_latency: float = 0.0):
+        self.store = store
+        self.s3 = s3
+        self.query_latency = query_latency
+        self.executions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+
+    def start_query_execution(self, QueryString: str, ResultConfiguration: Dict,
+                              QueryExecutionContext: Optional[Dict] = None, **kwargs) -> Dict:
+        execution_id = str(uuid.uuid4())
+        output = f"{ResultConfiguration['OutputLocation'].rstrip('/')}/{execution_id}.csv"
+        with self._lock:
+            self.executions[execution_id] = {
+                'QueryExecutionId': execution_id,
+                'Query': QueryString,
+                'ResultConfiguration': {'OutputLocation': output},
+                'Status': {'State': 'QUEUED'}
+            }
+        self._executor.submit(self._run, execution_id)
+        return {'QueryExecutionId': execution_id}
+
+    def _set_state(self, execution_id: str, state: str, reason: Optional[str] = None) -> bool:
+        with self._lock:
+            status = self.executions[execution_id]['Status']
+            if status['State'] == 'CANCELLED':
+                return False
+            status['State'] = state
+            if reason:
+                status['StateChangeReason'] = reason
+            return True
+
+    def _run(self, execution_id: str) -> None:
+        if not self._set_state(execution_id, 'RUNNING'):
+            return
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        execution = self.executions[execution_id]
+        try:
+            columns, rows = self.store.query(execution['Query'])
+        except sqlite3.Error as e:
+            self._set_state(execution_id, 'FAILED', str(e))
+            return
+
+        text = io.StringIO()
+        writer = csv.writer(text, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(['' if value is None else value for value in row] for row in rows)
+        bucket, _, key = execution['ResultConfiguration']['OutputLocation'][len('s3://'):].partition('/')
+        self.s3.put_object(Bucket=bucket, Key=key, Body=text.getvalue())
+        self._set_state(execution_id, 'SUCCEEDED')
+
+    def get_query_execution(self, QueryExecutionId: str, **kwargs) -> Dict:
+        with self._lock:
+            execution = self.executions.get(QueryExecutionId)
+            if execution is None:
+                raise _client_error('InvalidRequestException',
+                                    f'Unknown query {QueryExecutionId}', 'GetQueryExecution')
+            return {'QueryExecution': json.loads(json.dumps(execution))}
+
+    def batch_get_query_execution(self, QueryExecutionIds: List[str], **kwargs) -> Dict:
+        executions, unprocessed = [], []
+        for execution_id in QueryExecutionIds:
+            try:
+                executions.append(self.get_query_execution(QueryExecutionId=execution_id)['QueryExecution'])
+            except ClientError:
+                unprocessed.append({'QueryExecutionId': execution_id, 'ErrorCode': 'InvalidRequestException'})
+        return {'QueryExecutions': executions, 'UnprocessedQueryExecutionIds': unprocessed}
+
+    def stop_query_execution(self, QueryExecutionId: str, **kwargs) -> Dict:
+        with self._lock:
+            status = self.executions[QueryExecutionId]['Status']
+            if status['State'] in ('QUEUED', 'RUNNING'):
+                status['State'] = 'CANCELLED'
+        return {}
+
+
+def use_local_clients(store: LocalFeatureStore, s3: LocalS3,
+                      athena: Optional[LocalAthena] = None) -> None:
+    """Register the stand-ins as the process-wide clients returned by ``get_client``."""
+    from .aws_clients import set_client
+
+    set_client('sagemaker-featurestore-runtime', store)
+    set_client('sagemaker', store)
+    set_client('s3', s3)
+    set_client('athena', athena or LocalAthena(store, s3))
@@ -0,0 +1,161 @@
+# src/pipelines/model_training.py
+"""Cached training matrices and an instrumented XGBoost fit.
+
+``load_matrix`` reads the model columns once and stores them as float32
+``.npy`` files keyed by the source files' sizes and modification times, so
+later runs memory-map them instead of parsing CSV or Parquet again.
+``fit_model`` trains with the histogram tree method, an explicit thread count
+and early stopping, and reports wall time, per-iteration time and peak memory.
+
+Like feature_storage, this module is imported by the SageMaker training
+scripts, which run with ``src/pipelines`` as their source directory.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import resource
+import numpy as np
+import xgboost as xgb
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .feature_storage import read_features
+except ImportError:  # run as a SageMaker entry point, without the package
+    from feature_storage import read_features
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = ['temp', 'humidity', 'precip', 'windspeed', 'conditions',
+                   'cloudcover', 'visibility', 'solarradiation']
+# train_simple.py leaves out the encoded weather conditions
+SIMPLE_FEATURE_COLUMNS = [column for column in FEATURE_COLUMNS if column != 'conditions']
+TARGET_COLUMN = 'pm25'
+
+# Boosting rounds without improvement on the validation set before stopping
+DEFAULT_EARLY_STOPPING_ROUNDS = 10
+
+
+def get_matrix_cache_dir() -> Optional[str]:
+    """Directory for cached matrices from MATRIX_CACHE_DIR; None disables caching."""
+    return os.getenv('MATRIX_CACHE_DIR') or None
+
+
+def source_fingerprint(path: str) -> List:
+    """(name, size, mtime) of every data file under ``path``; changes whenever the data does."""
+    root = Path(path)
+    files = [root] if root.is_file() else sorted(
+        p for p in root.rglob('*') if p.is_file() and p.suffix in ('.csv', '.parquet'))
+    return [[str(p), p.stat().st_size, p.stat().st_mtime_ns] for p in files]
+
+
+def _save_array(array: np.ndarray, path: str) -> None:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def load_matrix(path: str, feature_columns: Optional[List[str]] = None,
+                target: str = TARGET_COLUMN,
+                cache_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Return float32 (X, y) for ``path``, reading the source only on a cache miss.
+
+    Rows without a target are dropped. Cached arrays are memory-mapped
+    read-only, so several processes can share one copy through the page cache.
+    """
+    feature_columns = feature_columns or FEATURE_COLUMNS
+    cache_dir = cache_dir or get_matrix_cache_dir()
+    if cache_dir:
+        key = hashlib.sha1(json.dumps([source_fingerprint(path), feature_columns, target])
+                           .encode('utf-8')).hexdigest()
+        x_path = os.path.join(cache_dir, f'{key}.X.npy')
+        y_path = os.path.join(cache_dir, f'{key}.y.npy')
+        if os.path.exists(x_path) and os.path.exists(y_path):
+            logger.info(f"Loading cached training matrix {key}")
+            return np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+
+    df = read_features(path, columns=feature_columns + [target])
+    df = df[df[target].notna()]
+    X = df[feature_columns].to_numpy(dtype='float32', na_value=np.nan)
+    y = df[target].to_numpy(dtype='float32', na_value=np.nan)
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save_array(X, x_path)
+        _save_array(y, y_path)
+        logger.info(f"Cached training matrix {key} ({X.shape[0]} rows)")
+    return X, y
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class IterationTimer(xgb.callback.TrainingCallback):
+    """Records the wall time of every boosting round."""
+
+    def __init__(self):
+        super().__init__()
+        self.durations: List[float] = []
+        self._started = 0.0
+
+    def before_iteration(self, model, epoch, evals_log) -> bool:
+        self._started = time.perf_counter()
+        return False
+
+    def after_iteration(self, model, epoch, evals_log) -> bool:
+        self.durations.append(time.perf_counter() - self._started)
+        return False
+
+
+def fit_model(X: np.ndarray, y: np.ndarray, X_valid: np.ndarray, y_valid: np.ndarray,
+              params: Dict, n_estimators: int = 100, nthread: Optional[int] = None,
+              early_stopping_rounds: Optional[int] = DEFAULT_EARLY_STOPPING_ROUNDS,
+              seed: int = 42) -> Tuple[xgb.XGBRegressor, Dict]:
+    """Fit an XGBRegressor with hist trees, stopping early on the validation set.
+
+    ``params`` holds the tuned hyperparameters (max_depth, learning_rate,
+    gamma, ...). Returns the model and a report with wall time, per-iteration
+    time, the best iteration and validation RMSE, and peak memory.
+    """
+    timer = IterationTimer()
+    model = xgb.XGBRegressor(
+        tree_method='hist',
+        n_jobs=nthread or os.cpu_count() or 1,
+        n_estimators=n_estimators,
+        early_stopping_rounds=early_stopping_rounds,
+        eval_metric='rmse',
+        callbacks=[timer],
+        random_state=seed,
+        **params
+    )
+    start = time.perf_counter()
+    model.fit(X, y, eval_set=[(X_valid, y_valid)], verbose=False)
+    wall = time.perf_counter() - start
+
+    # The timer is only needed during fit, and pickling it would tie model.joblib to this module
+    model.set_params(callbacks=None)
+
+    durations = np.asarray(timer.durations)
+    best_iteration = int(getattr(model, 'best_iteration', len(durations) - 1))
+    report = {
+        'wall_seconds': wall,
+        'iterations': len(durations),
+        'best_iteration': best_iteration,
+        'best_rmse': float(model.evals_result()['validation_0']['rmse'][best_iteration]),
+        'seconds_per_iteration': float(durations.mean()) if len(durations) else 0.0,
+        'p95_seconds_per_iteration': float(np.percentile(durations, 95)) if len(durations) else 0.0,
+        'nthread': model.n_jobs,
+        'peak_memory_mb': peak_memory_mb()
+    }
+    logger.info(f"Trained {report['iterations']} rounds in {wall:.2f}s "
+                f"({report['seconds_per_iteration'] * 1000:.1f} ms/round, "
+                f"best {report['best_iteration']}, peak {report['peak_memory_mb']:.0f} MB)")
+    return model, report
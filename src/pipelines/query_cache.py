@@ -0,0 +1,130 @@
+# src/pipelines/query_cache.py
+"""Content-addressed local cache for Athena query results.
+
+Entries are Parquet files named by the SHA-256 of the normalized SQL, any
+extra key parts and the feature group's freshness marker version (see
+``freshness``). Re-running an identical query returns the stored frame
+without starting an Athena query or downloading results; once a writer
+bumps the marker, every key changes and the old entries are never read
+again (they are pruned by count). ``max_age`` is a safety net for writers
+that do not bump the marker.
+
+Writers bump the marker once the online store has the records, but the
+offline store Athena reads lags it by minutes. For ``replication_grace``
+seconds after a bump, results are therefore returned without being stored,
+so a pre-replication result is never cached under the new version.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import tempfile
+import pandas as pd
+from typing import Optional
+
+from .freshness import get_marker_location, read_freshness_marker, read_freshness_version
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this are ignored; override with ATHENA_CACHE_TTL (seconds)
+DEFAULT_CACHE_TTL_SECONDS = 86400
+
+# Entries kept on disk; older ones are removed when a new one is stored
+DEFAULT_MAX_ENTRIES = 32
+
+# Offline-store replication lag after a marker bump; override with ATHENA_CACHE_GRACE (seconds)
+DEFAULT_REPLICATION_GRACE_SECONDS = 900
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon, so formatting does not change the key."""
+    return re.sub(r'\s+', ' ', query).strip().rstrip(';').strip()
+
+
+class QueryResultCache:
+    """Maps (SQL, freshness version) to a stored DataFrame."""
+
+    def __init__(self, directory: str, marker_location: Optional[str] = None,
+                 max_age: float = DEFAULT_CACHE_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, s3_client=None,
+                 replication_grace: float = DEFAULT_REPLICATION_GRACE_SECONDS):
+        self.directory = directory
+        self.marker_location = marker_location
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.replication_grace = replication_grace
+        self.s3 = s3_client
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, query: str, *parts: str) -> str:
+        """Cache key for ``query`` against the feature group as it is right now."""
+        version = (read_freshness_version(self.marker_location, s3_client=self.s3)
+                   if self.marker_location else '')
+        content = '\n'.join([normalize_sql(query), *parts, version])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.parquet')
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        if age > self.max_age:
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+
+    def settling(self) -> bool:
+        """True while the offline store may still be catching up with the last marker bump."""
+        if not self.marker_location or self.replication_grace <= 0:
+            return False
+        marker = read_freshness_marker(self.marker_location, s3_client=self.s3)
+        return bool(marker) and time.time() - marker.get('updated_at', 0) < self.replication_grace
+
+    def store(self, key: str, df: pd.DataFrame) -> None:
+        if self.settling():
+            logger.info("Not caching query result: the offline store may still be replicating new records")
+            return
+        path = self._path(key)
+        # A unique temporary file per writer, so concurrent stores of one key cannot clash
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith('.parquet')),
+                         key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_entries:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def build_query_cache_from_env(s3_client=None) -> Optional[QueryResultCache]:
+    """Create the cache configured by ATHENA_CACHE_DIR (and FRESHNESS_MARKER); None when unset."""
+    directory = os.getenv('ATHENA_CACHE_DIR')
+    if not directory:
+        return None
+    marker_location = get_marker_location()
+    if marker_location is None:
+        logger.warning("ATHENA_CACHE_DIR is set without FRESHNESS_MARKER; "
+                       "cached results only expire after ATHENA_CACHE_TTL")
+    return QueryResultCache(directory, marker_location,
+                            max_age=float(os.getenv('ATHENA_CACHE_TTL', DEFAULT_CACHE_TTL_SECONDS)),
+                            s3_client=s3_client,
+                            replication_grace=float(os.getenv('ATHENA_CACHE_GRACE',
+                                                              DEFAULT_REPLICATION_GRACE_SECONDS)))
@@ -0,0 +1,152 @@
+# src/pipelines/raw_data_loader.py
+"""Streaming loader for the raw weather and air-quality CSV exports.
+
+Weather files are read in fixed-size chunks with explicit dtypes, joined on
+date against the city's pm25 history and cleaned the same way
+``FeaturePipeline.process_features`` cleans live data. Only one weather chunk
+and one city's ``(date, pm25)`` series are held in memory at a time, so adding
+cities or years does not grow the footprint:
+
+    for city, features in iter_all_cities('data/raw_data'):
+        ...
+"""
+import shutil
+import logging
+import pandas as pd
+from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .feature_pipeline import WEATHER_NUMERIC_COLUMNS, WEATHER_STRING_COLUMNS, clean_features
+from .feature_storage import write_dataset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+CITIES = ['boston', 'london', 'los_angeles', 'paris', 'san_francisco', 'seoul', 'shanghai']
+
+# Weather exports are named <prefix>_<year>.csv; cities not listed use their own name
+CITY_WEATHER_PREFIXES = {'los_angeles': 'la'}
+
+# Air-quality exports per city, in priority order; earlier files win on duplicate dates
+CITY_AIR_QUALITY_FILES = {
+    'los_angeles': ['los_angeles.csv', 'los-angeles-north main street-air-quality.csv']
+}
+
+WEATHER_DTYPES = {
+    **{column: 'float64' for column in WEATHER_NUMERIC_COLUMNS},
+    **{column: 'string' for column in WEATHER_STRING_COLUMNS},
+    'datetime': 'string'
+}
+
+
+def weather_files(city: str, raw_dir: str) -> List[Path]:
+    """Weather CSVs for a city, oldest first."""
+    prefix = CITY_WEATHER_PREFIXES.get(city, city)
+    return sorted((Path(raw_dir) / 'weather').glob(f'{prefix}_*.csv'))
+
+
+def air_quality_files(city: str, raw_dir: str) -> List[Path]:
+    """Air-quality CSVs for a city that exist on disk, in priority order."""
+    names = CITY_AIR_QUALITY_FILES.get(city, [f'{city}.csv'])
+    paths = [Path(raw_dir) / 'air_quality' / name for name in names]
+    return [path for path in paths if path.exists()]
+
+
+def load_pm25(city: str, raw_dir: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> pd.Series:
+    """Read a city's pm25 history as a date-indexed series.
+
+    Only the ``date`` and ``pm25`` columns are parsed. The WAQI exports pad
+    both headers and values with spaces and write dates as ``2025/3/2``.
+    """
+    parts = []
+    for path in air_quality_files(city, raw_dir):
+        reader = pd.read_csv(path, usecols=['date', 'pm25'], dtype='string',
+                             skipinitialspace=True, chunksize=chunksize)
+        for chunk in reader:
+            chunk['date'] = pd.to_datetime(chunk['date'], format='%Y/%m/%d')
+            parts.append(chunk)
+    if not parts:
+        return pd.Series(dtype='string', index=pd.DatetimeIndex([], name='date'), name='pm25')
+
+    pm25 = pd.concat(parts, ignore_index=True).drop_duplicates('date', keep='first')
+    return pm25.set_index('date')['pm25'].sort_index()
+
+
+def iter_weather_chunks(city: str, raw_dir: str,
+                        chunksize: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield typed weather chunks for a city, skipping dates already seen.
+
+    Consecutive exports overlap by a day or two; the first occurrence wins.
+    """
+    seen: Set[pd.Timestamp] = set()
+    for path in weather_files(city, raw_dir):
+        for chunk in pd.read_csv(path, dtype=WEATHER_DTYPES, chunksize=chunksize):
+            chunk['datetime'] = pd.to_datetime(chunk['datetime'])
+            chunk = chunk[~chunk['datetime'].isin(seen)]
+            seen.update(chunk['datetime'])
+            if not chunk.empty:
+                yield chunk
+
+
+def iter_city_features(city: str, raw_dir: str,
+                       chunksize: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield cleaned, date-joined feature chunks for one city."""
+    if not weather_files(city, raw_dir):
+        logger.warning(f"No weather exports found for {city}; skipping")
+        return
+    pm25 = load_pm25(city, raw_dir, chunksize)
+    if pm25.empty:
+        logger.warning(f"No air-quality exports found for {city}; skipping")
+        return
+
+    for weather in iter_weather_chunks(city, raw_dir, chunksize):
+        features = weather.rename(columns={'datetime': 'date'}).merge(
+            pm25, left_on='date', right_index=True, how='inner')
+        features = clean_features(features)
+        # Keep dtypes identical across chunks even when a chunk has unmapped conditions
+        features['conditions'] = features['conditions'].astype('Int64')
+        features = features[features['pm25'].notna()].reset_index(drop=True)
+        if features.empty:
+            continue
+        features.insert(0, 'city', pd.Series(city, index=features.index, dtype='string'))
+        yield features
+
+
+def iter_all_cities(raw_dir: str, cities: Optional[List[str]] = None,
+                    chunksize: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Yield (city, features) chunks for every city in turn."""
+    for city in cities or CITIES:
+        for features in iter_city_features(city, raw_dir, chunksize):
+            yield city, features
+
+
+def summarize_cities(raw_dir: str, cities: Optional[List[str]] = None,
+                     chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Dict]:
+    """Row counts and date coverage per city, computed without holding the data."""
+    summary: Dict[str, Dict] = {}
+    for city, features in iter_all_cities(raw_dir, cities, chunksize):
+        stats = summary.setdefault(city, {'rows': 0, 'start': None, 'end': None})
+        stats['rows'] += len(features)
+        start, end = features['date'].min(), features['date'].max()
+        stats['start'] = start if stats['start'] is None else min(stats['start'], start)
+        stats['end'] = end if stats['end'] is None else max(stats['end'], end)
+    return summary
+
+
+def write_features_dataset(raw_dir: str, output: str, cities: Optional[List[str]] = None,
+                           chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """Stream every city into a Parquet dataset partitioned by city and year.
+
+    Each city's partitions are cleared first and then filled chunk by chunk,
+    so a rerun replaces the city without ever holding all of it in memory.
+    """
+    rows: Dict[str, int] = {}
+    for city, features in iter_all_cities(raw_dir, cities, chunksize):
+        if city not in rows:
+            shutil.rmtree(Path(output) / f'city={quote(city)}', ignore_errors=True)
+            rows[city] = 0
+        write_dataset(features, output, basename=f'{city}-{rows[city]}', overwrite=False)
+        rows[city] += len(features)
+    return rows
@@ -0,0 +1,136 @@
+# src/pipelines/resilience.py
+import time
+import random
+import logging
+import threading
+import requests
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Time kept back from the Lambda timeout for flushing metrics and returning
+DEFAULT_SAFETY_MARGIN_SECONDS = 10.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the invocation has no time left for another attempt."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class Deadline:
+    """Wall-clock budget shared by every call made during one invocation."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    @classmethod
+    def from_lambda_context(cls, context,
+                            safety_margin: float = DEFAULT_SAFETY_MARGIN_SECONDS) -> 'Deadline':
+        """Deadline ending ``safety_margin`` seconds before the Lambda times out."""
+        if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+            return cls(None)
+        return cls(context.get_remaining_time_in_millis() / 1000 - safety_margin)
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """Per-provider breaker: opens after consecutive failures, probes after a cool-down."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go through (one probe at a time when half open)."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def is_transient(error: Exception) -> bool:
+    """Connection problems, timeouts, 429 and 5xx are worth retrying; 4xx are not."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class RetryPolicy:
+    """Exponential-backoff retries that never sleep past the shared deadline."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 10.0,
+                 retry_if: Callable[[Exception], bool] = is_transient):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_if = retry_if
+
+    def call(self, fn: Callable[[], Any], deadline: Optional[Deadline] = None,
+             breaker: Optional[CircuitBreaker] = None) -> Any:
+        """Call ``fn`` until it succeeds, fails permanently or runs out of budget."""
+        deadline = deadline or Deadline(None)
+        for attempt in range(1, self.max_attempts + 1):
+            if deadline.expired():
+                raise DeadlineExceeded("No time left in the invocation budget")
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(f"Circuit for {breaker.name} is open")
+
+            try:
+                result = fn()
+            except Exception as e:
+                if not self.retry_if(e):
+                    # The provider answered, it just rejected this request
+                    if breaker is not None:
+                        breaker.record_success()
+                    raise
+                if breaker is not None:
+                    breaker.record_failure()
+                if attempt == self.max_attempts:
+                    raise
+
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                if delay >= deadline.remaining():
+                    raise DeadlineExceeded(
+                        f"Not enough time left to retry after: {str(e)}") from e
+                logger.warning(f"Attempt {attempt} failed ({str(e)}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
@@ -0,0 +1,134 @@
+# src/pipelines/response_cache.py
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional
+
+from .aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# How long an upstream response is reused; override with RESPONSE_CACHE_TTL
+DEFAULT_RESPONSE_CACHE_TTL_SECONDS = 3600
+
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', value.strip().lower()).strip('-')
+
+
+class ResponseCache(ABC):
+    """Upstream API responses keyed by provider, city and observation date.
+
+    Subclasses only store and load JSON documents; expiry is handled here
+    so that every backend applies the same TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_RESPONSE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def make_key(provider: str, city: str, observation_date: str) -> str:
+        return f"{_slug(provider)}/{_slug(city)}/{observation_date}.json"
+
+    def get(self, provider: str, city: str, observation_date: str) -> Optional[Dict]:
+        """Return the cached payload, or None when it is missing or expired."""
+        key = self.make_key(provider, city, observation_date)
+        try:
+            entry = self._load(key)
+        except Exception as e:
+            logger.warning(f"Error reading response cache entry {key}: {str(e)}")
+            return None
+        if entry is None or time.time() - entry['stored_at'] > self.ttl_seconds:
+            return None
+        return entry['payload']
+
+    def set(self, provider: str, city: str, observation_date: str, payload: Dict) -> None:
+        """Store a payload; failures are logged and otherwise ignored."""
+        key = self.make_key(provider, city, observation_date)
+        try:
+            self._store(key, json.dumps({'stored_at': time.time(), 'payload': payload}))
+        except Exception as e:
+            logger.warning(f"Error writing response cache entry {key}: {str(e)}")
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[Dict]:
+        """Return the stored entry for ``key``, or None when there is none."""
+
+    @abstractmethod
+    def _store(self, key: str, document: str) -> None:
+        """Store the serialized entry for ``key``."""
+
+
+class LocalDiskResponseCache(ResponseCache):
+    """Stores each response as a JSON file below ``directory``."""
+
+    def __init__(self, directory: str, ttl_seconds: float = DEFAULT_RESPONSE_CACHE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.directory = Path(directory)
+
+    def _load(self, key: str) -> Optional[Dict]:
+        path = self.directory / key
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def _store(self, key: str, document: str) -> None:
+        path = self.directory / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temporary file per writer, so concurrent fetches of one key cannot clash
+        with tempfile.NamedTemporaryFile('w', dir=path.parent, suffix='.tmp', delete=False) as f:
+            f.write(document)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+
+class S3ResponseCache(ResponseCache):
+    """Stores each response as an object below ``s3://bucket/prefix``."""
+
+    def __init__(self, s3_client, bucket: str, prefix: str = 'response-cache',
+                 ttl_seconds: float = DEFAULT_RESPONSE_CACHE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _load(self, key: str) -> Optional[Dict]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def _store(self, key: str, document: str) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self._object_key(key),
+                           Body=document.encode('utf-8'), ContentType='application/json')
+
+
+def build_response_cache_from_env() -> Optional[ResponseCache]:
+    """Create the cache configured by RESPONSE_CACHE_DIR or RESPONSE_CACHE_S3_URI.
+
+    Returns None (no caching) when neither is set.
+    """
+    ttl = float(os.getenv('RESPONSE_CACHE_TTL', DEFAULT_RESPONSE_CACHE_TTL_SECONDS))
+    s3_uri = os.getenv('RESPONSE_CACHE_S3_URI')
+    if s3_uri:
+        if not s3_uri.startswith('s3://'):
+            raise ValueError(f"RESPONSE_CACHE_S3_URI must start with s3://, got {s3_uri}")
+        bucket, _, prefix = s3_uri[len('s3://'):].partition('/')
+        return S3ResponseCache(get_client('s3'), bucket, prefix, ttl_seconds=ttl)
+
+    directory = os.getenv('RESPONSE_CACHE_DIR')
+    if directory:
+        return LocalDiskResponseCache(directory, ttl_seconds=ttl)
+    return None
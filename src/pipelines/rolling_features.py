@@ -0,0 +1,218 @@
+# src/pipelines/rolling_features.py
+"""Lag and rolling-window features kept up to date incrementally.
+
+``RollingFeatureEngine`` holds a ring buffer of the last few days per city,
+indexed by day number, so each daily update and lookup touches a fixed
+number of slots however long the history is. ``compute_rolling_features``
+is the batch equivalent over a full history (e.g. the processed CSVs) and
+``verify_against_batch`` checks that the two agree. Seed the state from the
+raw exports (verifying against the batch result on the way) with:
+
+    python -m src.pipelines.rolling_features --raw-dir data/raw_data \
+        --state rolling_state.json
+
+Windows are calendar days ending on (and including) the row's date; missing
+days are skipped rather than filled, like pandas' time-based rolling.
+"""
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from .dedup_index import _slug
+from .state_store import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+# pm25 from 1 and 7 days before the row's date
+LAGS = {'pm25': [1, 7]}
+
+# Means over the last 3 and 7 calendar days, including the row's date
+WINDOWS = {'temp': [3, 7], 'windspeed': [3, 7], 'humidity': [3, 7]}
+
+ROLLING_FEATURE_COLUMNS = (
+    [f'{column}_lag{lag}' for column, lags in LAGS.items() for lag in lags]
+    + [f'{column}_mean{days}' for column, windows in WINDOWS.items() for days in windows]
+)
+
+# Enough slots for the longest lag plus the day itself
+BUFFER_DAYS = max([lag + 1 for lags in LAGS.values() for lag in lags]
+                  + [days for windows in WINDOWS.values() for days in windows])
+
+SOURCE_COLUMNS = list(dict.fromkeys(list(LAGS) + list(WINDOWS)))
+
+
+def _day(value) -> int:
+    return pd.Timestamp(value).toordinal()
+
+
+def city_key(city) -> str:
+    """Buffer key for a city; the raw exports' ``los_angeles`` and the APIs' ``los angeles`` match."""
+    return _slug(city)
+
+
+def _as_float(value) -> float:
+    return float('nan') if value is None or pd.isna(value) else float(value)
+
+
+class CityBuffer:
+    """Fixed-size ring of (day number, source values) for one city."""
+
+    def __init__(self, size: int = BUFFER_DAYS):
+        self.size = size
+        self.slots: List[Optional[list]] = [None] * size
+
+    def put(self, day: int, values: Dict[str, float]) -> None:
+        self.slots[day % self.size] = [day, values]
+
+    def get(self, day: int, column: str) -> float:
+        slot = self.slots[day % self.size]
+        if slot is None or slot[0] != day:
+            return float('nan')
+        return slot[1].get(column, float('nan'))
+
+    def latest_day(self) -> Optional[int]:
+        days = [slot[0] for slot in self.slots if slot is not None]
+        return max(days) if days else None
+
+
+class RollingFeatureEngine:
+    """Per-city ring buffers producing lag and rolling-mean features in O(1) per row."""
+
+    def __init__(self, buffers: Optional[Dict[str, CityBuffer]] = None):
+        self.buffers = buffers or {}
+
+    def update(self, city: str, date, values: Dict) -> Dict[str, float]:
+        """Record one day's values for ``city`` and return its rolling features.
+
+        Days older than the buffer are ignored (their features are still
+        computed from whatever the buffer holds); a repeated day overwrites.
+        """
+        buffer = self.buffers.setdefault(city_key(city), CityBuffer())
+        day = _day(date)
+        latest = buffer.latest_day()
+        if latest is None or day > latest - buffer.size:
+            buffer.put(day, {column: _as_float(values.get(column)) for column in SOURCE_COLUMNS})
+
+        features = {}
+        for column, lags in LAGS.items():
+            for lag in lags:
+                features[f'{column}_lag{lag}'] = buffer.get(day - lag, column)
+        for column, windows in WINDOWS.items():
+            for days in windows:
+                window = [buffer.get(day - offset, column) for offset in range(days)]
+                window = [value for value in window if not np.isnan(value)]
+                features[f'{column}_mean{days}'] = sum(window) / len(window) if window else float('nan')
+        return features
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Update the buffers with every row (in date order) and add the feature columns."""
+        if df.empty:
+            return df.assign(**{column: pd.Series(dtype='float64') for column in ROLLING_FEATURE_COLUMNS})
+        order = pd.to_datetime(df['date']).sort_values(kind='stable').index
+        columns = ['city', 'date'] + [c for c in SOURCE_COLUMNS if c in df.columns]
+        rows = {}
+        for index, row in zip(order, df.loc[order, columns].to_dict('records')):
+            rows[index] = self.update(row['city'], row['date'], row)
+        features = pd.DataFrame.from_dict(rows, orient='index', columns=ROLLING_FEATURE_COLUMNS)
+        return df.join(features.astype('float64'))
+
+    def to_dict(self) -> Dict:
+        return {city: {'size': buffer.size, 'slots': buffer.slots}
+                for city, buffer in self.buffers.items()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'RollingFeatureEngine':
+        buffers = {}
+        for city, saved in state.items():
+            buffer = CityBuffer(saved['size'])
+            # JSON has no NaN literal in strict mode, so None stands in for missing values
+            buffer.slots = [None if slot is None else
+                            [slot[0], {k: _as_float(v) for k, v in slot[1].items()}]
+                            for slot in saved['slots']]
+            # States saved before keys were normalized may use the raw city names
+            buffers[city_key(city)] = buffer
+        return cls(buffers)
+
+    @classmethod
+    def load(cls, location: str) -> 'RollingFeatureEngine':
+        """Load saved buffers, or start empty if there is no state yet."""
+        state = load_json_state(location)
+        return cls() if state is None else cls.from_dict(state)
+
+    def save(self, location: str) -> None:
+        state = self.to_dict()
+        for saved in state.values():
+            saved['slots'] = [None if slot is None else
+                              [slot[0], {k: None if np.isnan(v) else v for k, v in slot[1].items()}]
+                              for slot in saved['slots']]
+        save_json_state(state, location)
+
+
+def compute_rolling_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Batch computation of the same features over a full (city, date) history."""
+    parts = []
+    for city, group in df.groupby('city', sort=False):
+        group = group.assign(date=pd.to_datetime(group['date'])).sort_values('date')
+        history = group.set_index('date')
+        features = pd.DataFrame(index=group.index)
+        for column, lags in LAGS.items():
+            for lag in lags:
+                shifted = history[column].astype('float64')
+                shifted.index = shifted.index + pd.Timedelta(days=lag)
+                features[f'{column}_lag{lag}'] = shifted.reindex(history.index).to_numpy()
+        for column, windows in WINDOWS.items():
+            for days in windows:
+                means = history[column].astype('float64').rolling(f'{days}D').mean()
+                features[f'{column}_mean{days}'] = means.to_numpy()
+        parts.append(features)
+    if not parts:
+        return df.assign(**{column: pd.Series(dtype='float64') for column in ROLLING_FEATURE_COLUMNS})
+    return df.join(pd.concat(parts)[ROLLING_FEATURE_COLUMNS])
+
+
+def verify_against_batch(df: pd.DataFrame, rtol: float = 1e-9) -> Dict[str, float]:
+    """Replay ``df`` through a fresh engine and compare with the batch result.
+
+    Returns the largest absolute difference per feature column; raises
+    ValueError if any column differs beyond ``rtol`` or in its missing values.
+    """
+    incremental = RollingFeatureEngine().transform(df)
+    batch = compute_rolling_features(df)
+    differences = {}
+    for column in ROLLING_FEATURE_COLUMNS:
+        a = incremental[column].to_numpy(dtype='float64')
+        b = batch.loc[incremental.index, column].to_numpy(dtype='float64')
+        if not np.array_equal(np.isnan(a), np.isnan(b)) or not np.allclose(a, b, rtol=rtol, equal_nan=True):
+            raise ValueError(f"Incremental and batch values differ for {column}")
+        both = ~np.isnan(a)
+        differences[column] = float(np.abs(a[both] - b[both]).max()) if both.any() else 0.0
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed rolling feature state from raw history')
+    parser.add_argument('--raw-dir', type=str, default='data/raw_data')
+    parser.add_argument('--state', type=str, default='rolling_state.json')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from .raw_data_loader import CITIES, iter_city_features
+
+    engine = RollingFeatureEngine()
+    report = {}
+    for city in CITIES:
+        chunks = list(iter_city_features(city, args.raw_dir))
+        if not chunks:
+            continue
+        history = pd.concat(chunks, ignore_index=True)
+        report[city] = verify_against_batch(history)
+        engine.transform(history)
+    engine.save(args.state)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# src/pipelines/state_store.py
+import os
+import json
+import logging
+import tempfile
+from typing import Dict, Optional
+
+from .aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+
+def _split_s3_uri(location: str):
+    bucket, _, key = location[len('s3://'):].partition('/')
+    return bucket, key
+
+
+def load_json_state(location: str, s3_client=None) -> Optional[Dict]:
+    """Load a JSON state document from a local path or s3:// URI; None if it does not exist."""
+    if location.startswith('s3://'):
+        bucket, key = _split_s3_uri(location)
+        s3 = s3_client or get_client('s3')
+        try:
+            body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        except s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(body)
+    if not os.path.exists(location):
+        return None
+    with open(location) as f:
+        return json.load(f)
+
+
+def save_json_state(document: Dict, location: str, s3_client=None) -> None:
+    """Write a JSON state document to a local path (atomically) or an s3:// URI."""
+    body = json.dumps(document)
+    if location.startswith('s3://'):
+        bucket, key = _split_s3_uri(location)
+        (s3_client or get_client('s3')).put_object(Bucket=bucket, Key=key, Body=body.encode('utf-8'),
+                                    ContentType='application/json')
+        return
+    # A unique temporary file per writer, so concurrent saves of one state cannot clash
+    directory = os.path.dirname(os.path.abspath(location))
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+        f.write(body)
+    try:
+        os.replace(f.name, location)
+    except OSError:
+        os.remove(f.name)
+        raise
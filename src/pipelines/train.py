@@ -1,28 +1,73 @@
 # src/pipelines/train.py
 import argparse
+import logging
 import os
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import xgboost as xgb
 import mlflow
-import boto3
 import joblib
 
+try:
+    from .model_training import (
+        DEFAULT_EARLY_STOPPING_ROUNDS, FEATURE_COLUMNS, fit_model, get_matrix_cache_dir, load_matrix
+    )
+    from .cross_validation import (
+        DEFAULT_N_SPLITS, DEFAULT_VALID_FRACTION, cross_validate, early_stopping_split,
+        load_ordered_matrix, rolling_origin_folds
+    )
+except ImportError:  # run as a SageMaker entry point, without the package
+    from model_training import (
+        DEFAULT_EARLY_STOPPING_ROUNDS, FEATURE_COLUMNS, fit_model, get_matrix_cache_dir, load_matrix
+    )
+    from cross_validation import (
+        DEFAULT_N_SPLITS, DEFAULT_VALID_FRACTION, cross_validate, early_stopping_split,
+        load_ordered_matrix, rolling_origin_folds
+    )
+
+# Used when no validation channel is configured (e.g. running locally)
+DEFAULT_VALIDATION_PATH = 'data/processed_data/validation.csv'
+
+def load_validation(path, cache_dir, before_day=None):
+    """Validation (X, y) from a CSV file or a channel directory holding validation.csv.
+
+    With ``before_day`` (days since the epoch) only rows dated before it are
+    kept, so a randomly split validation file cannot overlap a date holdout.
+    """
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'validation.csv')):
+        path = os.path.join(path, 'validation.csv')
+    if before_day is not None:
+        try:
+            X, y, days = load_ordered_matrix(path, FEATURE_COLUMNS)
+        except ValueError as e:
+            print(f"Cannot check validation dates ({e}); using every validation row")
+        else:
+            return X[days < before_day], y[days < before_day]
+    return load_matrix(path, FEATURE_COLUMNS, cache_dir=cache_dir)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model-dir', type=str, default=os.environ.get('SM_MODEL_DIR'))
     parser.add_argument('--train', type=str, default=os.environ.get('SM_CHANNEL_TRAIN'))
+    parser.add_argument('--validation', type=str,
+                        default=os.environ.get('SM_CHANNEL_VALIDATION', DEFAULT_VALIDATION_PATH))
+    parser.add_argument('--cache-dir', type=str, default=get_matrix_cache_dir(),
+                        help='Directory for the cached binary training matrix')
+    parser.add_argument('--nthread', type=int, default=os.cpu_count())
+    parser.add_argument('--early-stopping-rounds', type=int, default=DEFAULT_EARLY_STOPPING_ROUNDS)
+    parser.add_argument('--cv-folds', type=int, default=DEFAULT_N_SPLITS,
+                        help='Time-series cross-validation folds over dated training data (0 to skip)')
     parser.add_argument('--max-depth', type=int, default=6)
     parser.add_argument('--eta', type=float, default=0.2)
-    parser.add_argument('--gamma', type=int, default=4)
+    parser.add_argument('--gamma', type=float, default=4)
     parser.add_argument('--min-child-weight', type=int, default=6)
     parser.add_argument('--subsample', type=float, default=0.8)
     parser.add_argument('--n-estimators', type=int, default=100)
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
     
     # Set MLflow tracking URI to S3
     mlflow.set_tracking_uri("s3://your-bucket/mlflow-tracking")
@@ -36,39 +81,80 @@ def main():
         mlflow.log_param("min_child_weight", args.min_child_weight)
         mlflow.log_param("subsample", args.subsample)
         mlflow.log_param("n_estimators", args.n_estimators)
+        mlflow.log_param("nthread", args.nthread)
         
-        # Load training data
-        train_data = pd.read_csv(os.path.join(args.train, 'train.csv'))
-        
-        # Prepare features and target
-        feature_columns = ['temp', 'humidity', 'precip', 'windspeed', 'conditions', 
-                          'cloudcover', 'visibility', 'solarradiation']
-        X = train_data[feature_columns]
-        y = train_data['pm25']
+        params = {
+            'max_depth': args.max_depth,
+            'learning_rate': args.eta,
+            'gamma': args.gamma,
+            'min_child_weight': args.min_child_weight,
+            'subsample': args.subsample
+        }
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        # Metrics are always computed on a holdout that early stopping never sees
+        has_validation = bool(args.validation) and os.path.exists(args.validation)
+        try:
+            X, y, days = load_ordered_matrix(args.train, FEATURE_COLUMNS)
+        except ValueError as e:
+            # Undated training data: hold out a random 20% as before
+            print(f"No dates to split on ({e}); holding out a random 20%")
+            # Float32 matrices, read from the channel once and memory-mapped from the cache afterwards
+            X, y = load_matrix(args.train, FEATURE_COLUMNS, cache_dir=args.cache_dir)
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42
+            )
+            if has_validation:
+                X_valid, y_valid = load_validation(args.validation, args.cache_dir)
+            else:
+                # Early-stop on a slice of the training rows, so the held-out 20% stays unseen
+                X_train, X_valid, y_train, y_valid = train_test_split(
+                    X_train, y_train, test_size=DEFAULT_VALID_FRACTION, random_state=42
+                )
+        else:
+            if args.cv_folds > 0:
+                cv = cross_validate(X, y, days, params, n_splits=args.cv_folds,
+                                    n_estimators=args.n_estimators,
+                                    early_stopping_rounds=args.early_stopping_rounds)
+                for fold in cv['folds']:
+                    for name in ('rmse', 'mae', 'r2'):
+                        mlflow.log_metric(f"cv_{name}", fold[name], step=fold['fold'])
+                for name, value in cv['overall'].items():
+                    mlflow.log_metric(f"cv_overall_{name}", value)
+                print(f"Cross-validation over {len(cv['folds'])} folds: "
+                      f"RMSE {cv['overall']['rmse']:.2f} (fold std {cv['overall']['rmse_std']:.2f}), "
+                      f"MAE {cv['overall']['mae']:.2f}, R2 {cv['overall']['r2']:.3f}")
+            # Hold out the most recent fifth of the dates, so the model is scored on its future
+            train_end, test_start, test_end = rolling_origin_folds(days, n_splits=4)[-1]
+            X_test, y_test = X[test_start:test_end], y[test_start:test_end]
+            y_valid = []
+            if has_validation:
+                # The validation channel only picks the early-stopping round; rows from the
+                # holdout's dates are dropped so they cannot leak into it
+                X_valid, y_valid = load_validation(args.validation, args.cache_dir,
+                                                   before_day=days[test_start])
+            if len(y_valid):
+                X_train, y_train = X[:train_end], y[:train_end]
+            else:
+                # Early-stop on the newest slice of the training window, as the CV folds do
+                fit_end = early_stopping_split(train_end)
+                X_train, y_train = X[:fit_end], y[:fit_end]
+                X_valid, y_valid = X[fit_end:train_end], y[fit_end:train_end]
         
         # Scale features
         scaler = StandardScaler()
         X_train_scaled = scaler.fit_transform(X_train)
+        X_valid_scaled = scaler.transform(X_valid)
         X_test_scaled = scaler.transform(X_test)
         
-        # Train XGBoost model
-        model = xgb.XGBRegressor(
-            max_depth=args.max_depth,
-            learning_rate=args.eta,
-            gamma=args.gamma,
-            min_child_weight=args.min_child_weight,
-            subsample=args.subsample,
+        # Train XGBoost model: hist trees on every core, stopping when validation RMSE stalls
+        model, report = fit_model(
+            X_train_scaled, y_train, X_valid_scaled, y_valid,
+            params=params,
             n_estimators=args.n_estimators,
-            random_state=42
+            nthread=args.nthread,
+            early_stopping_rounds=args.early_stopping_rounds
         )
         
-        model.fit(X_train_scaled, y_train)
-        
         # Make predictions
         y_pred = model.predict(X_test_scaled)
         
@@ -83,16 +169,19 @@ def main():
         mlflow.log_metric("rmse", rmse)
         mlflow.log_metric("mae", mae)
         mlflow.log_metric("r2", r2)
+        for name in ('wall_seconds', 'seconds_per_iteration', 'best_iteration', 'peak_memory_mb'):
+            mlflow.log_metric(name, report[name])
         
-        # Log model artifacts
-        mlflow.log_artifact(os.path.join(args.model_dir, 'model.joblib'))
-        mlflow.log_artifact(os.path.join(args.model_dir, 'scaler.joblib'))
-        
-        # Save model and scaler
+        # Save model and scaler, then log them as artifacts
         joblib.dump(model, os.path.join(args.model_dir, 'model.joblib'))
         joblib.dump(scaler, os.path.join(args.model_dir, 'scaler.joblib'))
+        mlflow.log_artifact(os.path.join(args.model_dir, 'model.joblib'))
+        mlflow.log_artifact(os.path.join(args.model_dir, 'scaler.joblib'))
         
-        print(f"Model trained successfully. RMSE: {rmse:.2f}, R2: {r2:.3f}")
+        print(f"Model trained successfully. Holdout RMSE: {rmse:.2f}, R2: {r2:.3f}")
+        print(f"Training time: {report['wall_seconds']:.2f}s for {report['iterations']} rounds "
+              f"({report['seconds_per_iteration'] * 1000:.1f} ms/round, best round {report['best_iteration']}), "
+              f"{report['nthread']} threads, peak memory {report['peak_memory_mb']:.0f} MB")
 
 if __name__ == '__main__':
     main()
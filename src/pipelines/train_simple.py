@@ -1,9 +1,15 @@
 import argparse
-import pandas as pd
 import xgboost as xgb
 import joblib
 import os
 
+try:
+    from .feature_storage import read_features
+    from .model_training import SIMPLE_FEATURE_COLUMNS
+except ImportError:  # run as a SageMaker entry point, without the package
+    from feature_storage import read_features
+    from model_training import SIMPLE_FEATURE_COLUMNS
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--max_depth', type=int, default=6)
@@ -13,16 +19,17 @@ def main():
     parser.add_argument('--subsample', type=float, default=0.8)
     parser.add_argument('--objective', type=str, default='reg:squarederror')
     parser.add_argument('--num_round', type=int, default=100)
+    parser.add_argument('--nthread', type=int, default=os.cpu_count())
     
     args = parser.parse_args()
     
-    # Load training data
-    train_data = pd.read_csv('/opt/ml/input/data/train/train.csv')
-    
     # Prepare features and target
-    feature_cols = ['temp', 'humidity', 'precip', 'windspeed', 'cloudcover', 'visibility', 'solarradiation']
-    X = train_data[feature_cols]
-    y = train_data['pm25']
+    feature_cols = SIMPLE_FEATURE_COLUMNS
+
+    # Load only the needed columns (Parquet dataset if the channel has one, else train.csv)
+    train_data = read_features('/opt/ml/input/data/train', columns=feature_cols + ['pm25'])
+    X = train_data[feature_cols].astype('float32')
+    y = train_data['pm25'].astype('float32')
     
     # Train XGBoost model
     model = xgb.XGBRegressor(
@@ -32,7 +39,9 @@ def main():
         min_child_weight=args.min_child_weight,
         subsample=args.subsample,
         objective=args.objective,
-        n_estimators=args.num_round
+        n_estimators=args.num_round,
+        tree_method='hist',
+        n_jobs=args.nthread
     )
     
     model.fit(X, y)
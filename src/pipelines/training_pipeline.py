@@ -1,74 +1,217 @@
 # src/pipelines/training_pipeline.py
+import io
+import os
+import time
 import boto3
 import pandas as pd
 import numpy as np
 import logging
+from typing import Dict, Optional
+
+from .athena_queries import AthenaQueryRunner, QueryFailed, iter_result_frames
+from .feature_storage import (
+    INCREMENTS_DIR, INTEGER_COLUMNS, PARQUET_DATASET_DIR, export_csv, iter_dataset_parts
+)
+from .query_cache import QueryResultCache, build_query_cache_from_env
+from .state_store import load_json_state, save_json_state
 
 logger = logging.getLogger(__name__)
 
+# Model inputs and the target, as selected from the offline store
+TRAINING_COLUMNS = ['temp', 'humidity', 'precip', 'windspeed', 'conditions',
+                    'cloudcover', 'visibility', 'solarradiation', 'pm25']
+
+# Parse types for the (all quoted) Athena CSV columns
+TRAINING_DTYPES = {column: INTEGER_COLUMNS.get(column, 'float32') for column in TRAINING_COLUMNS}
+
+# Incremental extracts also keep the record identity and event time (float64: epoch seconds)
+INCREMENT_COLUMNS = ['record_id', 'date', 'timestamp'] + TRAINING_COLUMNS
+INCREMENT_DTYPES = {**TRAINING_DTYPES, 'record_id': 'string', 'date': 'string', 'timestamp': 'float64'}
+
+# Watermark document for incremental extraction; override the location with TRAINING_WATERMARK
+WATERMARK_KEY = 'training-data/watermark.json'
+
+# Objects per delete_objects call (the API maximum)
+DELETE_BATCH_SIZE = 1000
+
+
+def clean_training_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop incomplete rows and invalid (non-positive) PM2.5 values."""
+    df = df.dropna(subset=[column for column in TRAINING_COLUMNS if column in df.columns])
+    return df[df['pm25'] > 0]
+
+
 class TrainingPipeline:
-    def __init__(self, feature_group_table_name: str, bucket_name: str):
+    def __init__(self, feature_group_table_name: str, bucket_name: str,
+                 athena_client=None, s3_client=None,
+                 result_cache: Optional[QueryResultCache] = None):
+        """``athena_client`` / ``s3_client`` replace the boto3 clients (e.g. local stand-ins).
+
+        ``result_cache`` defaults to the cache configured by ATHENA_CACHE_DIR, if any.
+        """
         self.feature_group_table_name = feature_group_table_name
         self.bucket_name = bucket_name
-        self.athena = boto3.client('athena')
-        self.s3 = boto3.client('s3')
+        self.athena = athena_client or boto3.client('athena')
+        self.s3 = s3_client or boto3.client('s3')
+        self.result_cache = result_cache or build_query_cache_from_env(s3_client=self.s3)
         
     def prepare_training_data(self):
         """Query Feature Store and prepare training data"""
         query = f"""
         SELECT 
-            temp, humidity, precip, windspeed, conditions,
-            cloudcover, visibility, solarradiation, pm25
+            {', '.join(TRAINING_COLUMNS)}
         FROM "{self.feature_group_table_name}"
         WHERE pm25 IS NOT NULL 
         AND temp IS NOT NULL 
         AND humidity IS NOT NULL
         """
         
+        cache_key = None
+        if self.result_cache is not None:
+            # The same query against unchanged data was already run and uploaded
+            cache_key = self.result_cache.key(query, self.bucket_name)
+            df = self.result_cache.load(cache_key)
+            if df is not None:
+                logger.info(f"Training data served from the query cache: {len(df)} records")
+                return df
+
         logger.info("Executing Athena query to get training data")
-        
-        # Execute query
-        response = self.athena.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': 'sagemaker_featurestore'},
-            ResultConfiguration={
-                'OutputLocation': f's3://{self.bucket_name}/athena-results/'
-            }
-        )
-        
-        query_execution_id = response['QueryExecutionId']
-        
-        # Wait for completion
-        while True:
-            result = self.athena.get_query_execution(QueryExecutionId=query_execution_id)
-            status = result['QueryExecution']['Status']['State']
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-        
-        if status == 'SUCCEEDED':
-            # Get results location
-            results_location = result['QueryExecution']['ResultConfiguration']['OutputLocation']
-            bucket = results_location.split('/')[2]
-            key = '/'.join(results_location.split('/')[3:])
-            
-            # Download and process data
-            self.s3.download_file(bucket, key, 'query_results.csv')
-            df = pd.read_csv('query_results.csv')
-            
-            # Clean data
-            df = df.dropna()
-            df = df[df['pm25'] > 0]  # Remove invalid PM2.5 values
+        results_location = self.run_query(query)
+
+        if results_location is not None:
+            # Stream the results in chunks, cleaning each before the next is read
+            chunks = [clean_training_chunk(chunk) for chunk in
+                      iter_result_frames(self.s3, results_location, dtypes=TRAINING_DTYPES)]
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=TRAINING_COLUMNS)
             
-            # Upload to S3 for training
-            df.to_csv('train.csv', index=False)
-            self.s3.upload_file('train.csv', self.bucket_name, 'training-data/train.csv')
+            # Upload to S3 for training: Parquet for the training scripts, CSV for compatibility
+            self.upload_csv(df, 'training-data/train.csv')
+            self.upload_dataset(df, f'training-data/{PARQUET_DATASET_DIR}')
+            if cache_key is not None:
+                self.result_cache.store(cache_key, df)
             
             logger.info(f"Training data prepared: {len(df)} records")
             return df
         else:
-            logger.error(f"Query failed: {status}")
             return None
-    
+
+    def prepare_incremental_training_data(self, full_refresh: bool = False,
+                                          full_refresh_days: Optional[float] = None
+                                          ) -> Optional[pd.DataFrame]:
+        """Extract only rows at or after the stored watermark into ``training-data/increments/``.
+
+        New rows are appended as ``date=YYYY-MM-DD/part-<run>-0.parquet``
+        files and the watermark (the largest ``timestamp`` seen) is advanced
+        once they are uploaded; rows at the watermark itself are extracted
+        again and collapse by ``record_id`` when read. A full refresh clears
+        the increments and extracts everything: on request, on the first run,
+        or when the last one is older than ``full_refresh_days``
+        (TRAINING_FULL_REFRESH_DAYS). Rows backfilled with older event times
+        are only picked up by a full refresh. Returns the new rows, or None
+        if the query failed.
+        """
+        location = os.getenv('TRAINING_WATERMARK') or f's3://{self.bucket_name}/{WATERMARK_KEY}'
+        state = load_json_state(location, s3_client=self.s3) or {}
+        if full_refresh_days is None and os.getenv('TRAINING_FULL_REFRESH_DAYS'):
+            full_refresh_days = float(os.getenv('TRAINING_FULL_REFRESH_DAYS'))
+        last_full_refresh = state.get('last_full_refresh')
+        if last_full_refresh is None or (
+                full_refresh_days is not None
+                and time.time() - last_full_refresh > full_refresh_days * 86400):
+            full_refresh = True
+        watermark = None if full_refresh else state.get('watermark')
+
+        query = f"""
+        SELECT {', '.join(f'"{column}"' for column in INCREMENT_COLUMNS)}
+        FROM "{self.feature_group_table_name}"
+        WHERE pm25 IS NOT NULL
+        AND temp IS NOT NULL
+        AND humidity IS NOT NULL
+        """
+        if watermark is not None:
+            query += f'AND "timestamp" >= {watermark!r}\n'
+        logger.info(f"Extracting training rows {'(full refresh)' if full_refresh else f'since {watermark}'}")
+        results_location = self.run_query(query)
+        if results_location is None:
+            return None
+
+        chunks = []
+        newest = watermark
+        for chunk in iter_result_frames(self.s3, results_location, dtypes=INCREMENT_DTYPES):
+            if chunk['timestamp'].notna().any():
+                latest = float(chunk['timestamp'].max())
+                newest = latest if newest is None else max(newest, latest)
+            chunks.append(clean_training_chunk(chunk))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=INCREMENT_COLUMNS)
+        df['date'] = pd.to_datetime(df['date'].astype('string').str[:10])
+
+        prefix = f'training-data/{INCREMENTS_DIR}'
+        if full_refresh:
+            self.delete_prefix(prefix)
+        run_id = f"{int(time.time() * 1000)}"
+        for path, data in iter_dataset_parts(df, basename=f'part-{run_id}', partition_cols=['date']):
+            self.s3.put_object(Bucket=self.bucket_name, Key=f'{prefix}/{path}', Body=data)
+
+        now = time.time()
+        save_json_state({
+            'watermark': newest,
+            'last_full_refresh': now if full_refresh else last_full_refresh,
+            'updated_at': now,
+            'rows': len(df)
+        }, location, s3_client=self.s3)
+        logger.info(f"Appended {len(df)} training rows; watermark now {newest}")
+        return df
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every object below ``prefix`` and return how many there were."""
+        keys = []
+        kwargs = {'Bucket': self.bucket_name, 'Prefix': f'{prefix}/'}
+        while True:
+            response = self.s3.list_objects_v2(**kwargs)
+            keys += [item['Key'] for item in response.get('Contents', [])]
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            self.s3.delete_objects(Bucket=self.bucket_name, Delete={
+                'Objects': [{'Key': key} for key in keys[start:start + DELETE_BATCH_SIZE]]
+            })
+        return len(keys)
+
+    def query_runner(self) -> AthenaQueryRunner:
+        return AthenaQueryRunner(self.athena, f's3://{self.bucket_name}/athena-results/')
+
+    def run_query(self, query: str) -> Optional[str]:
+        """Run an Athena query against the Feature Store database.
+
+        Returns the S3 location of the CSV results, or None if the query
+        failed or timed out (ATHENA_QUERY_TIMEOUT).
+        """
+        try:
+            return self.query_runner().run(query)
+        except QueryFailed as e:
+            logger.error(f"Query failed: {str(e)}")
+            return None
+
+    def run_queries(self, queries: Dict[str, str]) -> Dict[str, str]:
+        """Run named queries concurrently and return their result locations.
+
+        Raises QueryFailed (after cancelling the others) if any query fails.
+        """
+        return self.query_runner().run_many(queries)
+
+    def upload_csv(self, df: pd.DataFrame, key: str):
+        """Upload ``df`` as CSV straight from memory."""
+        buffer = io.BytesIO()
+        export_csv(df, buffer)
+        buffer.seek(0)
+        self.s3.put_object(Bucket=self.bucket_name, Key=key, Body=buffer)
+
+    def upload_dataset(self, df: pd.DataFrame, prefix: str):
+        """Upload ``df`` below ``prefix`` as a partitioned Parquet dataset, one partition at a time."""
+        for path, data in iter_dataset_parts(df):
+            self.s3.put_object(Bucket=self.bucket_name, Key=f'{prefix}/{path}', Body=data)
+
     def start_training_job(self, job_name: str, role_arn: str):
         """Start SageMaker training job"""
         sagemaker = boto3.client('sagemaker')
@@ -0,0 +1,130 @@
+# tests/test_lambda/test_feature_pipeline_handler.py
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from pipelines.aws_clients import reset_clients
+from pipelines.feature_schema import clear_schema_cache
+
+HANDLER_PATH = Path(__file__).resolve().parents[2] / 'src' / 'lambda' / 'feature_pipeline_handler.py'
+
+FEATURE_DEFINITIONS = [
+    {'FeatureName': 'record_id', 'FeatureType': 'String'},
+    {'FeatureName': 'timestamp', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'date', 'FeatureType': 'String'},
+    {'FeatureName': 'temp', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'conditions', 'FeatureType': 'Integral'},
+    {'FeatureName': 'cloudcover', 'FeatureType': 'Integral'},
+    {'FeatureName': 'precip', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'pm25', 'FeatureType': 'Integral'}
+]
+
+
+@pytest.fixture
+def handler():
+    # 'lambda' is a keyword, so the handler module is loaded from its path
+    spec = importlib.util.spec_from_file_location('feature_pipeline_handler', HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    reset_clients()
+    clear_schema_cache()
+    yield module
+    reset_clients()
+    clear_schema_cache()
+
+
+def fake_session(sample_weather_data, sample_air_quality_data):
+    def get(url, params=None, timeout=None):
+        response = Mock()
+        response.json.return_value = (sample_weather_data if 'visualcrossing' in url
+                                      else sample_air_quality_data)
+        return response
+
+    session = Mock()
+    session.get.side_effect = get
+    return session
+
+
+def test_handler_writes_one_typed_record(handler, sample_weather_data, sample_air_quality_data):
+    sample_weather_data['days'][0].update({'temp': 72.345, 'cloudcover': 8.9, 'precip': None})
+    session = fake_session(sample_weather_data, sample_air_quality_data)
+
+    with patch.object(handler, 'get_session', return_value=session), \
+         patch('boto3.client') as mock_client:
+        mock_client.return_value.describe_feature_group.return_value = {
+            'FeatureDefinitions': FEATURE_DEFINITIONS
+        }
+        response = handler.lambda_handler({}, None)
+
+    assert response['statusCode'] == 200, json.loads(response['body'])
+    record = {f['FeatureName']: f['ValueAsString']
+              for f in mock_client.return_value.put_record.call_args.kwargs['Record']}
+    assert record['date'] == '2024-01-20'
+    assert record['temp'] == '72.34'
+    assert record['conditions'] == '1'
+    assert record['cloudcover'] == '8'
+    assert record['precip'] == '0.0'
+    assert record['pm25'] == '35'
+    assert record['record_id'] == 'los-angeles:2024-01-20'
+
+
+def test_records_take_the_weather_day_when_the_station_lags(handler, sample_weather_data,
+                                                            sample_air_quality_data):
+    sample_air_quality_data['data']['time'] = {'s': '2024-01-19 23:00:00'}
+    session = fake_session(sample_weather_data, sample_air_quality_data)
+
+    with patch.object(handler, 'get_session', return_value=session), \
+         patch('boto3.client') as mock_client:
+        mock_client.return_value.describe_feature_group.return_value = {
+            'FeatureDefinitions': FEATURE_DEFINITIONS
+        }
+        handler.lambda_handler({}, None)
+
+    record = {f['FeatureName']: f['ValueAsString']
+              for f in mock_client.return_value.put_record.call_args.kwargs['Record']}
+    assert record['date'] == '2024-01-20'
+    assert record['record_id'] == 'los-angeles:2024-01-20'
+
+
+def test_missing_pm25_is_left_out_rather_than_zero(handler, sample_weather_data,
+                                                   sample_air_quality_data):
+    del sample_air_quality_data['data']['iaqi']['pm25']
+    sample_weather_data['days'][0]['precip'] = None
+    session = fake_session(sample_weather_data, sample_air_quality_data)
+
+    with patch.object(handler, 'get_session', return_value=session), \
+         patch('boto3.client') as mock_client:
+        mock_client.return_value.describe_feature_group.return_value = {
+            'FeatureDefinitions': FEATURE_DEFINITIONS
+        }
+        handler.lambda_handler({}, None)
+
+    record = {f['FeatureName']: f['ValueAsString']
+              for f in mock_client.return_value.put_record.call_args.kwargs['Record']}
+    assert 'pm25' not in record
+    # Weather gaps are still filled with the type's default
+    assert record['precip'] == '0.0'
+
+
+def test_warm_invocations_reuse_clients_and_schema(handler, sample_weather_data,
+                                                   sample_air_quality_data):
+    session = fake_session(sample_weather_data, sample_air_quality_data)
+
+    with patch.object(handler, 'get_session', return_value=session), \
+         patch('boto3.client') as mock_client:
+        mock_client.return_value.describe_feature_group.return_value = {
+            'FeatureDefinitions': FEATURE_DEFINITIONS
+        }
+        handler.lambda_handler({}, None)
+        handler.lambda_handler({}, None)
+
+    assert mock_client.call_count == 2  # sagemaker + featurestore-runtime, once each
+    assert mock_client.return_value.describe_feature_group.call_count == 1
+    assert mock_client.return_value.put_record.call_count == 2
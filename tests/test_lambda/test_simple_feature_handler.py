@@ -0,0 +1,132 @@
+# tests/test_lambda/test_simple_feature_handler.py
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from pipelines.aws_clients import reset_clients
+from pipelines.drift import SketchSet, load_drift_window, save_sketches
+from pipelines.feature_schema import clear_schema_cache
+from pipelines.freshness import INITIAL_VERSION, read_freshness_version
+
+HANDLER_PATH = Path(__file__).resolve().parents[2] / 'src' / 'lambda' / 'simple_feature_handler.py'
+
+FEATURE_DEFINITIONS = [
+    {'FeatureName': 'record_id', 'FeatureType': 'String'},
+    {'FeatureName': 'event_time', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'date', 'FeatureType': 'String'},
+    {'FeatureName': 'temp', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'humidity', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'pm25', 'FeatureType': 'Integral'},
+    {'FeatureName': 'pm25_lag1', 'FeatureType': 'Fractional'}
+]
+
+
+@pytest.fixture
+def handler():
+    # 'lambda' is a keyword, so the handler module is loaded from its path
+    spec = importlib.util.spec_from_file_location('simple_feature_handler', HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    reset_clients()
+    clear_schema_cache()
+    yield module
+    reset_clients()
+    clear_schema_cache()
+
+
+def invoke(handler, weather_payload, air_quality_payload):
+    """Run the handler once against stubbed APIs; returns the response and the boto3 mock."""
+    def get(url, params=None, timeout=None):
+        response = Mock()
+        response.json.return_value = weather_payload if 'visualcrossing' in url else air_quality_payload
+        return response
+
+    with patch('boto3.client') as mock_client:
+        mock_client.return_value.describe_feature_group.return_value = {
+            'FeatureDefinitions': FEATURE_DEFINITIONS
+        }
+        pipeline = handler.get_pipeline('air-quality-features-08-14-56-40')
+        with patch.object(pipeline.session, 'get', side_effect=get):
+            response = handler.lambda_handler({}, None)
+    assert response['statusCode'] == 200, json.loads(response['body'])
+    return json.loads(response['body']), pipeline
+
+
+def test_reruns_use_stable_ids_and_the_dedup_index(handler, tmp_path, monkeypatch,
+                                                   sample_weather_data, sample_air_quality_data):
+    monkeypatch.setenv('DEDUP_INDEX', str(tmp_path / 'dedup.sqlite'))
+
+    body, pipeline = invoke(handler, sample_weather_data, sample_air_quality_data)
+    assert body['results'] == {'los angeles': 'success'}
+    put_record = pipeline.featurestore_runtime.put_record
+    record = {f['FeatureName']: f['ValueAsString'] for f in put_record.call_args.kwargs['Record']}
+    assert record['record_id'] == 'los-angeles:2024-01-20'
+    assert record['pm25'] == '35' and 'event_time' in record
+    # Only the feature group's features are sent
+    assert set(record) <= {d['FeatureName'] for d in FEATURE_DEFINITIONS}
+
+    invoke(handler, sample_weather_data, sample_air_quality_data)
+    assert put_record.call_count == 1
+
+
+def test_city_names_are_stripped_and_blanks_skipped(handler, monkeypatch,
+                                                   sample_weather_data, sample_air_quality_data):
+    monkeypatch.setenv('CITIES', ' los angeles ,')
+
+    body, pipeline = invoke(handler, sample_weather_data, sample_air_quality_data)
+
+    assert body['results'] == {'los angeles': 'success'}
+    assert pipeline.featurestore_runtime.put_record.call_count == 1
+
+
+def test_runs_are_folded_into_the_drift_state(handler, tmp_path, monkeypatch,
+                                              sample_weather_data, sample_air_quality_data):
+    baseline = SketchSet.from_frame(pd.DataFrame({'temp': [50.0, 60.0, 70.0], 'pm25': [20, 30, 40]}))
+    save_sketches(baseline, str(tmp_path / 'drift_baseline.json'))
+    monkeypatch.setenv('DRIFT_BASELINE', str(tmp_path / 'drift_baseline.json'))
+    monkeypatch.setenv('DRIFT_STATE', str(tmp_path / 'drift_state.json'))
+
+    invoke(handler, sample_weather_data, sample_air_quality_data)
+
+    state = load_drift_window(str(tmp_path / 'drift_state.json'), baseline)
+    assert state.sketches['pm25'].count == 1 and state.sketches['temp'].mean == 72
+
+
+def test_rolling_buffers_carry_over_between_invocations(handler, tmp_path, monkeypatch,
+                                                        sample_weather_data, sample_air_quality_data):
+    monkeypatch.setenv('ROLLING_STATE', str(tmp_path / 'rolling_state.json'))
+    invoke(handler, sample_weather_data, sample_air_quality_data)
+    assert (tmp_path / 'rolling_state.json').exists()
+
+    # Next day, in a fresh container that has to load the saved buffers
+    handler._pipeline = None
+    weather = {'days': [{**sample_weather_data['days'][0], 'datetime': '2024-01-21'}]}
+    air_quality = {'data': {**sample_air_quality_data['data'], 'time': {'s': '2024-01-21 00:00:00'}}}
+    _, pipeline = invoke(handler, weather, air_quality)
+
+    record = {f['FeatureName']: f['ValueAsString']
+              for f in pipeline.featurestore_runtime.put_record.call_args.kwargs['Record']}
+    assert record['pm25_lag1'] == '35.0'
+
+
+def test_successful_writes_bump_the_freshness_marker(handler, tmp_path, monkeypatch,
+                                                     sample_weather_data, sample_air_quality_data):
+    marker = str(tmp_path / 'freshness.json')
+    monkeypatch.setenv('FRESHNESS_MARKER', marker)
+    monkeypatch.setenv('DEDUP_INDEX', str(tmp_path / 'dedup.sqlite'))
+
+    invoke(handler, sample_weather_data, sample_air_quality_data)
+    version = read_freshness_version(marker)
+    assert version != INITIAL_VERSION
+
+    # A re-run that writes nothing new leaves cached training data valid
+    invoke(handler, sample_weather_data, sample_air_quality_data)
+    assert read_freshness_version(marker) == version
@@ -0,0 +1,91 @@
+# tests/test_pipelines/test_athena_queries.py
+import pytest
+from unittest.mock import Mock, patch
+
+from src.pipelines.athena_queries import AthenaQueryRunner, QueryFailed, QueryTimeout, iter_result_frames
+from src.pipelines.local_feature_store import LocalAthena, LocalFeatureStore, LocalS3
+
+
+def execution(query_id, state, reason=None):
+    status = {'State': state}
+    if reason:
+        status['StateChangeReason'] = reason
+    return {'QueryExecutionId': query_id, 'Status': status,
+            'ResultConfiguration': {'OutputLocation': f's3://bucket/{query_id}.csv'}}
+
+
+def fake_athena(states):
+    """Athena mock whose queries move through ``states[query_id]`` one poll at a time."""
+    athena = Mock()
+    athena.start_query_execution.side_effect = [{'QueryExecutionId': q} for q in states]
+    polls = {q: iter(s) for q, s in states.items()}
+    last = {}
+
+    def batch_get_query_execution(QueryExecutionIds):
+        for q in QueryExecutionIds:
+            last[q] = next(polls[q], last.get(q))
+        return {'QueryExecutions': [execution(q, last[q]) for q in QueryExecutionIds]}
+
+    athena.batch_get_query_execution.side_effect = batch_get_query_execution
+    return athena
+
+
+def test_polls_back_off_instead_of_spinning():
+    athena = fake_athena({'q1': ['QUEUED', 'RUNNING', 'RUNNING', 'RUNNING', 'SUCCEEDED']})
+    runner = AthenaQueryRunner(athena, 's3://bucket/results/', poll_initial=1, poll_max=3)
+
+    with patch('src.pipelines.athena_queries.time.sleep') as sleep, \
+            patch('src.pipelines.athena_queries.random.uniform', return_value=1.0):
+        assert runner.run('SELECT 1') == 's3://bucket/q1.csv'
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 3, 3]
+    assert athena.batch_get_query_execution.call_count == 5
+
+
+def test_failure_cancels_the_other_queries():
+    athena = fake_athena({'a': ['RUNNING', 'FAILED'], 'b': ['RUNNING']})
+    runner = AthenaQueryRunner(athena, 's3://bucket/results/', poll_initial=0)
+
+    with pytest.raises(QueryFailed):
+        runner.run_many({'boston': 'SELECT 1', 'paris': 'SELECT 2'})
+    athena.stop_query_execution.assert_called_once_with(QueryExecutionId='b')
+
+
+def test_timeout_cancels_running_queries():
+    athena = fake_athena({'q1': ['RUNNING']})
+    runner = AthenaQueryRunner(athena, 's3://bucket/results/', timeout=0.05,
+                               poll_initial=0.01, poll_max=0.01)
+
+    with pytest.raises(QueryTimeout):
+        runner.run('SELECT 1')
+    athena.stop_query_execution.assert_called_once_with(QueryExecutionId='q1')
+
+
+def test_run_many_collects_concurrent_queries_against_local_athena():
+    store, s3 = LocalFeatureStore(), LocalS3()
+    for i, city in enumerate(['boston', 'paris']):
+        store.put_record(FeatureGroupName='fg', Record=[
+            {'FeatureName': 'record_id', 'ValueAsString': f'{city}:2024-01-20'},
+            {'FeatureName': 'city', 'ValueAsString': city},
+            {'FeatureName': 'pm25', 'ValueAsString': str(10 + i)}])
+    athena = LocalAthena(store, s3, query_latency=0.05)
+    runner = AthenaQueryRunner(athena, 's3://bucket/results/', poll_initial=0.01)
+
+    locations = runner.run_many({city: f"SELECT pm25 FROM \"fg\" WHERE city = '{city}'"
+                                 for city in ['boston', 'paris']})
+
+    body = s3.get_object(Bucket='bucket', Key=locations['paris'][len('s3://bucket/'):])['Body']
+    assert body.read().decode() == '"pm25"\n"11"\n'
+
+
+def test_results_are_streamed_in_typed_chunks():
+    s3 = LocalS3()
+    s3.put_object(Bucket='bucket', Key='results/q.csv',
+                  Body='"temp","pm25"\n"70.5","12"\n"61.0",""\n"58.5","30"\n')
+
+    chunks = list(iter_result_frames(s3, 's3://bucket/results/q.csv',
+                                     dtypes={'temp': 'float32', 'pm25': 'Int16'}, chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0]['pm25'].dtype == 'Int16' and chunks[0]['pm25'].isna().sum() == 1
+    assert chunks[1]['temp'].dtype == 'float32'
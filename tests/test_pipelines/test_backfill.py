@@ -0,0 +1,106 @@
+# tests/test_pipelines/test_backfill.py
+import json
+import pandas as pd
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+
+from src.pipelines.backfill import run_backfill
+
+
+def write_input(tmp_path, rows=10):
+    path = tmp_path / 'merged.csv'
+    pd.DataFrame({
+        'date': [f'2024-01-{i + 1:02d}' for i in range(rows)],
+        'temp': [60.0 + i for i in range(rows)],
+        'pm25': [30 + i for i in range(rows)]
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_backfill_checkpoints_every_chunk(tmp_path):
+    input_path = write_input(tmp_path)
+    checkpoint = tmp_path / 'checkpoint.json'
+
+    with patch('boto3.client') as mock_client:
+        stats = run_backfill([input_path], 'test-feature-group', chunk_size=4,
+                             processes=1, checkpoint_path=str(checkpoint))
+
+    assert stats['records'] == 10
+    assert stats['chunks'] == 3
+    assert mock_client.return_value.put_record.call_count == 10
+    saved = json.loads(checkpoint.read_text())
+    assert sorted(saved['completed']) == [f'{input_path}:0', f'{input_path}:1', f'{input_path}:2']
+    record_ids = {call.kwargs['Record'][-1]['ValueAsString']
+                  for call in mock_client.return_value.put_record.call_args_list}
+    assert record_ids == {str(i) for i in range(10)}
+
+
+def test_backfill_resumes_after_interruption(tmp_path):
+    input_path = write_input(tmp_path)
+    checkpoint = tmp_path / 'checkpoint.json'
+    checkpoint.write_text(json.dumps({
+        'inputs': [input_path],
+        'chunk_size': 4,
+        'completed': {f'{input_path}:0': {'records': 4}, f'{input_path}:1': {'records': 4}}
+    }))
+
+    with patch('boto3.client') as mock_client:
+        stats = run_backfill([input_path], 'test-feature-group', chunk_size=4,
+                             processes=1, checkpoint_path=str(checkpoint))
+
+    assert stats['skipped_chunks'] == 2
+    assert stats['records'] == 2
+    assert mock_client.return_value.put_record.call_count == 2
+
+
+def test_backfill_quarantines_rows_failing_quality_checks(tmp_path):
+    input_path = tmp_path / 'merged.csv'
+    pd.DataFrame({
+        'date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'],
+        'humidity': [50.0, 140.0, 60.0, 70.0, 80.0],
+        'pm25': [30, 31, None, 33, 34]
+    }).to_csv(input_path, index=False)
+    quarantine = tmp_path / 'quarantine.csv'
+
+    with patch('boto3.client') as mock_client:
+        stats = run_backfill([str(input_path)], 'test-feature-group', chunk_size=2, processes=1,
+                             checkpoint_path=str(tmp_path / 'checkpoint.json'),
+                             quarantine_path=str(quarantine))
+
+    assert stats['records'] == 3
+    assert stats['quarantined_records'] == 2
+    assert mock_client.return_value.put_record.call_count == 3
+    assert stats['quality']['columns']['humidity']['bad_rows'] == [1]
+    assert stats['quality']['columns']['pm25']['nulls'] == 1
+    assert list(pd.read_csv(quarantine)['date']) == ['2024-01-02', '2024-01-03']
+
+
+def test_retried_chunks_quarantine_their_rows_once(tmp_path):
+    input_path = tmp_path / 'merged.csv'
+    pd.DataFrame({
+        'date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04'],
+        'humidity': [50.0, 140.0, 60.0, 70.0],
+        'pm25': [30, 31, 32, 33]
+    }).to_csv(input_path, index=False)
+    quarantine = tmp_path / 'quarantine.csv'
+
+    def run(fail_date=None):
+        def put_record(FeatureGroupName, Record):
+            if any(f['ValueAsString'] == fail_date for f in Record):
+                raise ClientError({'Error': {'Code': 'ValidationError', 'Message': ''}}, 'PutRecord')
+
+        with patch('boto3.client') as mock_client:
+            mock_client.return_value.put_record.side_effect = put_record
+            return run_backfill([str(input_path)], 'test-feature-group', chunk_size=2, processes=1,
+                                checkpoint_path=str(tmp_path / 'checkpoint.json'),
+                                quarantine_path=str(quarantine))
+
+    # The first chunk's good row fails, so the chunk is left for the next run
+    assert run(fail_date='2024-01-01')['failed_chunks'] == [f'{input_path}:0']
+    assert not quarantine.exists()
+
+    run()
+    quarantined = pd.read_csv(quarantine)
+    assert list(quarantined['date']) == ['2024-01-02']
+    assert list(quarantined['chunk_id']) == [f'{input_path}:0']
+
@@ -0,0 +1,72 @@
+# tests/test_pipelines/test_cross_validation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipelines.cross_validation import (
+    cross_validate, early_stopping_split, load_ordered_matrix, rolling_origin_folds
+)
+from src.pipelines.model_training import FEATURE_COLUMNS
+
+
+def dated_frame(days=60, cities=('delhi', 'mumbai'), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', periods=days).repeat(len(cities))
+    df = pd.DataFrame(rng.uniform(0, 100, (len(dates), len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df.insert(0, 'date', dates.strftime('%Y-%m-%d'))
+    df.insert(0, 'city', list(cities) * days)
+    df['pm25'] = 0.5 * df['humidity'] - 0.3 * df['windspeed'] + rng.normal(0, 5, len(df)) + 40
+    # Shuffled on disk, as the extracts are
+    return df.sample(frac=1, random_state=seed)
+
+
+def test_ordered_matrix_is_sorted_by_date(tmp_path):
+    df = dated_frame(days=10)
+    df.to_csv(tmp_path / 'train.csv', index=False)
+
+    X, y, days = load_ordered_matrix(str(tmp_path / 'train.csv'))
+
+    assert X.dtype == np.float32 and X.shape == (20, len(FEATURE_COLUMNS))
+    assert (np.diff(days) >= 0).all() and days[0] == np.datetime64('2023-01-01', 'D').astype('int64')
+    first = df[df['date'] == '2023-01-01']['pm25'].astype('float32')
+    assert sorted(y[:2]) == sorted(first)
+
+    df.drop(columns='date').to_csv(tmp_path / 'undated.csv', index=False)
+    with pytest.raises(ValueError):
+        load_ordered_matrix(str(tmp_path / 'undated.csv'))
+
+
+def test_folds_only_train_on_the_past():
+    days = np.repeat(np.arange(12), 3)
+
+    folds = rolling_origin_folds(days, n_splits=3, gap_days=1)
+
+    assert [(test_start, test_end) for _, test_start, test_end in folds] == [(9, 18), (18, 27), (27, 36)]
+    for train_end, test_start, _ in folds:
+        assert days[train_end - 1] < days[test_start] - 1
+    with pytest.raises(ValueError):
+        rolling_origin_folds(np.arange(3), n_splits=3)
+
+
+def test_early_stopping_uses_the_newest_training_rows_only():
+    train_end, test_start, _ = rolling_origin_folds(np.repeat(np.arange(20), 2), n_splits=4)[-1]
+    fit_end = early_stopping_split(train_end)
+    assert 0 < fit_end < train_end <= test_start
+    assert early_stopping_split(100) == 90 and early_stopping_split(5) == 4
+
+
+def test_cross_validate_reports_each_fold_and_pooled_metrics(tmp_path):
+    dated_frame().to_csv(tmp_path / 'train.csv', index=False)
+    X, y, days = load_ordered_matrix(str(tmp_path / 'train.csv'))
+
+    cv = cross_validate(X, y, days, params={'max_depth': 3, 'learning_rate': 0.3},
+                        n_splits=3, n_estimators=30, workers=2)
+
+    assert [fold['fold'] for fold in cv['folds']] == [0, 1, 2]
+    assert [fold['test_rows'] for fold in cv['folds']] == [30, 30, 30]
+    assert [fold['train_rows'] for fold in cv['folds']] == [30, 60, 90]
+    for fold in cv['folds']:
+        assert fold['rmse'] > 0 and fold['mae'] > 0 and 'predictions' not in fold
+    overall = cv['overall']
+    assert set(overall) == {'rmse', 'mae', 'r2', 'rmse_mean', 'rmse_std'}
+    assert min(fold['rmse'] for fold in cv['folds']) <= overall['rmse'] <= max(fold['rmse'] for fold in cv['folds'])
@@ -0,0 +1,59 @@
+# tests/test_pipelines/test_data_quality.py
+import pandas as pd
+import pytest
+
+from src.pipelines.data_quality import DataQualityProfiler, profile_chunks
+from src.pipelines.feature_pipeline import DataQualityValidator
+
+
+@pytest.fixture
+def features():
+    return pd.DataFrame({
+        'temp': [60.0, 61.0, 200.0, None],
+        'humidity': [50.0, -1.0, 55.0, 56.0],
+        'pm25': pd.array([30, 40, None, 600], dtype='Int64'),
+        'city': ['boston'] * 4
+    }, index=[10, 11, 12, 13])
+
+
+def test_profile_reports_nulls_ranges_and_bad_rows(features):
+    profiler = DataQualityProfiler()
+    clean, quarantined = profiler.split(features)
+    report = profiler.report()
+
+    assert list(clean.index) == [10]
+    assert list(quarantined.index) == [11, 12, 13]
+    assert report['rows'] == 4 and report['quarantined_rows'] == 3 and not report['passed']
+    assert report['columns']['temp'] == {
+        'nulls': 1, 'out_of_range': 1, 'min': 60.0, 'max': 200.0, 'mean': 107.0, 'bad_rows': [12]
+    }
+    # A null pm25 is required, so it is a bad row without being out of range
+    assert report['columns']['pm25']['nulls'] == 1
+    assert report['columns']['pm25']['out_of_range'] == 1
+    assert report['columns']['pm25']['bad_rows'] == [12, 13]
+    assert 'city' not in report['columns']
+
+
+def test_chunked_profile_matches_single_pass(features, tmp_path):
+    whole = DataQualityProfiler()
+    whole.profile(features)
+
+    quarantine = tmp_path / 'quarantine.csv'
+    chunked = profile_chunks([features.iloc[:1], features.iloc[1:3], features.iloc[3:]],
+                             quarantine_path=str(quarantine))
+    assert chunked == whole.report()
+    assert list(pd.read_csv(quarantine)['row']) == [11, 12, 13]
+
+    merged = DataQualityProfiler()
+    for part in (features.iloc[:2], features.iloc[2:]):
+        worker = DataQualityProfiler()
+        worker.profile(part)
+        merged.merge(worker)
+    assert merged.report() == whole.report()
+
+
+def test_validator_checks_keep_their_meaning(features):
+    results = DataQualityValidator.validate_features(features)
+    assert results == {'has_data': True, 'no_missing_pm25': False,
+                       'valid_humidity': False, 'valid_pm25': False}
+    assert all(DataQualityValidator.validate_features(features.iloc[:1]).values())
@@ -0,0 +1,91 @@
+# tests/test_pipelines/test_dedup_index.py
+import pandas as pd
+from unittest.mock import Mock, patch
+
+from src.pipelines.backfill import run_backfill
+from src.pipelines.dedup_index import (
+    DedupIndex,
+    frame_record_ids,
+    make_record_id,
+    rebuild_from_offline_store
+)
+from src.pipelines.feature_store_writer import FeatureStoreWriter
+
+
+def features(pm25):
+    return pd.DataFrame({
+        'record_id': frame_record_ids(pd.DataFrame({
+            'city': ['Los Angeles', 'boston'],
+            'date': pd.to_datetime(['2024-01-20', '2024-01-20'])
+        })),
+        'timestamp': [1700000000.0, 1700000000.0],
+        'pm25': pm25
+    })
+
+
+def test_record_ids_depend_only_on_city_and_day():
+    assert make_record_id('Los Angeles', '2024-01-20') == 'los-angeles:2024-01-20'
+    assert make_record_id('los angeles ', pd.Timestamp('2024-01-20')) == 'los-angeles:2024-01-20'
+    assert list(features([1, 2])['record_id']) == ['los-angeles:2024-01-20', 'boston:2024-01-20']
+
+
+def test_writer_skips_records_already_written(tmp_path):
+    index = DedupIndex(str(tmp_path / 'dedup.sqlite'))
+    runtime = Mock()
+    writer = FeatureStoreWriter(runtime, 'test-feature-group', dedup_index=index)
+
+    assert writer.write(features([35, 12]))['successful'] == 2
+    # Same content with a new timestamp is a duplicate; a changed value is rewritten
+    rerun = features([35, 14]).assign(timestamp=1800000000.0)
+    summary = writer.write(rerun)
+
+    assert summary['skipped'] == 1 and summary['successful'] == 1
+    assert runtime.put_record.call_count == 3
+    assert len(index) == 2
+
+
+def test_failed_records_are_not_indexed(tmp_path):
+    index = DedupIndex(str(tmp_path / 'dedup.sqlite'))
+    runtime = Mock()
+    runtime.put_record.side_effect = [None, ValueError('boom')]
+    writer = FeatureStoreWriter(runtime, 'test-feature-group', max_workers=1, max_attempts=1,
+                                dedup_index=index)
+    assert writer.write(features([35, 12]))['failed'] == 1
+    assert len(index) == 1
+
+
+def test_rebuild_from_offline_store(tmp_path):
+    pipeline = Mock(feature_group_table_name='offline_table')
+    pipeline.run_query.return_value = 's3://bucket/athena-results/q.csv'
+    body = Mock()
+    body.iter_lines.return_value = iter([b'"record_id"', b'"los-angeles:2024-01-20"',
+                                         b'"boston:2024-01-20"'])
+    pipeline.s3.get_object.return_value = {'Body': body}
+
+    index = DedupIndex(str(tmp_path / 'dedup.sqlite'))
+    index.mark_written({'stale:2020-01-01': 'abc'})
+    assert rebuild_from_offline_store(index, pipeline) == 2
+    assert 'offline_table' in pipeline.run_query.call_args.args[0]
+    # Rebuilt entries have no fingerprint, so any content counts as written
+    assert index.seen({'boston:2024-01-20': 'anything', 'stale:2020-01-01': 'abc'}) == {
+        'boston:2024-01-20'
+    }
+
+
+def test_backfill_rerun_writes_nothing_new(tmp_path):
+    input_path = tmp_path / 'merged.csv'
+    pd.DataFrame({'date': ['2024-01-01', '2024-01-02', '2024-01-03'],
+                  'pm25': [30, 31, 32]}).to_csv(input_path, index=False)
+    dedup_path = str(tmp_path / 'dedup.sqlite')
+
+    with patch('boto3.client') as mock_client:
+        for run in range(2):
+            stats = run_backfill([str(input_path)], 'test-feature-group', chunk_size=2,
+                                 processes=1, checkpoint_path=str(tmp_path / f'checkpoint{run}.json'),
+                                 city='los angeles', dedup_index_path=dedup_path)
+
+    assert mock_client.return_value.put_record.call_count == 3
+    assert stats['duplicate_records'] == 3
+    record_ids = {call.kwargs['Record'][-1]['ValueAsString']
+                  for call in mock_client.return_value.put_record.call_args_list}
+    assert record_ids == {'los-angeles:2024-01-01', 'los-angeles:2024-01-02', 'los-angeles:2024-01-03'}
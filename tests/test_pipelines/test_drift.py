@@ -0,0 +1,99 @@
+# tests/test_pipelines/test_drift.py
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import date, timedelta
+
+from src.pipelines.drift import DriftMonitor, FeatureSketch, SketchSet, load_drift_window
+
+
+@pytest.fixture
+def train():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'temp': rng.normal(60, 10, 5000), 'pm25': rng.integers(10, 120, 5000)})
+
+
+def test_sketch_merge_matches_single_pass(train):
+    edges = [40, 50, 60, 70, 80]
+    whole = FeatureSketch(edges)
+    whole.update(train['temp'])
+
+    merged = FeatureSketch(edges)
+    for part in np.array_split(train['temp'].to_numpy(), 7):
+        piece = FeatureSketch(edges)
+        piece.update(part)
+        merged.merge(piece)
+
+    assert merged.counts.tolist() == whole.counts.tolist()
+    assert merged.count == 5000
+    assert merged.mean == pytest.approx(train['temp'].mean())
+    assert merged.std == pytest.approx(train['temp'].std())
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+
+    with pytest.raises(ValueError):
+        merged.merge(FeatureSketch([0, 1]))
+
+
+def test_compare_flags_shifted_features_only(train):
+    baseline = SketchSet.from_frame(train)
+    current = baseline.empty_like()
+    current.update(train.assign(temp=train['temp'] + 15).sample(500, random_state=1))
+
+    report = current.compare(baseline)
+    assert report['temp']['drifted'] and report['temp']['psi'] > 0.2
+    assert report['temp']['ks'] > 0.3
+    assert report['temp']['mean_shift'] == pytest.approx(1.5, abs=0.2)
+    assert not report['pm25']['drifted'] and report['pm25']['psi'] < 0.1
+
+
+def test_monitor_accumulates_runs_of_a_day_in_state_file(tmp_path, train):
+    baseline = SketchSet.from_frame(train)
+    state_path = str(tmp_path / 'drift_state.json')
+
+    for run in range(3):
+        monitor = DriftMonitor(baseline, state_path)
+        monitor.update(train.iloc[run * 10:(run + 1) * 10])
+        scores = monitor.save(date(2024, 1, 20))
+
+    assert scores['temp']['count'] == 30
+    assert load_drift_window(state_path, baseline).sketches['pm25'].count == 30
+    # A run that processed nothing does not touch the state
+    assert DriftMonitor(baseline, state_path).save() == {}
+
+
+def test_window_forgets_old_days_so_a_drifted_day_still_shows(tmp_path, train):
+    baseline = SketchSet.from_frame(train)
+    state_path = str(tmp_path / 'drift_state.json')
+    start = date(2024, 1, 1)
+
+    for offset in range(30):
+        monitor = DriftMonitor(baseline, state_path, window_days=3)
+        monitor.update(train.sample(100, random_state=offset))
+        scores = monitor.save(start + timedelta(days=offset))
+    assert scores['temp']['count'] == 300 and not scores['temp']['drifted']
+
+    monitor = DriftMonitor(baseline, state_path, window_days=3)
+    monitor.update(train.assign(temp=train['temp'] + 15).sample(100, random_state=99))
+    scores = monitor.save(start + timedelta(days=30))
+
+    # A cumulative state would dilute this day among 3,000 normal rows
+    assert scores['temp']['count'] == 300
+    assert scores['temp']['drifted']
+
+
+def test_small_windows_from_the_baseline_are_not_flagged(tmp_path, train):
+    baseline = SketchSet.from_frame(train)
+    state_path = str(tmp_path / 'drift_state.json')
+
+    # One city, one row a day: a week of runs fills at most 7 of the 20 bins
+    for offset in range(7):
+        monitor = DriftMonitor(baseline, state_path)
+        monitor.update(train.sample(1, random_state=offset))
+        scores = monitor.save(date(2024, 1, 1) + timedelta(days=offset))
+
+    assert scores['temp']['count'] == 7
+    assert scores['temp']['insufficient_data'] and scores['temp']['psi'] is None
+    assert not any(score['drifted'] for score in scores.values())
+    # Explicitly lowering the minimum brings back the inflated score
+    assert load_drift_window(state_path, baseline).compare(baseline, min_samples=1)['temp']['drifted']
+
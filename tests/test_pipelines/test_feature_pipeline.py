@@ -3,6 +3,7 @@ import pytest
 import pandas as pd
 import numpy as np
 from unittest.mock import Mock, patch
+from src.pipelines.data_quality import DataQualityProfiler
 from src.pipelines.feature_pipeline import FeaturePipeline
 
 
@@ -13,7 +14,7 @@ def mock_feature_pipeline():
         return pipeline
 
 def test_fetch_weather_data(mock_feature_pipeline):
-    with patch('requests.get') as mock_get:
+    with patch.object(mock_feature_pipeline.session, 'get') as mock_get:
         # Mock successful API response
         mock_get.return_value.json.return_value = {
             'days': [{
@@ -31,7 +32,7 @@ def test_fetch_weather_data(mock_feature_pipeline):
         assert len(result) > 0
 
 def test_fetch_air_quality_data(mock_feature_pipeline):
-    with patch('requests.get') as mock_get:
+    with patch.object(mock_feature_pipeline.session, 'get') as mock_get:
         # Mock successful API response
         mock_get.return_value.json.return_value = {
             'data': {
@@ -93,3 +94,187 @@ def test_write_to_feature_store(mock_feature_pipeline):
     
     mock_feature_pipeline.write_to_feature_store(test_features)
     assert mock_feature_pipeline.featurestore_runtime.put_record.called
+
+def test_run_pipeline_for_cities_reports_per_city(mock_feature_pipeline):
+    def fake_run(city):
+        if city == 'paris':
+            raise ValueError('no data')
+        return pd.DataFrame({'city': [city]})
+
+    with patch.object(mock_feature_pipeline, '_run_pipeline', side_effect=fake_run) as mock_run:
+        results = mock_feature_pipeline.run_pipeline_for_cities(
+            ['los angeles', ' paris', 'boston'], max_workers=2
+        )
+
+    assert mock_run.call_count == 3
+    assert results == {
+        'los angeles': 'success',
+        'paris': 'failed: no data',
+        'boston': 'success'
+    }
+    assert set(mock_feature_pipeline.city_features) == {'los angeles', 'boston'}
+
+def test_fetchers_share_pooled_session_with_timeouts(mock_feature_pipeline, sample_weather_data):
+    from src.pipelines.http_session import get_session
+
+    assert mock_feature_pipeline.session is get_session()
+    with patch.object(mock_feature_pipeline.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = sample_weather_data
+        mock_feature_pipeline.fetch_weather_data()
+
+    connect_timeout, read_timeout = mock_get.call_args.kwargs['timeout']
+    assert connect_timeout > 0 and read_timeout > 0
+
+def test_monitoring_buffers_metrics_until_flush():
+    from src.pipelines.feature_pipeline import FeaturePipelineMonitoring
+
+    with patch('boto3.client'):
+        monitoring = FeaturePipelineMonitoring(mode='cloudwatch')
+    monitoring.log_metric('WeatherAPISuccess', 1, dimensions={'City': 'boston', 'Stage': 'fetch'})
+    monitoring.log_metric('ProcessedRecordCount', 1)
+    assert not monitoring.cloudwatch.put_metric_data.called
+
+    assert monitoring.flush() == 2
+    monitoring.cloudwatch.put_metric_data.assert_called_once()
+    metric_data = monitoring.cloudwatch.put_metric_data.call_args.kwargs['MetricData']
+    assert metric_data[0]['Dimensions'] == [{'Name': 'City', 'Value': 'boston'},
+                                            {'Name': 'Stage', 'Value': 'fetch'}]
+    assert monitoring.flush() == 0
+
+def test_monitoring_emf_mode_prints_log_lines(capsys):
+    import json
+    from src.pipelines.feature_pipeline import FeaturePipelineMonitoring
+
+    with patch('boto3.client'):
+        monitoring = FeaturePipelineMonitoring(mode='emf')
+    monitoring.log_metric('SuccessfulWrites', 3, dimensions={'Stage': 'write'})
+    monitoring.flush()
+
+    document = json.loads(capsys.readouterr().out.strip())
+    assert document['SuccessfulWrites'] == 3
+    assert document['Stage'] == 'write'
+    assert document['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Stage']]
+    assert not monitoring.cloudwatch.put_metric_data.called
+
+def test_run_pipeline_flushes_metrics_on_failure(mock_feature_pipeline):
+    with patch.object(mock_feature_pipeline, 'fetch_weather_data', side_effect=ValueError('down')), \
+         patch.object(mock_feature_pipeline.monitoring, 'flush') as mock_flush:
+        with pytest.raises(ValueError):
+            mock_feature_pipeline.run_pipeline('boston')
+    mock_flush.assert_called_once()
+
+def test_fetch_weather_range_uses_parallel_windows(mock_feature_pipeline):
+    def fake_get(url, params=None, timeout=None):
+        start, end = url.rstrip('/').split('/')[-2:]
+        days = pd.date_range(start, end, freq='D')
+        response = Mock()
+        response.json.return_value = {'days': [
+            {'datetime': day.strftime('%Y-%m-%d'), 'temp': '70.5', 'cloudcover': 10,
+             'conditions': 'Clear', 'stations': ['KCQT', 'KBUR']}
+            for day in days
+        ]}
+        return response
+
+    with patch.object(mock_feature_pipeline.session, 'get', side_effect=fake_get) as mock_get:
+        result = mock_feature_pipeline.fetch_weather_range('los angeles', '2024-01-01', '2024-12-31',
+                                                           window_days=100)
+
+    assert mock_get.call_count == 4
+    urls = sorted(call.args[0] for call in mock_get.call_args_list)
+    assert urls[0].endswith('/los angeles/2024-01-01/2024-04-09')
+    assert len(result) == 366
+    assert result['datetime'].is_monotonic_increasing
+    assert str(result['datetime'].dtype).startswith('datetime64')
+    assert result['temp'].dtype == 'float64'
+    assert result['stations'].iloc[0] == 'KCQT,KBUR'
+
+def test_process_features_batch_joins_on_city_and_date(mock_feature_pipeline):
+    weather_data = pd.DataFrame({
+        'city': ['paris', 'boston', 'boston', 'paris'],
+        'datetime': pd.to_datetime(['2024-01-21', '2024-01-20', '2024-01-21', '2024-01-20']),
+        'temp': [40.0, 30.0, 31.0, 41.0],
+        'humidity': [80.0, 60.0, 61.0, 81.0],
+        'conditions': ['Rain', 'Clear', 'Overcast', 'Partially cloudy'],
+        'description': ['wet', 'clear', 'grey', 'mixed']
+    })
+    air_quality_data = pd.DataFrame({
+        'city': ['boston', 'boston', 'paris', 'paris'],
+        'date': ['2024-01-20', '2024-01-21', '2024-01-20', '2024-01-22'],
+        'pm25': [' 35', '12', '20 ', '50'],
+        'pm10': [40, 15, 22, 60]
+    })
+
+    with patch('src.pipelines.feature_pipeline.DataQualityProfiler.profile',
+               autospec=True, wraps=DataQualityProfiler.profile) as mock_profile:
+        result = mock_feature_pipeline.process_features_batch(weather_data, air_quality_data)
+
+    assert mock_profile.call_count == 1
+    # paris 2024-01-21 has no air quality and 2024-01-22 has no weather
+    assert list(zip(result['city'], result['date'].dt.strftime('%Y-%m-%d'))) == [
+        ('boston', '2024-01-20'), ('boston', '2024-01-21'), ('paris', '2024-01-20')
+    ]
+    assert list(result['temp']) == [30.0, 31.0, 41.0]
+    assert list(result['pm25']) == [35, 12, 20]
+    assert list(result['conditions']) == [1, 5, 2]
+    assert 'pm10' not in result.columns and 'description' not in result.columns
+    assert result['record_id'].is_unique
+    assert result['timestamp'].dtype == 'float64'
+
+
+def test_process_features_batch_requires_keys(mock_feature_pipeline):
+    weather_data = pd.DataFrame({'datetime': ['2024-01-20'], 'temp': [72]})
+    air_quality_data = pd.DataFrame({'city': ['boston'], 'date': ['2024-01-20'], 'pm25': [35]})
+    with pytest.raises(ValueError, match='missing key columns'):
+        mock_feature_pipeline.process_features_batch(weather_data, air_quality_data)
+
+
+def test_quarantine_mode_drops_bad_rows_instead_of_failing(mock_feature_pipeline):
+    weather_data = pd.DataFrame({
+        'city': ['boston', 'paris'],
+        'datetime': ['2024-01-20', '2024-01-20'],
+        'humidity': [60.0, 160.0]
+    })
+    air_quality_data = pd.DataFrame({
+        'city': ['boston', 'paris'], 'date': ['2024-01-20', '2024-01-20'], 'pm25': [35, 20]
+    })
+
+    with pytest.raises(ValueError, match='humidity'):
+        mock_feature_pipeline.process_features_batch(weather_data, air_quality_data)
+
+    mock_feature_pipeline.data_quality_mode = 'quarantine'
+    result = mock_feature_pipeline.process_features_batch(weather_data, air_quality_data)
+    assert list(result['city']) == ['boston']
+    assert list(mock_feature_pipeline.quarantined_batches[0]['city']) == ['paris']
+    assert mock_feature_pipeline.last_quality_report['columns']['humidity']['bad_rows'] == [1]
+
+
+def fetch_city_features(pipeline, weather_payload, air_quality_payload, city='los angeles'):
+    """Run the single-city fetch -> process path on API-shaped payloads."""
+    with patch.object(pipeline.session, 'get') as mock_get:
+        mock_get.return_value.json.side_effect = [weather_payload, air_quality_payload]
+        weather_data = pipeline.fetch_weather_data(city)
+        air_quality_data = pipeline.fetch_air_quality_data(city)
+    return pipeline.process_features(weather_data, air_quality_data)
+
+
+def test_process_features_on_fetched_payloads_has_one_date(mock_feature_pipeline, sample_weather_data,
+                                                           sample_air_quality_data):
+    result = fetch_city_features(mock_feature_pipeline, sample_weather_data, sample_air_quality_data)
+
+    assert list(result.columns).count('date') == 1
+    assert 'datetime' not in result.columns
+    assert result['date'].iloc[0] == pd.Timestamp('2024-01-20')
+    assert result['city'].iloc[0] == 'los angeles'
+    assert result['record_id'].iloc[0]
+    assert result['pm25'].iloc[0] == 35 and result['temp'].iloc[0] == 72
+
+
+def test_records_take_the_weather_day_when_the_station_lags(mock_feature_pipeline, sample_weather_data,
+                                                            sample_air_quality_data):
+    # Just after midnight WAQI still reports the previous day's last update
+    air_quality = {'data': {**sample_air_quality_data['data'], 'time': {'s': '2024-01-19 23:00:00'}}}
+    result = fetch_city_features(mock_feature_pipeline, sample_weather_data, air_quality)
+
+    assert list(result.columns).count('date') == 1
+    assert result['date'].iloc[0] == pd.Timestamp('2024-01-20')
+    assert result['record_id'].iloc[0] == 'los-angeles:2024-01-20'
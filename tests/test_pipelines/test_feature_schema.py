@@ -0,0 +1,105 @@
+# tests/test_pipelines/test_feature_schema.py
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import Mock
+
+from src.pipelines.feature_schema import (
+    FeatureRecordEncoder,
+    clear_schema_cache,
+    get_feature_definitions,
+    get_record_encoder
+)
+
+FEATURE_DEFINITIONS = [
+    {'FeatureName': 'record_id', 'FeatureType': 'String'},
+    {'FeatureName': 'temp', 'FeatureType': 'Fractional'},
+    {'FeatureName': 'cloudcover', 'FeatureType': 'Integral'},
+    {'FeatureName': 'pm25', 'FeatureType': 'Integral'}
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_schema_cache()
+    yield
+    clear_schema_cache()
+
+
+def sagemaker_client():
+    client = Mock()
+    client.describe_feature_group.return_value = {'FeatureDefinitions': FEATURE_DEFINITIONS}
+    return client
+
+
+def test_feature_definitions_are_cached_until_ttl_expires():
+    client = sagemaker_client()
+
+    get_feature_definitions(client, 'test-feature-group', ttl=60)
+    get_feature_definitions(client, 'test-feature-group', ttl=60)
+    assert client.describe_feature_group.call_count == 1
+
+    get_feature_definitions(client, 'other-feature-group', ttl=60)
+    assert client.describe_feature_group.call_count == 2
+
+    clear_schema_cache()
+    get_feature_definitions(client, 'test-feature-group', ttl=0)
+    get_feature_definitions(client, 'test-feature-group', ttl=0)
+    assert client.describe_feature_group.call_count == 4
+
+
+def test_encoder_is_reused_while_schema_is_cached():
+    client = sagemaker_client()
+
+    first = get_record_encoder(client, 'test-feature-group')
+    second = get_record_encoder(client, 'test-feature-group')
+    assert first is second
+    assert get_record_encoder(client, 'test-feature-group', fill_missing=True) is not first
+
+
+def test_encoder_follows_schema_changes_not_list_identity():
+    client = sagemaker_client()
+    first = get_record_encoder(client, 'test-feature-group', ttl=0)
+
+    # A refresh that returns the same definitions keeps the encoder
+    client.describe_feature_group.return_value = {'FeatureDefinitions': [dict(d) for d in FEATURE_DEFINITIONS]}
+    assert get_record_encoder(client, 'test-feature-group', ttl=0) is first
+
+    added = FEATURE_DEFINITIONS + [{'FeatureName': 'humidity', 'FeatureType': 'Fractional'}]
+    client.describe_feature_group.return_value = {'FeatureDefinitions': added}
+    encoder = get_record_encoder(client, 'test-feature-group', ttl=0)
+    assert encoder is not first and 'humidity' in encoder.feature_names
+
+
+def test_encoder_applies_feature_types():
+    encoder = FeatureRecordEncoder(FEATURE_DEFINITIONS, float_precision=2)
+    features = pd.DataFrame({
+        'record_id': ['0', '1'],
+        'temp': [72.456, np.nan],
+        'cloudcover': ['8.9', 'n/a'],
+        'pm25': pd.array([35, None], dtype='Int64'),
+        'description': ['not in the feature group', '']
+    })
+
+    records = encoder.encode_frame(features)
+
+    assert records[0] == [
+        {'FeatureName': 'record_id', 'ValueAsString': '0'},
+        {'FeatureName': 'temp', 'ValueAsString': '72.46'},
+        {'FeatureName': 'cloudcover', 'ValueAsString': '8'},
+        {'FeatureName': 'pm25', 'ValueAsString': '35'}
+    ]
+    # Missing values are omitted; unparsable numbers fall back to 0
+    assert records[1] == [
+        {'FeatureName': 'record_id', 'ValueAsString': '1'},
+        {'FeatureName': 'cloudcover', 'ValueAsString': '0'}
+    ]
+
+
+def test_encoder_fills_missing_values_when_asked():
+    encoder = FeatureRecordEncoder(FEATURE_DEFINITIONS, fill_missing=True)
+    records = encoder.encode_frame(pd.DataFrame({'temp': [np.nan], 'pm25': [np.nan]}))
+    assert records[0] == [
+        {'FeatureName': 'temp', 'ValueAsString': '0.0'},
+        {'FeatureName': 'pm25', 'ValueAsString': '0'}
+    ]
@@ -0,0 +1,94 @@
+# tests/test_pipelines/test_feature_storage.py
+import pandas as pd
+import pytest
+
+from src.pipelines.feature_storage import (
+    compact_frame, export_csv, iter_dataset_parts, read_features, read_increments, write_dataset
+)
+
+
+@pytest.fixture
+def features():
+    return pd.DataFrame({
+        'city': ['boston', 'boston', 'paris', 'paris'],
+        'date': ['2023-12-31', '2024-01-01', '2023-12-31', '2024-01-01'],
+        'temp': ['41.5', '38.0', '45.1', None],
+        'conditions': [1.0, 2.0, None, 4.0],
+        'pm25': ['26', '14', '33', '41']
+    })
+
+
+def test_compact_frame_parses_quoted_numbers(features):
+    compact = compact_frame(features)
+    assert compact['temp'].dtype == 'float32'
+    assert compact['pm25'].dtype == 'Int16'
+    assert compact['conditions'].dtype == 'Int8'
+    assert compact['conditions'].isna().sum() == 1
+    assert pd.api.types.is_datetime64_any_dtype(compact['date'])
+
+
+def test_dataset_round_trip_with_partition_filters(tmp_path, features):
+    root = str(tmp_path / 'features')
+    write_dataset(features, root)
+
+    assert sorted(p.relative_to(root).parent.as_posix() for p in tmp_path.rglob('*.parquet')) == [
+        'city=boston/year=2023', 'city=boston/year=2024',
+        'city=paris/year=2023', 'city=paris/year=2024'
+    ]
+
+    subset = read_features(root, columns=['temp', 'pm25'], cities=['paris'], start='2024-01-01')
+    assert list(subset.columns) == ['temp', 'pm25']
+    assert list(subset['pm25']) == [41]
+
+    # Rewriting a partition replaces it rather than duplicating rows
+    write_dataset(features, root)
+    assert len(read_features(root)) == 4
+
+
+def test_training_channel_prefers_parquet_and_falls_back_to_csv(tmp_path, features):
+    export_csv(compact_frame(features), str(tmp_path / 'train.csv'))
+    from_csv = read_features(str(tmp_path), columns=['temp', 'pm25'], cities=['boston'])
+    assert list(from_csv['pm25']) == [26, 14]
+    assert from_csv['temp'].dtype == 'float32'
+
+    write_dataset(features.iloc[:1], str(tmp_path / 'features'))
+    assert len(read_features(str(tmp_path), columns=['pm25'])) == 1
+
+
+def test_in_memory_parts_match_the_written_dataset(tmp_path, features):
+    features = features.assign(city=['los angeles', 'los angeles', 'paris', 'paris'])
+    root = tmp_path / 'features'
+    for path, data in iter_dataset_parts(features):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(data)
+
+    assert sorted(p.relative_to(root).as_posix() for p in root.rglob('*.parquet'))[0] == \
+        'city=los%20angeles/year=2023/part-0.parquet'
+    write_dataset(features, str(tmp_path / 'written'))
+    expected = read_features(str(tmp_path / 'written'))
+    actual = read_features(str(root))
+    pd.testing.assert_frame_equal(actual.sort_values(['city', 'date']).reset_index(drop=True),
+                                  expected.sort_values(['city', 'date']).reset_index(drop=True))
+
+
+def test_numeric_looking_record_ids_survive_increments(tmp_path):
+    # Legacy %Y%m%d%H%M%S ids differ only past float32's precision
+    increment = pd.DataFrame({
+        'record_id': ['20240120153012', '20240120153013', '20240120153014'],
+        'event_time': ['1705764612.25', '1705764613.5', '1705764614.75'],
+        'date': pd.to_datetime(['2024-01-20'] * 3),
+        'timestamp': [1705764612.0, 1705764613.0, 1705764614.0],
+        'pm25': [10, 20, 30]
+    })
+    compact = compact_frame(increment)
+    assert compact['record_id'].dtype == 'string' and compact['event_time'].dtype == 'string'
+
+    root = tmp_path / 'increments'
+    for path, data in iter_dataset_parts(increment, partition_cols=['date']):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(data)
+
+    result = read_increments(str(root))
+    assert sorted(result['record_id']) == list(increment['record_id'])
+    assert sorted(result['event_time']) == list(increment['event_time'])
+    assert sorted(result['pm25']) == [10, 20, 30]
@@ -0,0 +1,87 @@
+# tests/test_pipelines/test_feature_store_writer.py
+import time
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, patch
+from botocore.exceptions import ClientError
+
+from src.pipelines.feature_store_writer import FeatureStoreWriter, serialize_records
+from src.pipelines.resilience import Deadline
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'PutRecord')
+
+
+def test_serialize_records_is_column_wise():
+    features = pd.DataFrame({
+        'date': ['2024-01-20', '2024-01-21'],
+        'temp': [72.5, np.nan],
+        'pm25': pd.array([35, None], dtype='Int64'),
+        'description': ['line one\nline two ', 'ok']
+    })
+
+    records = serialize_records(features)
+
+    assert records[0] == [
+        {'FeatureName': 'date', 'ValueAsString': '2024-01-20'},
+        {'FeatureName': 'temp', 'ValueAsString': '72.5'},
+        {'FeatureName': 'pm25', 'ValueAsString': '35'},
+        {'FeatureName': 'description', 'ValueAsString': 'line one line two'}
+    ]
+    assert records[1][1]['ValueAsString'] == ''
+    assert records[1][2]['ValueAsString'] == ''
+
+
+def test_writer_retries_only_throttled_records():
+    runtime = Mock()
+    calls = {'n': 0}
+
+    def put_record(FeatureGroupName, Record):
+        calls['n'] += 1
+        if Record[0]['ValueAsString'] == '1' and calls['n'] <= 3:
+            raise client_error('ThrottlingException')
+
+    runtime.put_record.side_effect = put_record
+    writer = FeatureStoreWriter(runtime, 'test-feature-group', max_workers=1, base_delay=0)
+
+    with patch('src.pipelines.feature_store_writer.time.sleep'):
+        summary = writer.write(pd.DataFrame({'record_id': ['0', '1', '2']}))
+
+    assert summary['successful'] == 3
+    assert summary['failed'] == 0
+    assert summary['throttled'] == 1
+    assert summary['attempts'] == 2
+    assert runtime.put_record.call_count == 4
+
+
+def test_writer_reports_permanent_failures_without_aborting():
+    runtime = Mock()
+
+    def put_record(FeatureGroupName, Record):
+        if Record[0]['ValueAsString'] == 'bad':
+            raise client_error('ValidationError')
+
+    runtime.put_record.side_effect = put_record
+    writer = FeatureStoreWriter(runtime, 'test-feature-group', max_workers=4)
+
+    summary = writer.write(pd.DataFrame({'record_id': ['a', 'bad', 'c', 'd']}))
+
+    assert summary['successful'] == 3
+    assert summary['failed'] == 1
+    assert summary['attempts'] == 1
+    assert summary['failures'][0]['record'] == 1
+    assert summary['failures'][0]['error'].startswith('ValidationError')
+
+
+def test_writer_stops_retrying_at_the_deadline():
+    runtime = Mock()
+    runtime.put_record.side_effect = client_error('ThrottlingException')
+    writer = FeatureStoreWriter(runtime, 'test-feature-group', max_workers=1,
+                                base_delay=5, max_delay=20, deadline=Deadline(0.2))
+
+    started = time.monotonic()
+    summary = writer.write(pd.DataFrame({'record_id': ['0', '1']}))
+
+    assert time.monotonic() - started < 2
+    assert summary['failed'] == 2 and summary['attempts'] < writer.max_attempts
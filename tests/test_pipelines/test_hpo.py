@@ -0,0 +1,85 @@
+# tests/test_pipelines/test_hpo.py
+import json
+import numpy as np
+import pandas as pd
+
+from src.pipelines.hpo import SEARCH_SPACE, run_search, sample_configs, split_for_search, successive_halving
+from src.pipelines.model_training import FEATURE_COLUMNS, SIMPLE_FEATURE_COLUMNS
+
+
+def test_halving_keeps_the_best_third_with_more_rounds():
+    configs = [{'quality': q} for q in [5, 1, 4, 2, 6, 3, 9, 8, 7]]
+    calls = []
+
+    def evaluate(tasks):
+        calls.append([(config_id, rounds) for config_id, _, rounds in tasks])
+        return [{'config_id': config_id, 'rounds': rounds, 'rmse': config['quality'] / rounds}
+                for config_id, config, rounds in tasks]
+
+    results = successive_halving(configs, evaluate, min_rounds=2, max_rounds=18, reduction=3)
+
+    assert [len(rung) for rung in calls] == [9, 3, 1]
+    assert [rounds for _, rounds in calls[0]] == [2] * 9
+    assert sorted(config_id for config_id, _ in calls[1]) == [1, 3, 5]
+    assert calls[2] == [(1, 18)]
+    assert len(results) == 13 and results[-1]['rung'] == 2
+
+
+def test_sampled_configs_stay_in_the_space():
+    for config in sample_configs(20, seed=3):
+        for name, (low, high, kind) in SEARCH_SPACE.items():
+            assert low <= config[name] <= high
+            assert isinstance(config[name], int) == (kind == 'int')
+
+
+def make_features(path, dated=False):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 100, (300, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df['pm25'] = 0.5 * df['humidity'] - 0.3 * df['windspeed'] + rng.normal(0, 5, 300) + 40
+    if dated:
+        # Shuffled rows over 30 days
+        df['date'] = pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.permutation(300) // 10, unit='D')
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_search_writes_leaderboard_and_train_simple_hyperparameters(tmp_path):
+    make_features(tmp_path / 'train.csv')
+    output = tmp_path / 'hpo'
+
+    best = run_search(str(tmp_path / 'train.csv'), str(output), configs=4,
+                      min_rounds=3, max_rounds=9, workers=2)
+
+    leaderboard = pd.read_csv(output / 'leaderboard.csv')
+    assert len(leaderboard) == 4
+    assert leaderboard.loc[0, 'rounds'] == 9
+    assert leaderboard.loc[0, 'rmse'] == leaderboard[leaderboard['rung'] == 1]['rmse'].min()
+
+    assert json.loads((output / 'best_hyperparameters.json').read_text()) == best
+    assert best['max_depth'] == leaderboard.loc[0, 'max_depth']
+    assert 1 <= best['num_round'] <= 9
+    assert not (output / 'best_args.txt').exists()
+
+
+def test_search_for_train_writes_command_line_arguments(tmp_path):
+    make_features(tmp_path / 'train.csv', dated=True)
+    output = tmp_path / 'hpo'
+
+    best = run_search(str(tmp_path / 'train.csv'), str(output), configs=2,
+                      min_rounds=3, max_rounds=9, workers=1, script='train')
+
+    args = (output / 'best_args.txt').read_text().split()
+    assert args[:2] == ['--max-depth', str(best['max_depth'])]
+    assert args[-2:] == ['--n-estimators', str(best['num_round'])]
+    assert not (output / 'best_hyperparameters.json').exists()
+
+
+def test_dated_data_holds_out_the_newest_dates(tmp_path):
+    df = make_features(tmp_path / 'train.csv', dated=True)
+
+    X_train, _, X_valid, _ = split_for_search(str(tmp_path / 'train.csv'), SIMPLE_FEATURE_COLUMNS)
+
+    assert X_train.shape[1] == X_valid.shape[1] == len(SIMPLE_FEATURE_COLUMNS)
+    assert len(X_train) == 240 and len(X_valid) == 60
+    newest = df[df['date'] >= '2024-01-25'][SIMPLE_FEATURE_COLUMNS].to_numpy(dtype='float32')
+    assert sorted(map(tuple, X_valid)) == sorted(map(tuple, newest))
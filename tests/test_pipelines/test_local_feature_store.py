@@ -0,0 +1,91 @@
+# tests/test_pipelines/test_local_feature_store.py
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+
+from src.pipelines.feature_store_writer import FeatureStoreWriter, serialize_records
+from src.pipelines.local_feature_store import LocalAthena, LocalFeatureStore, LocalS3
+from src.pipelines.training_pipeline import TrainingPipeline
+
+
+def record(record_id, timestamp, temp, pm25):
+    return [{'FeatureName': 'record_id', 'ValueAsString': record_id},
+            {'FeatureName': 'timestamp', 'ValueAsString': str(timestamp)},
+            {'FeatureName': 'temp', 'ValueAsString': str(temp)},
+            {'FeatureName': 'humidity', 'ValueAsString': '60'},
+            {'FeatureName': 'pm25', 'ValueAsString': str(pm25)}]
+
+
+def test_online_store_keeps_latest_event_time_and_offline_keeps_every_write():
+    store = LocalFeatureStore()
+    store.put_record(FeatureGroupName='fg', Record=record('boston:2024-01-20', 200, 41.5, 26))
+    store.put_record(FeatureGroupName='fg', Record=record('boston:2024-01-20', 100, 0.0, 0))
+
+    response = store.get_record(FeatureGroupName='fg', RecordIdentifierValueAsString='boston:2024-01-20',
+                                FeatureNames=['pm25'])
+    assert response == {'Record': [{'FeatureName': 'pm25', 'ValueAsString': '26'}]}
+    assert store.get_record(FeatureGroupName='fg', RecordIdentifierValueAsString='missing') == {}
+
+    batch = store.batch_get_record(Identifiers=[{
+        'FeatureGroupName': 'fg', 'RecordIdentifiersValueAsString': ['boston:2024-01-20', 'missing']
+    }])
+    assert [r['RecordIdentifierValueAsString'] for r in batch['Records']] == ['boston:2024-01-20']
+    assert batch['Errors'][0]['RecordIdentifierValueAsString'] == 'missing'
+
+    columns, rows = store.query('SELECT pm25, is_deleted FROM "fg" ORDER BY timestamp')
+    assert columns == ['pm25', 'is_deleted'] and rows == [(0, 0), (26, 0)]
+    table = store.describe_feature_group(FeatureGroupName='fg')['OfflineStoreConfig']['DataCatalogConfig']
+    assert table['TableName'] == 'fg'
+
+
+def test_rate_limit_throttles_and_writer_recovers():
+    store = LocalFeatureStore(max_requests_per_second=5)
+    features = pd.DataFrame({'record_id': [f'r{i}' for i in range(12)],
+                             'timestamp': [1.0] * 12, 'pm25': range(12)})
+    writer = FeatureStoreWriter(store, 'fg', max_workers=4, max_attempts=10,
+                                base_delay=0.2, max_delay=1.0)
+
+    summary = writer.write(features)
+
+    assert summary['successful'] == 12
+    assert summary['throttled'] > 0
+    assert store.stats['throttled'] == summary['throttled']
+    with pytest.raises(ClientError):
+        LocalFeatureStore(throttle_rate=1.0).put_record(FeatureGroupName='fg', Record=record('r', 1, 1, 1))
+
+
+def test_training_data_is_prepared_from_the_offline_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store, s3 = LocalFeatureStore(), LocalS3()
+    features = pd.DataFrame({'record_id': ['a', 'b', 'c'], 'timestamp': [1.0, 1.0, 1.0],
+                             'temp': [70.5, 60.0, None], 'humidity': [40.0, 50.0, 55.0],
+                             'conditions': [1, 2, 3], 'pm25': [12, 0, 30]})
+    for column in ('precip', 'windspeed', 'cloudcover', 'visibility', 'solarradiation'):
+        features[column] = 1.0
+    for row in serialize_records(features):
+        store.put_record(FeatureGroupName='air-quality', Record=row)
+
+    pipeline = TrainingPipeline(store.table_name('air-quality'), 'bucket',
+                                athena_client=LocalAthena(store, s3), s3_client=s3)
+    df = pipeline.prepare_training_data()
+
+    # Row b has pm25 == 0 and row c has no temp
+    assert len(df) == 1 and df['temp'].iloc[0] == pytest.approx(70.5)
+    assert df['pm25'].dtype == 'Int16'
+    assert ('bucket', 'training-data/train.csv') in s3.objects
+    assert ('bucket', 'training-data/features/part-0.parquet') in s3.objects
+    # Results are streamed and uploaded from memory, so nothing lands in the working directory
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_feature_pipeline_writes_through_an_injected_runtime():
+    from src.pipelines.feature_pipeline import FeaturePipeline
+
+    store = LocalFeatureStore()
+    with patch('boto3.client'):
+        pipeline = FeaturePipeline(feature_group_name='test-feature-group', featurestore_runtime=store)
+    pipeline.write_to_feature_store(pd.DataFrame({'record_id': ['x'], 'timestamp': [1.0], 'pm25': [9]}))
+
+    assert store.get_record(FeatureGroupName='test-feature-group',
+                            RecordIdentifierValueAsString='x')['Record'][-1]['ValueAsString'] == '9'
@@ -0,0 +1,51 @@
+# tests/test_pipelines/test_model_training.py
+import pickle
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from src.pipelines import model_training
+from src.pipelines.model_training import FEATURE_COLUMNS, fit_model, load_matrix
+
+
+def synthetic_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 100, (rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df['pm25'] = (0.5 * df['humidity'] - 0.3 * df['windspeed'] + rng.normal(0, 5, rows)).round().clip(1)
+    return df
+
+
+def test_matrix_is_read_once_then_memory_mapped(tmp_path):
+    source = tmp_path / 'train.csv'
+    synthetic_frame().to_csv(source, index=False)
+    cache_dir = str(tmp_path / 'cache')
+
+    X, y = load_matrix(str(source), cache_dir=cache_dir)
+    with patch.object(model_training, 'read_features') as read_features:
+        X_cached, y_cached = load_matrix(str(source), cache_dir=cache_dir)
+    read_features.assert_not_called()
+
+    assert X.dtype == np.float32 and X.shape == (400, len(FEATURE_COLUMNS))
+    assert isinstance(X_cached, np.memmap)
+    np.testing.assert_array_equal(X, X_cached)
+    np.testing.assert_array_equal(y, y_cached)
+
+    # Changing the source invalidates the cache
+    synthetic_frame(rows=10).to_csv(source, index=False)
+    assert load_matrix(str(source), cache_dir=cache_dir)[0].shape[0] == 10
+
+
+def test_fit_model_stops_early_and_reports_timings():
+    df = synthetic_frame()
+    X, y = df[FEATURE_COLUMNS].to_numpy('float32'), df['pm25'].to_numpy('float32')
+
+    model, report = fit_model(X[:300], y[:300], X[300:], y[300:],
+                              params={'max_depth': 6, 'learning_rate': 0.5},
+                              n_estimators=500, nthread=2, early_stopping_rounds=5)
+
+    assert report['iterations'] < 500
+    assert report['best_iteration'] == report['iterations'] - 6
+    assert report['seconds_per_iteration'] > 0 and report['peak_memory_mb'] > 0
+    assert model.get_params()['tree_method'] == 'hist' and model.n_jobs == 2
+    # The saved model does not depend on the timing callback
+    assert b'IterationTimer' not in pickle.dumps(model)
@@ -0,0 +1,73 @@
+# tests/test_pipelines/test_query_cache.py
+import pandas as pd
+from unittest.mock import Mock
+
+from src.pipelines.feature_store_writer import serialize_records
+from src.pipelines.freshness import bump_freshness_marker
+from src.pipelines.local_feature_store import LocalAthena, LocalFeatureStore, LocalS3
+from src.pipelines.query_cache import QueryResultCache
+from src.pipelines.training_pipeline import TRAINING_COLUMNS, TrainingPipeline
+
+
+def put_rows(store, pm25_values, start=0):
+    features = pd.DataFrame({column: 1.0 for column in TRAINING_COLUMNS}, index=range(len(pm25_values)))
+    features['pm25'] = pm25_values
+    features.insert(0, 'record_id', [f'r{start + i}' for i in range(len(pm25_values))])
+    for record in serialize_records(features):
+        store.put_record(FeatureGroupName='fg', Record=record)
+
+
+def test_key_ignores_formatting_and_follows_the_marker(tmp_path):
+    marker = str(tmp_path / 'marker.json')
+    cache = QueryResultCache(str(tmp_path / 'cache'), marker)
+
+    key = cache.key('SELECT pm25\n  FROM "fg";')
+    assert key == cache.key('  SELECT pm25 FROM "fg"')
+    assert key != cache.key('SELECT pm25 FROM "fg"', 'other-bucket')
+
+    bump_freshness_marker(marker, records=1)
+    assert cache.key('SELECT pm25 FROM "fg"') != key
+
+
+def test_hit_skips_athena_and_s3_until_new_records_are_ingested(tmp_path, monkeypatch):
+    marker = str(tmp_path / 'marker.json')
+    store, local_s3 = LocalFeatureStore(), LocalS3()
+    put_rows(store, [10, 20])
+    athena, s3 = Mock(wraps=LocalAthena(store, local_s3)), Mock(wraps=local_s3)
+    pipeline = TrainingPipeline('fg', 'bucket', athena_client=athena, s3_client=s3,
+                                result_cache=QueryResultCache(str(tmp_path / 'cache'), marker))
+
+    first = pipeline.prepare_training_data()
+    athena.reset_mock()
+    s3.reset_mock()
+    second = pipeline.prepare_training_data()
+
+    pd.testing.assert_frame_equal(first, second)
+    assert athena.mock_calls == [] and s3.mock_calls == []
+
+    put_rows(store, [30], start=2)
+    bump_freshness_marker(marker, records=1)
+    assert len(pipeline.prepare_training_data()) == 3
+    athena.start_query_execution.assert_called_once()
+
+
+def test_results_are_not_cached_while_the_offline_store_replicates(tmp_path):
+    marker = str(tmp_path / 'marker.json')
+    store, local_s3 = LocalFeatureStore(), LocalS3()
+    put_rows(store, [10, 20])
+    athena = Mock(wraps=LocalAthena(store, local_s3))
+    cache = QueryResultCache(str(tmp_path / 'cache'), marker, replication_grace=600)
+    pipeline = TrainingPipeline('fg', 'bucket', athena_client=athena, s3_client=local_s3,
+                                result_cache=cache)
+
+    bump_freshness_marker(marker, records=2)
+    assert cache.settling()
+    pipeline.prepare_training_data()
+    pipeline.prepare_training_data()
+    assert athena.start_query_execution.call_count == 2
+
+    # Once the grace window has passed, results are cached again
+    cache.replication_grace = 0
+    pipeline.prepare_training_data()
+    pipeline.prepare_training_data()
+    assert athena.start_query_execution.call_count == 3
@@ -0,0 +1,70 @@
+# tests/test_pipelines/test_raw_data_loader.py
+import pandas as pd
+import pytest
+
+from src.pipelines.raw_data_loader import iter_all_cities, iter_city_features, load_pm25
+
+WEATHER_HEADER = 'name,datetime,temp,humidity,preciptype,conditions,description,icon,stations\n'
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    weather = tmp_path / 'weather'
+    air_quality = tmp_path / 'air_quality'
+    weather.mkdir()
+    air_quality.mkdir()
+
+    # Two exports overlapping on 2024-01-03, written the way Visual Crossing exports them
+    (weather / 'la_24_1.csv').write_text(WEATHER_HEADER + ''.join(
+        f'los angeles,2024-01-0{day},{60 + day},50,,Clear,Clear,clear-day,"KCQT,KBUR"\n'
+        for day in range(1, 4)))
+    (weather / 'la_24_2.csv').write_text(WEATHER_HEADER + ''.join(
+        f'los angeles,2024-01-0{day},{70 + day},55,rain,"Rain, Overcast",Rain,rain,KCQT\n'
+        for day in range(3, 7)))
+    # Already-merged file in the same directory must not be picked up
+    (weather / 'merged_la_data.csv').write_text('date,temp\n2024-01-01,1\n')
+
+    (air_quality / 'los_angeles.csv').write_text(
+        'date, pm25, pm10, o3, no2, so2, co\n'
+        '2024/1/1, 40, 6, 31, 5, , 2\n'
+        '2024/1/2, , 6, 31, 5, , 2\n'
+        '2024/1/3, 52, 6, 31, 5, , 2\n'
+        '2024/1/4, 61, 6, 31, 5, , 2\n')
+    (air_quality / 'los-angeles-north main street-air-quality.csv').write_text(
+        'date,pm25,pm10,o3,no2,so2,co\n'
+        '2024/1/4, 99, 18, 32, 8, , 2\n'
+        '2024/1/5, 70, 18, 32, 8, , 2\n')
+    (air_quality / 'boston.csv').write_text('date, pm25\n2024/1/1, 20\n')
+    return str(tmp_path)
+
+
+def test_load_pm25_strips_padding_and_prefers_primary_file(raw_dir):
+    pm25 = load_pm25('los_angeles', raw_dir)
+    assert list(pm25.index.strftime('%Y-%m-%d')) == [
+        '2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'
+    ]
+    assert pm25.loc['2024-01-01'] == '40'
+    assert pm25.loc['2024-01-04'] == '61'
+    assert pd.isna(pm25.loc['2024-01-02'])
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 1000])
+def test_city_features_are_joined_and_cleaned_in_chunks(raw_dir, chunksize):
+    chunks = list(iter_city_features('los_angeles', raw_dir, chunksize=chunksize))
+    features = pd.concat(chunks, ignore_index=True)
+
+    # 2024-01-02 has no pm25 and 2024-01-06 has no air-quality row
+    assert list(features['date'].dt.strftime('%Y-%m-%d')) == [
+        '2024-01-01', '2024-01-03', '2024-01-04', '2024-01-05'
+    ]
+    assert list(features['pm25']) == [40, 52, 61, 70]
+    assert list(features['conditions']) == [1, 1, 6, 6]
+    assert list(features['temp']) == [61.0, 63.0, 74.0, 75.0]
+    assert not {'name', 'description', 'icon', 'stations', 'preciptype'} & set(features.columns)
+    assert features['pm25'].dtype == 'Int64'
+    assert all(chunk.dtypes.equals(chunks[0].dtypes) for chunk in chunks)
+
+
+def test_cities_without_weather_exports_are_skipped(raw_dir):
+    cities = [city for city, _ in iter_all_cities(raw_dir, cities=['boston', 'los_angeles'])]
+    assert set(cities) == {'los_angeles'}
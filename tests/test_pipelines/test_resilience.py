@@ -0,0 +1,86 @@
+# tests/test_pipelines/test_resilience.py
+import pytest
+import requests
+from unittest.mock import Mock, patch
+
+from src.pipelines.feature_pipeline import FeaturePipeline
+from src.pipelines.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceeded,
+    RetryPolicy
+)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_deadline_from_lambda_context_keeps_safety_margin():
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 30000
+    deadline = Deadline.from_lambda_context(context, safety_margin=10)
+    assert 19 < deadline.remaining() <= 20
+    assert Deadline.from_lambda_context(None).remaining() == float('inf')
+
+
+def test_retry_policy_retries_transient_errors_only():
+    policy = RetryPolicy(max_attempts=3, base_delay=0)
+    flaky = Mock(side_effect=[requests.exceptions.ConnectionError(), 'ok'])
+    assert policy.call(flaky) == 'ok'
+    assert flaky.call_count == 2
+
+    not_found = Mock(side_effect=http_error(404))
+    with pytest.raises(requests.exceptions.HTTPError):
+        policy.call(not_found)
+    assert not_found.call_count == 1
+
+
+def test_retry_policy_does_not_sleep_past_deadline():
+    policy = RetryPolicy(max_attempts=3, base_delay=5)
+    failing = Mock(side_effect=requests.exceptions.Timeout())
+    with patch('src.pipelines.resilience.time.sleep') as mock_sleep:
+        with pytest.raises(DeadlineExceeded):
+            policy.call(failing, deadline=Deadline(1))
+    assert failing.call_count == 1
+    assert not mock_sleep.called
+
+    with pytest.raises(DeadlineExceeded):
+        policy.call(failing, deadline=Deadline(0))
+    assert failing.call_count == 1
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker('waqi', failure_threshold=2, reset_timeout=60)
+    policy = RetryPolicy(max_attempts=1)
+    failing = Mock(side_effect=http_error(503))
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            policy.call(failing, breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        policy.call(failing, breaker=breaker)
+    assert failing.call_count == 2
+
+    breaker.opened_at -= 61
+    assert policy.call(lambda: 'recovered', breaker=breaker) == 'recovered'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_fails_later_cities_fast():
+    with patch('boto3.client'):
+        pipeline = FeaturePipeline(feature_group_name='test-feature-group')
+    pipeline.retry_policy = RetryPolicy(max_attempts=1)
+
+    with patch.object(pipeline.session, 'get', side_effect=requests.exceptions.ConnectTimeout()) as mock_get:
+        results = pipeline.run_pipeline_for_cities(
+            [f'city-{i}' for i in range(6)], max_workers=1, deadline=Deadline(60)
+        )
+
+    # Three failures open the weather circuit; the other cities never hit the network
+    assert mock_get.call_count == 3
+    assert all(status.startswith('failed') for status in results.values())
+    assert sum('Circuit for visualcrossing is open' in status for status in results.values()) == 3
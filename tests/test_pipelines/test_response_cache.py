@@ -0,0 +1,69 @@
+# tests/test_pipelines/test_response_cache.py
+import pytest
+from unittest.mock import patch
+
+from src.pipelines.feature_pipeline import FeaturePipeline
+from src.pipelines.response_cache import LocalDiskResponseCache, ResponseCache
+
+
+def test_local_disk_cache_round_trip_and_expiry(tmp_path):
+    cache = LocalDiskResponseCache(str(tmp_path), ttl_seconds=60)
+    cache.set('waqi', 'Los Angeles', '2024-01-20', {'data': {'iaqi': {}}})
+
+    assert (tmp_path / 'waqi' / 'los-angeles' / '2024-01-20.json').exists()
+    assert cache.get('waqi', 'los angeles', '2024-01-20') == {'data': {'iaqi': {}}}
+    assert cache.get('waqi', 'los angeles', '2024-01-21') is None
+
+    cache.ttl_seconds = -1
+    assert cache.get('waqi', 'los angeles', '2024-01-20') is None
+
+
+def test_backends_must_implement_storage():
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+
+def test_concurrent_writers_of_one_key_do_not_clash(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = LocalDiskResponseCache(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: cache.set('waqi', 'boston', '2024-01-20', {'writer': i}), range(64)))
+
+    assert cache.get('waqi', 'boston', '2024-01-20')['writer'] in range(64)
+    assert [p.name for p in (tmp_path / 'waqi' / 'boston').iterdir()] == ['2024-01-20.json']
+
+
+@pytest.fixture
+def cached_pipeline(tmp_path):
+    with patch('boto3.client'):
+        return FeaturePipeline(feature_group_name='test-feature-group',
+                               response_cache=LocalDiskResponseCache(str(tmp_path)))
+
+
+def test_fetch_uses_cache_before_network(cached_pipeline, sample_weather_data):
+    with patch.object(cached_pipeline.session, 'get') as mock_get, \
+         patch.object(cached_pipeline.monitoring, 'log_metric') as mock_metric:
+        mock_get.return_value.json.return_value = sample_weather_data
+        first = cached_pipeline.fetch_weather_data('boston')
+        second = cached_pipeline.fetch_weather_data('boston')
+
+    assert mock_get.call_count == 1
+    assert first.equals(second)
+    metrics = [call.args[0] for call in mock_metric.call_args_list]
+    assert metrics.count('ResponseCacheMiss') == 1
+    assert metrics.count('ResponseCacheHit') == 1
+
+
+def test_error_payloads_are_not_cached(cached_pipeline, sample_air_quality_data):
+    with patch.object(cached_pipeline.session, 'get') as mock_get:
+        mock_get.return_value.json.side_effect = [
+            {'status': 'error', 'data': 'Unknown station'},
+            sample_air_quality_data
+        ]
+        with pytest.raises(TypeError):
+            cached_pipeline.fetch_air_quality_data('boston')
+        result = cached_pipeline.fetch_air_quality_data('boston')
+
+    assert mock_get.call_count == 2
+    assert result['pm25'].iloc[0] == 35
@@ -0,0 +1,14 @@
+# tests/test_pipelines/test_state_store.py
+from concurrent.futures import ThreadPoolExecutor
+
+from src.pipelines.state_store import load_json_state, save_json_state
+
+
+def test_concurrent_saves_of_one_state_do_not_clash(tmp_path):
+    location = str(tmp_path / 'rolling_state.json')
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: save_json_state({'writer': i}, location), range(64)))
+
+    assert load_json_state(location)['writer'] in range(64)
+    assert [p.name for p in tmp_path.iterdir()] == ['rolling_state.json']
+    assert load_json_state(str(tmp_path / 'missing.json')) is None
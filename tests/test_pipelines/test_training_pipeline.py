@@ -3,6 +3,8 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
+import pandas as pd
+
 from pipelines.training_pipeline import TrainingPipeline
 
 def test_data_preparation():
@@ -29,5 +31,65 @@ def test_data_preparation():
     else:
         print("Failed to prepare training data")
 
+
+def put_rows(store, rows):
+    from pipelines.feature_store_writer import serialize_records
+
+    features = pd.DataFrame(rows)
+    for column in ('humidity', 'precip', 'windspeed', 'conditions', 'cloudcover',
+                   'visibility', 'solarradiation'):
+        features[column] = 1
+    for record in serialize_records(features):
+        store.put_record(FeatureGroupName='air-quality', Record=record)
+
+
+def download_channel(s3, bucket, root):
+    for (object_bucket, key), data in s3.objects.items():
+        if object_bucket == bucket and key.startswith('training-data/'):
+            path = root / key[len('training-data/'):]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+    return str(root)
+
+
+def load_watermark(s3):
+    import json
+    return json.loads(s3.objects[('bucket', 'training-data/watermark.json')])
+
+
+def test_incremental_extraction_appends_only_new_rows(tmp_path):
+    from pipelines.feature_storage import read_features
+    from pipelines.local_feature_store import LocalAthena, LocalFeatureStore, LocalS3
+
+    store, s3 = LocalFeatureStore(), LocalS3()
+    put_rows(store, [
+        {'record_id': 'boston:2024-01-20', 'date': '2024-01-20', 'timestamp': 90.0, 'temp': 40.0, 'pm25': 10},
+        {'record_id': 'boston:2024-01-21', 'date': '2024-01-21', 'timestamp': 100.0, 'temp': 41.0, 'pm25': 11}
+    ])
+    athena = LocalAthena(store, s3)
+    pipeline = TrainingPipeline(store.table_name('air-quality'), 'bucket', athena_client=athena, s3_client=s3)
+
+    assert len(pipeline.prepare_incremental_training_data()) == 2
+
+    put_rows(store, [
+        {'record_id': 'boston:2024-01-21', 'date': '2024-01-21', 'timestamp': 200.0, 'temp': 45.0, 'pm25': 15},
+        {'record_id': 'boston:2024-01-22', 'date': '2024-01-22', 'timestamp': 200.0, 'temp': 42.0, 'pm25': 12}
+    ])
+    # Rows after the watermark, plus the one at it (re-extracted in case it was written late)
+    new_rows = pipeline.prepare_incremental_training_data()
+    assert sorted(new_rows['pm25']) == [11, 12, 15]
+    assert load_watermark(s3)['watermark'] == 200.0
+    assert any(key.startswith('training-data/increments/date=2024-01-22/') for _, key in s3.objects)
+
+    # The re-extracted record replaces its older version when the channel is read
+    train = read_features(download_channel(s3, 'bucket', tmp_path / 'channel'), columns=['temp', 'pm25'])
+    assert sorted(train['pm25']) == [10, 12, 15]
+
+    assert len(pipeline.prepare_incremental_training_data(full_refresh=True)) == 4
+    increments = [key for _, key in s3.objects if key.startswith('training-data/increments/')]
+    # The refresh replaced the per-run files with one file per date
+    assert len(increments) == 3
+
+
 if __name__ == "__main__":
-    test_data_preparation()
\ No newline at end of file
+    test_data_preparation()